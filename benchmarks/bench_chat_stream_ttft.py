@@ -0,0 +1,115 @@
+"""
+Time to first token: POST /chat/message vs POST /chat/message/stream.
+
+The chat uses a fake LLM which generates the answer in --tokens chunks,
+--token-delay seconds each, so the full answer takes tokens * token-delay seconds.
+
+    uv run python -m benchmarks.bench_chat_stream_ttft --tokens 200 --token-delay 0.01
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+from langchain_core.language_models import FakeListChatModel
+from loguru import logger
+
+from simple_rag.models.simple_chat_models.raw_chat import RawChat
+from simple_rag.web import create_app
+from simple_rag.web.config import AppSettings
+
+
+class SlowFakeChatModel(FakeListChatModel):
+    """Streams the answer char by char, `sleep` seconds per char, without streaming too."""
+
+    def _call(self, *args, **kwargs) -> str:
+        response = super()._call(*args, **kwargs)
+        time.sleep(len(response) * (self.sleep or 0))
+        return response
+
+
+async def first_token_latency(client: httpx.AsyncClient, chat_id: str) -> float:
+    started = time.perf_counter()
+    payload = {"chat_id": chat_id, "message": "hi"}
+    latency = None
+    async with client.stream("POST", "/chat/message/stream", json=payload) as response:
+        # read the whole stream, so the answer gets into the history
+        async for line in response.aiter_lines():
+            if latency is None and line.startswith("data:"):
+                latency = time.perf_counter() - started
+    return latency
+
+
+async def full_answer_latency(client: httpx.AsyncClient, chat_id: str) -> float:
+    started = time.perf_counter()
+    await client.post("/chat/message", json={"chat_id": chat_id, "message": "hi"})
+    return time.perf_counter() - started
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run(tokens: int, token_delay: float, repeats: int):
+    settings = AppSettings(
+        GROQ_MODEL_NAME="llama3-8b-8192",
+        QNA_FILE_PATH="assets/sample_qna.csv",
+        EMBEDDINGS_WARMUP=False,
+        CONSOLE_LOG_LEVEL="error",
+        vectorstore_cfg={
+            "type": "chroma",
+            "collection_name": "bench_chat_stream_ttft",
+            "persist_directory": tempfile.mkdtemp(),
+        },
+    )
+    app = create_app(settings)
+
+    # a real server: the in-process ASGI transport of httpx buffers the whole response
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    llm = SlowFakeChatModel(responses=["x" * tokens], sleep=token_delay)
+    chat = app.state.ctx.chatManager.create_chat(RawChat(llm, embeddings=None))
+    chat_id = str(chat.id)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        full = [await full_answer_latency(client, chat_id) for _ in range(repeats)]
+        first = [await first_token_latency(client, chat_id) for _ in range(repeats)]
+
+    server.should_exit = True
+    thread.join()
+    return statistics.median(full), statistics.median(first)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    logger.remove()
+    # the LLM client is created on startup but never called
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+
+    full, first = asyncio.run(run(args.tokens, args.token_delay, args.repeats))
+    print(f"answer: {args.tokens} tokens, {args.token_delay * 1000:.0f} ms per token")
+    print(f"/chat/message         first byte: {full * 1000:8.1f} ms (median)")
+    print(f"/chat/message/stream  first token: {first * 1000:7.1f} ms (median)")
+
+
+if __name__ == "__main__":
+    main()
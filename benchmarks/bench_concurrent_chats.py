@@ -0,0 +1,121 @@
+"""
+Load test: many chats send a message at the same time.
+
+Every chat uses a model which takes --delay seconds to answer, like an LLM call.
+All messages are sent concurrently, and /models/ is polled during the load to check
+that the server keeps answering. The test runs with a synchronous model, whose `send`
+is run in a thread per call, and with an async-native model, which holds no thread
+while waiting.
+
+    uv run python -m benchmarks.bench_concurrent_chats --chats 256 --delay 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from loguru import logger
+
+from simple_rag.chats.chat import ChatModel
+from simple_rag.web import create_app
+from simple_rag.web.config import AppSettings
+
+
+class SlowModel(ChatModel):
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def send(self, id, message: str) -> str:
+        time.sleep(self.delay)
+        return message
+
+    def update(self, new_cfg: dict[str, str]):
+        pass
+
+
+class AsyncSlowModel(SlowModel):
+    async def asend(self, id, message: str) -> str:
+        await asyncio.sleep(self.delay)
+        return message
+
+
+async def poll_models(client: httpx.AsyncClient, stop: asyncio.Event) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/models/")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.05)
+    return latencies
+
+
+async def run(
+    model_class: type[SlowModel], chats: int, delay: float
+) -> tuple[float, float]:
+    settings = AppSettings(
+        GROQ_MODEL_NAME="llama3-8b-8192",
+        QNA_FILE_PATH="assets/sample_qna.csv",
+        EMBEDDINGS_WARMUP=False,
+        CONSOLE_LOG_LEVEL="error",
+        vectorstore_cfg={
+            "type": "chroma",
+            "collection_name": "bench_concurrent_chats",
+            "persist_directory": tempfile.mkdtemp(),
+        },
+    )
+    app = create_app(settings)
+    ctx = app.state.ctx
+    await ctx.on_startup()
+
+    chat_ids = [ctx.chatManager.create_chat(model_class(delay)).id for _ in range(chats)]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_models(client, stop))
+
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(
+                client.post(
+                    "/chat/message", json={"chat_id": str(chat_id), "message": "hi"}
+                )
+                for chat_id in chat_ids
+            )
+        )
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        latencies = await poller
+
+    await ctx.on_shutdown()
+
+    assert all(r.status_code == 200 for r in responses)
+    return elapsed, max(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chats", type=int, default=256)
+    parser.add_argument("--delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    logger.remove()
+    # the LLM client is created on startup but never called
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+
+    print(f"chats: {args.chats}, model delay: {args.delay}s")
+    for name, model_class in (("sync", SlowModel), ("async", AsyncSlowModel)):
+        elapsed, models_latency = asyncio.run(run(model_class, args.chats, args.delay))
+        print(
+            f"{name:>5} model: {elapsed:7.2f}s total, "
+            f"{args.chats / elapsed:7.1f} msg/s, "
+            f"max /models/ latency under load {models_latency * 1000:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Rows per second of DBEngine.store_dataframe: row-by-row flush vs bulk insert.
+
+The sample KB is repeated up to the requested number of rows and written
+into a fresh SQLite file for every run.
+
+    uv run python -m benchmarks.bench_db_store_dataframe --rows 200000
+"""
+
+import argparse
+import tempfile
+import time
+
+import pandas as pd
+from loguru import logger
+
+from simple_rag.knowledge_base.store.db_engine import DBEngine
+
+
+def make_df(rows: int) -> pd.DataFrame:
+    sample = pd.read_csv("assets/support_kbase.csv")
+    repeats = rows // len(sample) + 1
+    df = pd.concat([sample] * repeats, ignore_index=True).iloc[:rows]
+    df["Question"] = df["Question"] + " #" + df.index.astype(str)
+    return df
+
+
+def run(df: pd.DataFrame, bulk: bool, chunk_size: int) -> float:
+    _, db_fname = tempfile.mkstemp(suffix=".db")
+    engine = DBEngine(
+        {
+            "db_link": f"sqlite:///{db_fname}",
+            "model_name": "sample_kbase",
+            "bulk_insert": bulk,
+            "bulk_chunk_size": chunk_size,
+        }
+    )
+
+    started = time.perf_counter()
+    _, ids = engine.store_dataframe(df)
+    elapsed = time.perf_counter() - started
+
+    assert len(ids) == len(df)
+    return len(df) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    logger.remove()
+    df = make_df(args.rows)
+
+    row_by_row = run(df, bulk=False, chunk_size=args.chunk_size)
+    bulk = run(df, bulk=True, chunk_size=args.chunk_size)
+
+    print(f"rows:        {len(df)}")
+    print(f"row-by-row:  {row_by_row:12.0f} rows/s")
+    print(f"bulk:        {bulk:12.0f} rows/s  (chunk_size={args.chunk_size})")
+    print(f"speedup:     {bulk / row_by_row:12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
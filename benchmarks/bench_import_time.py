@@ -0,0 +1,72 @@
+"""
+Cold import time of a module, measured with `python -X importtime` in a fresh interpreter.
+
+Prints the total, the slowest imports and which heavy packages got loaded.
+With --budget-ms the script exits with 1 when the import is slower than the budget,
+so it can be used as a regression check.
+
+    uv run python -m benchmarks.bench_import_time --module simple_rag.web --budget-ms 2000
+"""
+
+import argparse
+import subprocess
+import sys
+
+HEAVY_PACKAGES = [
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "langchain",
+    "langchain_community",
+    "langchain_huggingface",
+    "langgraph",
+    "chromadb",
+    "pandas",
+]
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """module -> (self us, cumulative us)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="simple_rag.web")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    times = import_times(args.module)
+    total_ms = times[args.module][1] / 1000
+
+    print(f"import {args.module}: {total_ms:.0f} ms, {len(times)} modules")
+
+    print(f"\nslowest imports (cumulative):")
+    slowest = sorted(times.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (_, cumulative_us) in slowest[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    loaded = [pkg for pkg in HEAVY_PACKAGES if pkg in times]
+    print(f"\nheavy packages loaded: {', '.join(loaded) or 'none'}")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\nFAIL: {total_ms:.0f} ms > budget {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
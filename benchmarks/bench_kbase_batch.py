@@ -0,0 +1,79 @@
+"""
+Throughput of `/kbase/` retrieval for a batch of questions: one `aget_entries_similar_to_problem`
+per question (what N requests to `POST /kbase/` do) vs one `aget_entries_for_problems`
+(`POST /kbase/batch`).
+
+Rows of assets/support_kbase.csv are repeated up to --rows. Embeddings are random, with
+a fixed --embed-ms cost per model call plus a small cost per text, like a local model
+where every call has a fixed overhead. The results cache is cleared between runs.
+
+    uv run python -m benchmarks.bench_kbase_batch --rows 50000 --batch 256
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from loguru import logger
+
+from simple_rag.knowledge_base.store.default_store import Store
+
+
+class SlowEmbeddings(DeterministicFakeEmbedding):
+    call_s: float = 0.0
+    text_s: float = 0.0
+
+    def embed_documents(self, texts):
+        time.sleep(self.call_s + self.text_s * len(texts))
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        time.sleep(self.call_s + self.text_s)
+        return super().embed_query(text)
+
+
+async def one_by_one(store: Store, questions: list[str]):
+    return await asyncio.gather(*(store.aget_entries_similar_to_problem(q) for q in questions))
+
+
+async def batched(store: Store, questions: list[str]):
+    return await store.aget_entries_for_problems(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--embed-ms", type=float, default=5.0)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    logger.remove()
+    kbase = pd.read_csv("assets/support_kbase.csv")
+    df = kbase.iloc[np.arange(args.rows) % len(kbase)].reset_index(drop=True)
+    df["Question"] = df["Question"] + [f" (ticket T-{i})" for i in range(args.rows)]
+
+    embeddings = SlowEmbeddings(size=args.dim)
+    store = Store(vectorstore_cfg={"type": "numpy"}, embeddings=embeddings)
+    store.store_dataframe(df)
+    embeddings.call_s, embeddings.text_s = args.embed_ms / 1000, 0.0002
+
+    questions = [f"problem number {i} with my VM" for i in range(args.batch)]
+    print(f"rows: {args.rows}, batch: {args.batch}, embed call: {args.embed_ms} ms")
+    for name, run in (("one by one", one_by_one), ("batched", batched)):
+        timings = []
+        for _ in range(args.repeats):
+            store.results_cache.clear()
+            started = time.perf_counter()
+            asyncio.run(run(store, questions))
+            timings.append(time.perf_counter() - started)
+        best = min(timings)
+        print(f"{name:<12} {best * 1000:9.1f} ms   {args.batch / best:8.1f} questions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Latency of keyword (FTS5/BM25), vector and hybrid retrieval of a Store in SQLite.
+
+The rows of assets/support_kbase.csv are repeated up to --rows, with a distinct ticket
+number in every question. Embeddings are random (no model files needed), so only
+latencies are meaningful here, not the quality of vector results.
+
+    uv run python -m benchmarks.bench_keyword_search --rows 50000 --queries 200
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from loguru import logger
+
+from simple_rag.knowledge_base.store.default_store import Store
+from simple_rag.knowledge_base.store.entity.default import SampleKBase
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+
+    logger.remove()
+    kbase = pd.read_csv("assets/support_kbase.csv")
+    df = kbase.iloc[np.arange(args.rows) % len(kbase)].reset_index(drop=True)
+    df["Question"] = df["Question"] + [f" (ticket T-{i})" for i in range(args.rows)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = Store(
+            db_cfg={"db_link": f"sqlite:///{tmp}/kb.db", "model_name": "sample_kbase"},
+            vectorstore_cfg={"type": "numpy"},
+            entity=SampleKBase,
+            embeddings=DeterministicFakeEmbedding(size=args.dim),
+        )
+        store.store_dataframe(df)
+
+        rng = np.random.default_rng(0)
+        queries = [f"T-{i}" for i in rng.integers(args.rows, size=args.queries // 2)]
+        queries += kbase["Question"].sample(args.queries - len(queries), replace=True, random_state=0).tolist()
+
+        print(f"rows: {args.rows}, queries: {len(queries)}")
+        for mode in ("keyword", "vector", "hybrid"):
+            timings = []
+            for query in queries:
+                started = time.perf_counter()
+                if mode == "vector":
+                    store.vectorizer.similarity_search(
+                        query, {"k": 4, "filter": {"_version": store.version}}
+                    )
+                else:
+                    store.hybrid_search(query, k=4, mode=mode)
+                timings.append(time.perf_counter() - started)
+            timings = np.array(timings) * 1000
+            print(
+                f"{mode:<8} p50 {np.percentile(timings, 50):8.3f} ms   "
+                f"p95 {np.percentile(timings, 95):8.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Overhead of the latency instrumentation: a `timed` call vs a plain call of a no-op
+function, from one thread and from --threads threads sharing the histogram lock, and
+the time to render the histograms for a scrape.
+
+    uv run python -m benchmarks.bench_latency_overhead --calls 200000 --threads 8
+"""
+
+import argparse
+import threading
+import time
+
+from simple_rag.metrics.latency import STAGE_SECONDS, render_prometheus, set_model_label, timed
+
+
+def noop():
+    return None
+
+
+def per_call_ns(func, calls: int, threads: int) -> float:
+    per_thread = calls // threads
+
+    def work():
+        set_model_label("bench")
+        for _ in range(per_thread):
+            func()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - started) / (per_thread * threads) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    instrumented = timed("bench")(noop)
+    print(f"calls: {args.calls}, ns per call")
+    print(f"{'threads':>8}{'plain':>10}{'timed':>10}{'overhead':>10}")
+    for threads in (1, args.threads):
+        plain = per_call_ns(noop, args.calls, threads)
+        with_timing = per_call_ns(instrumented, args.calls, threads)
+        print(f"{threads:8}{plain:10.0f}{with_timing:10.0f}{with_timing - plain:10.0f}")
+
+    # a realistic number of series: 20 stages x 10 models
+    for stage in range(20):
+        for model in range(10):
+            STAGE_SECONDS.observe(0.01, f"stage_{stage}", f"model_{model}")
+    started = time.perf_counter()
+    text = render_prometheus()
+    print(f"render of {len(text.splitlines())} lines: {(time.perf_counter() - started) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
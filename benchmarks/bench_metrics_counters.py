@@ -0,0 +1,84 @@
+"""
+Cost of counting a `/kbase/` request: a commit per request (the previous
+read-modify-write, and the UPSERT of `add_metrics`), vs `MetricCounters.increment` with one flush
+at the end. --threads threads count concurrently, as the db executor did; lost
+increments are the expected total minus what the database holds.
+
+    uv run python -m benchmarks.bench_metrics_counters --requests 2000 --threads 8
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from simple_rag.metrics import add_metrics, get_metrics, kbase_metric
+from simple_rag.metrics.counters import MetricCounters
+from simple_rag.metrics.kbase_metric import KBaseMetric
+
+
+def read_modify_write(db: Session, endpoint: str, model_name: str):
+    metric = db.query(KBaseMetric).filter_by(endpoint=endpoint, model_name=model_name).first()
+    if metric:
+        metric.count += 1
+    else:
+        db.add(KBaseMetric(endpoint=endpoint, model_name=model_name, count=1))
+    db.commit()
+
+
+def run(name: str, count, requests: int, threads: int, finish=lambda: None):
+    per_thread = requests // threads
+
+    def work():
+        with kbase_metric.SessionLocal() as db:
+            for _ in range(per_thread):
+                count(db)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    finish()
+    elapsed = time.perf_counter() - started
+
+    with kbase_metric.SessionLocal() as db:
+        _, total = get_metrics(db)
+    lost = per_thread * threads - total
+    print(f"{name:<20}{elapsed / (per_thread * threads) * 1e6:14.1f}{lost:8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"requests: {args.requests}, threads: {args.threads}")
+    print(f"{'mode':<20}{'us/request':>14}{'lost':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("read-modify-write", "upsert", "buffered"):
+            # the previous schema had no unique index
+            kbase_metric.init_db(f"sqlite:///{tmp}/{name}.db")
+            if name == "read-modify-write":
+                with kbase_metric.get_engine().begin() as connection:
+                    connection.exec_driver_sql("DROP INDEX metrics_endpoint_model_name")
+                run(name, lambda db: read_modify_write(db, "/kbase/", "m"), args.requests, args.threads)
+            elif name == "upsert":
+                run(name, lambda db: add_metrics(db, {("/kbase/", "m"): 1}), args.requests, args.threads)
+            else:
+                counters = MetricCounters()
+                run(
+                    name,
+                    lambda db: counters.increment("/kbase/", "m"),
+                    args.requests,
+                    args.threads,
+                    finish=counters.flush,
+                )
+
+
+if __name__ == "__main__":
+    main()
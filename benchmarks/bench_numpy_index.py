@@ -0,0 +1,78 @@
+"""
+Search latency of the in-memory vector indexes on a synthetic knowledge base:
+exact NumPy search, or the FAISS HNSW index with --backend faiss.
+
+Rows are random vectors split into two versions, like a KB right after a new version
+was stored and before the old one was deleted; every query filters on the live
+version, as `Store` does.
+
+    uv run python -m benchmarks.bench_numpy_index --rows 100000 --dim 768
+    uv run --extra faiss python -m benchmarks.bench_numpy_index --backend faiss --ef-search 64
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from simple_rag.knowledge_base.store.numpy_index import NumpyVectorStore
+
+
+class NoEmbeddings:
+    """Vectors are added directly, the model is never called."""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--backend", choices=["numpy", "faiss"], default="numpy")
+    parser.add_argument("--ef-search", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.backend == "faiss":
+        from simple_rag.knowledge_base.store.faiss_index import FaissVectorStore
+
+        store = FaissVectorStore(NoEmbeddings(), ef_search=args.ef_search)
+    else:
+        store = NumpyVectorStore(NoEmbeddings())
+
+    started = time.perf_counter()
+    for start in range(0, args.rows, args.batch):
+        size = min(args.batch, args.rows - start)
+        store.add_vectors(
+            rng.standard_normal((size, args.dim), dtype=np.float32),
+            [f"row {start + i}" for i in range(size)],
+            [
+                {"_version": 1 + 2 * (start + i) // args.rows, "_db_id": start + i}
+                for i in range(size)
+            ],
+        )
+    build_s = time.perf_counter() - started
+
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        store.similarity_search_with_score_by_vector(
+            query, k=args.k, filter={"_version": 2}
+        )
+        timings.append(time.perf_counter() - started)
+
+    timings = np.array(timings) * 1000
+    print(f"backend: {args.backend}, rows: {args.rows}, dim: {args.dim}, k: {args.k}")
+    print(f"build:  {build_s:8.2f} s")
+    print(f"search p50: {np.percentile(timings, 50):6.2f} ms")
+    print(f"search p95: {np.percentile(timings, 95):6.2f} ms")
+
+    started = time.perf_counter()
+    store.delete(where={"_version": {"$lt": 2}})
+    print(f"delete old version: {(time.perf_counter() - started) * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Recall@k, search latency and index memory of projected vectors, per target dimension.
+
+The rows of assets/support_kbase.csv are embedded and scaled up synthetically to
+--rows vectors: every synthetic row is a random mix of two KB rows plus a little
+noise. Queries are the KB questions. Recall@k is measured against exact search over
+the full-size vectors; the NumPy index is searched with the projected ones.
+
+By default the real sentence-transformers model is used. --fake uses random vectors
+with a decaying spectrum (most of the variance in a few dozen directions, like real
+embeddings), so the benchmark runs without the model files. Truncation only keeps
+recall for Matryoshka-trained models, which the default model is not.
+
+    uv run python -m benchmarks.bench_projection --rows 100000 --dims 512,384,256,128,64
+"""
+
+import argparse
+import hashlib
+import time
+
+import numpy as np
+import pandas as pd
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from simple_rag.knowledge_base.store.numpy_index import NumpyVectorStore, normalize_rows
+from simple_rag.knowledge_base.store.projection import make_projection
+from simple_rag.knowledge_base.store.vectorizer import default_doc_transform
+
+
+class SpectrumEmbeddings(Embeddings):
+    def __init__(self, dim: int = 768):
+        rng = np.random.default_rng(0)
+        axes, _ = np.linalg.qr(rng.standard_normal((dim, dim)))
+        self.basis = axes.T * (1.0 / np.arange(1, dim + 1))[:, None]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        weights = np.random.default_rng(seed).standard_normal(len(self.basis))
+        return (weights @ self.basis).tolist()
+
+
+def search(vectors: np.ndarray, queries: np.ndarray, k: int):
+    store = NumpyVectorStore(None)
+    store.add_vectors(
+        vectors, [str(i) for i in range(len(vectors))], [{"_version": 1}] * len(vectors)
+    )
+    timings, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        docs = store.similarity_search_with_score_by_vector(query, k=k, filter={"_version": 1})
+        timings.append(time.perf_counter() - started)
+        results.append({int(d.page_content) for d, _ in docs})
+    return store.memory_bytes(), np.array(timings) * 1000, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dims", default="512,384,256,128,64")
+    parser.add_argument("--fake", action="store_true")
+    args = parser.parse_args()
+
+    logger.remove()
+    if args.fake:
+        model = SpectrumEmbeddings()
+    else:
+        from simple_rag.embeddings import make_embeddings
+
+        model = make_embeddings(cache_path=None, query_cache_size=0)
+
+    df = pd.read_csv("assets/support_kbase.csv")
+    texts = [default_doc_transform(row).page_content for row in df.to_dict("records")]
+    base = normalize_rows(np.array(model.embed_documents(texts)))
+    questions = normalize_rows(np.array(model.embed_documents(df["Question"].tolist())))
+
+    rng = np.random.default_rng(0)
+    mix = rng.uniform(0, 1, (args.rows, 1))
+    vectors = normalize_rows(
+        mix * base[rng.integers(len(base), size=args.rows)]
+        + (1 - mix) * base[rng.integers(len(base), size=args.rows)]
+        + rng.normal(0, 0.1 / np.sqrt(base.shape[1]), (args.rows, base.shape[1]))
+    )
+    queries = questions[rng.integers(len(questions), size=args.queries)]
+
+    memory, timings, exact = search(vectors, queries, args.k)
+    print(f"rows: {args.rows}, dim: {base.shape[1]}, k: {args.k}, queries: {args.queries}")
+    print(f"{'projection':<16}{'MiB':>8}{'p50 ms':>9}{'recall':>9}")
+    print(f"{'none':<16}{memory / 2**20:8.1f}{np.percentile(timings, 50):9.2f}{1.0:9.3f}")
+
+    for dim in (int(d) for d in args.dims.split(",")):
+        for name in ("pca", "truncate"):
+            projection = make_projection(name, dim).fit(vectors)
+            memory, timings, found = search(
+                projection.transform(vectors), projection.transform(queries), args.k
+            )
+            recall = sum(len(e & f) for e, f in zip(exact, found)) / (args.k * len(queries))
+            print(
+                f"{f'{name} {dim}':<16}"
+                f"{memory / 2**20:8.1f}"
+                f"{np.percentile(timings, 50):9.2f}"
+                f"{recall:9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Peak RSS of loading a large QnA file and latency of answer lookups: the in-memory
+`SimpleQna` (QNA_DB_PATH unset) vs the SQLite-backed `SqliteQnA`.
+
+A synthetic QnA file with --rows rows (two answers per question) is generated, then
+every mode is run in a fresh process, so peak RSS is not shared between them. The
+SQLite database is built from scratch (a cold start) and then reused (a warm start).
+
+    uv run python -m benchmarks.bench_qna_memory --rows 2000000
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def make_qna_file(path: Path, rows: int):
+    with open(path, "w") as f:
+        f.write("Вопрос;Ответ\n")
+        for i in range(rows):
+            f.write(
+                f"How do I fix problem number {i // 2} with my virtual machine?;"
+                f"Answer {i}: restart the VM, check the network settings and "
+                "contact support if the problem persists.\n"
+            )
+
+
+def run(label: str, qna_path: str, db_path: str, lookups: int, hot_set: int):
+    from simple_rag.models.qna_rag.parser.csv_parser import QnAFileParser
+
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    parser = QnAFileParser(qna_path)
+    if label == "memory":
+        qna = parser.parse_qna()
+    else:
+        qna = parser.parse_qna_to_sqlite(db_path, hot_set_size=hot_set)
+    load_s = time.perf_counter() - started
+    peak_mib = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss) / 1024
+
+    questions = list(qna.get_questions())
+    rng = np.random.default_rng(0)
+    batches = [[questions[i] for i in rng.integers(len(questions), size=4)] for _ in range(lookups)]
+    timings = []
+    for batch in batches:
+        started = time.perf_counter()
+        qna.lookup_answers(batch)
+        timings.append(time.perf_counter() - started)
+    print(
+        f"{label:<14}{load_s:9.2f}{peak_mib:12.1f}"
+        f"{np.percentile(np.array(timings) * 1000, 50):12.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--hot-set", type=int, default=1024)
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    parser.add_argument("--qna-path", help=argparse.SUPPRESS)
+    parser.add_argument("--db-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        from loguru import logger
+
+        logger.remove()
+        run(args.run, args.qna_path, args.db_path, args.lookups, args.hot_set)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        qna_path, db_path = Path(tmp) / "qna.csv", Path(tmp) / "qna.db"
+        make_qna_file(qna_path, args.rows)
+        print(f"rows: {args.rows}, file: {qna_path.stat().st_size / 2**20:.0f} MiB")
+        # peak RSS is measured on top of the interpreter and imports
+        print(f"{'mode':<14}{'load s':>9}{'peak MiB':>12}{'lookup ms':>12}")
+        for mode in ("memory", "sqlite cold", "sqlite warm"):
+            subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--run",
+                    mode,
+                    "--qna-path",
+                    str(qna_path),
+                    "--db-path",
+                    str(db_path),
+                    "--lookups",
+                    str(args.lookups),
+                    "--hot-set",
+                    str(args.hot_set),
+                ],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
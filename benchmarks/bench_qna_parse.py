@@ -0,0 +1,119 @@
+"""
+Parse time and peak RSS of `QnAFileParser.parse_qna` on a large QnA file: the previous
+parser (whole file with `read_csv`, then `iterrows`) vs the chunked one, on CSV and
+Parquet input, and the chunked one loading into SQLite (`QNA_DB_PATH`), where only a
+chunk is in memory at a time.
+
+Every mode runs in a fresh process, so peak RSS is not shared between them.
+
+    uv run python -m benchmarks.bench_qna_parse --rows 2000000
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+
+def make_qna_file(path: Path, rows: int):
+    with open(path, "w") as f:
+        f.write("Вопрос;Ответ\n")
+        for i in range(rows):
+            f.write(
+                f"How do I fix problem number {i // 2} with my virtual machine?;"
+                f"Answer {i}: restart the VM, check the network settings and "
+                "contact support if the problem persists.\n"
+            )
+
+
+def write_parquet(csv_path: Path, parquet_path: Path, chunk_rows: int):
+    # in chunks: peak RSS of this process is inherited by the measured ones
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    for chunk in pd.read_csv(csv_path, delimiter=";", chunksize=chunk_rows):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        writer = writer or pq.ParquetWriter(parquet_path, table.schema)
+        writer.write_table(table)
+    writer.close()
+
+
+def parse_with_iterrows(path: str) -> dict:
+    df = pd.read_csv(path, delimiter=";")
+    db = {}
+    for _, row in df.iterrows():
+        db.setdefault(row["Вопрос"], []).append(row["Ответ"])
+    return db
+
+
+def run(mode: str, path: str, chunk_rows: int):
+    from simple_rag.models.qna_rag.parser.csv_parser import QnAFileParser
+
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    if mode == "iterrows csv":
+        questions = len(parse_with_iterrows(path))
+    elif mode.startswith("sqlite"):
+        db_path = Path(path).with_suffix(".db")
+        db_path.unlink(missing_ok=True)
+        questions = len(QnAFileParser(path, chunk_rows=chunk_rows).parse_qna_to_sqlite(db_path))
+    else:
+        questions = len(QnAFileParser(path, chunk_rows=chunk_rows).parse_qna().db)
+    elapsed = time.perf_counter() - started
+
+    peak_mib = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss) / 1024
+    print(f"{mode:<16}{elapsed:9.2f}{peak_mib:12.1f}{questions:12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        from loguru import logger
+
+        logger.remove()
+        run(args.run, args.path, args.chunk_rows)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, parquet_path = Path(tmp) / "qna.csv", Path(tmp) / "qna.parquet"
+        make_qna_file(csv_path, args.rows)
+        write_parquet(csv_path, parquet_path, args.chunk_rows)
+        print(f"rows: {args.rows}, chunk rows: {args.chunk_rows}")
+        # the dict of parsed questions is included in peak RSS of every mode
+        print(f"{'mode':<16}{'parse s':>9}{'peak MiB':>12}{'questions':>12}")
+        for mode, path in (
+            ("iterrows csv", csv_path),
+            ("chunked csv", csv_path),
+            ("chunked parquet", parquet_path),
+            ("sqlite csv", csv_path),
+            ("sqlite parquet", parquet_path),
+        ):
+            subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--run",
+                    mode,
+                    "--path",
+                    str(path),
+                    "--chunk-rows",
+                    str(args.chunk_rows),
+                ],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
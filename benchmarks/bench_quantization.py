@@ -0,0 +1,107 @@
+"""
+Recall@k, search latency and memory of quantized vector storage vs exact float32 search.
+
+The rows of assets/support_kbase.csv are embedded and scaled up synthetically to
+--rows vectors: every synthetic row is a KB row vector plus gaussian noise (a
+paraphrase of it). Queries are the KB questions, with noise as well. Recall@k is
+measured against exact float32 search over the same vectors. By default the real
+sentence-transformers model is used; --fake uses random vectors, so the benchmark
+runs without the model files.
+
+    uv run python -m benchmarks.bench_quantization --rows 100000 --k 10
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from loguru import logger
+
+from simple_rag.knowledge_base.store.numpy_index import NumpyVectorStore, normalize_rows
+from simple_rag.knowledge_base.store.vectorizer import default_doc_transform
+
+CONFIGS = [
+    {"quantization": "float32"},
+    {"quantization": "float16"},
+    {"quantization": "int8"},
+    {"quantization": "float32", "binary_prefilter": True, "rescore_factor": 10},
+    {"quantization": "float16", "binary_prefilter": True, "rescore_factor": 10},
+    {"quantization": "int8", "binary_prefilter": True, "rescore_factor": 10},
+    {"quantization": "int8", "binary_prefilter": True, "rescore_factor": 50},
+]
+
+
+def describe(config: dict) -> str:
+    name = config["quantization"]
+    if config.get("binary_prefilter"):
+        name += f" + binary x{config['rescore_factor']}"
+    return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.5)
+    parser.add_argument("--fake", action="store_true")
+    args = parser.parse_args()
+
+    logger.remove()
+    if args.fake:
+        model = DeterministicFakeEmbedding(size=768)
+    else:
+        from simple_rag.embeddings import make_embeddings
+
+        model = make_embeddings(cache_path=None, query_cache_size=0)
+
+    df = pd.read_csv("assets/support_kbase.csv")
+    texts = [default_doc_transform(row).page_content for row in df.to_dict("records")]
+    base = normalize_rows(np.array(model.embed_documents(texts)))
+    questions = normalize_rows(np.array(model.embed_documents(df["Question"].tolist())))
+    dim = base.shape[1]
+
+    rng = np.random.default_rng(0)
+    # noise per dimension, so that its norm relative to a unit vector is --noise
+    sigma = args.noise / np.sqrt(dim)
+    vectors = normalize_rows(
+        base[rng.integers(len(base), size=args.rows)]
+        + rng.normal(0, sigma, (args.rows, dim))
+    )
+    queries = normalize_rows(
+        questions[rng.integers(len(questions), size=args.queries)]
+        + rng.normal(0, sigma, (args.queries, dim))
+    )
+    exact = [set(np.argsort(-(vectors @ q))[: args.k]) for q in queries]
+
+    print(f"rows: {args.rows}, dim: {dim}, k: {args.k}, queries: {args.queries}")
+    print(f"{'storage':<28}{'MiB':>8}{'p50 ms':>9}{'p95 ms':>9}{'recall':>9}")
+    texts = [str(i) for i in range(args.rows)]
+    metadatas = [{"_version": 1}] * args.rows
+    for config in CONFIGS:
+        store = NumpyVectorStore(model, **config)
+        store.add_vectors(vectors, texts, metadatas, normalized=True)
+
+        timings, found = [], 0
+        for query, expected in zip(queries, exact):
+            started = time.perf_counter()
+            docs = store.similarity_search_with_score_by_vector(
+                query, k=args.k, filter={"_version": 1}
+            )
+            timings.append(time.perf_counter() - started)
+            found += len(expected & {int(d.page_content) for d, _ in docs})
+
+        timings = np.array(timings) * 1000
+        print(
+            f"{describe(config):<28}"
+            f"{store.memory_bytes() / 2**20:8.1f}"
+            f"{np.percentile(timings, 50):9.2f}"
+            f"{np.percentile(timings, 95):9.2f}"
+            f"{found / (args.k * len(queries)):9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+CPU time per request spent on query embeddings, with and without the in-memory memo.
+
+A request embeds its query --encodes-per-request times (semantic cache, every KB model,
+retries). Queries are drawn from a pool of --distinct queries, like repeated support
+questions. By default the real sentence-transformers model is used; --fake replaces it
+with a CPU-bound stand-in, so the benchmark runs without the model files.
+
+    uv run python -m benchmarks.bench_query_embedding_cache --requests 500 --distinct 50
+"""
+
+import argparse
+import hashlib
+import random
+import time
+
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from simple_rag.cache.embeddings import QueryMemoEmbeddings
+
+
+class BusyEmbeddings(Embeddings):
+    """Burns CPU like a small encoder would."""
+
+    def __init__(self, rounds: int = 20_000):
+        self.rounds = rounds
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        digest = text.encode()
+        for _ in range(self.rounds):
+            digest = hashlib.sha256(digest).digest()
+        return [b / 255 for b in digest] * 24
+
+
+def run(model: Embeddings, queries: list[str], encodes_per_request: int) -> float:
+    started = time.process_time()
+    for query in queries:
+        for _ in range(encodes_per_request):
+            model.embed_query(query)
+    return (time.process_time() - started) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--distinct", type=int, default=50)
+    parser.add_argument("--encodes-per-request", type=int, default=3)
+    parser.add_argument("--memo-size", type=int, default=4096)
+    parser.add_argument("--fake", action="store_true")
+    args = parser.parse_args()
+
+    logger.remove()
+    if args.fake:
+        model = BusyEmbeddings()
+    else:
+        from simple_rag.embeddings import make_embeddings
+
+        model = make_embeddings(cache_path=None, query_cache_size=0)
+
+    pool = [f"how do I fix problem number {i}?" for i in range(args.distinct)]
+    random.seed(0)
+    queries = [random.choice(pool) for _ in range(args.requests)]
+
+    plain = run(model, queries, args.encodes_per_request)
+    memo = QueryMemoEmbeddings(model, max_entries=args.memo_size)
+    memoized = run(memo, queries, args.encodes_per_request)
+
+    print(
+        f"requests: {args.requests}, distinct queries: {args.distinct}, "
+        f"encodes per request: {args.encodes_per_request}"
+    )
+    print(f"no memo:  {plain * 1000:8.2f} ms CPU per request")
+    print(f"memo:     {memoized * 1000:8.2f} ms CPU per request")
+    print(f"saved:    {(plain - memoized) * 1000:8.2f} ms CPU per request")
+    print(f"memo stats: {memo.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Per-query cost of turning search results into records, and of `Store.get`, as the KB
+grows: DataFrame scans (`df["_id"].isin(ids)` + `to_dict`, boolean mask + `apply`)
+vs `RecordIndex`.
+
+Rows of assets/support_kbase.csv are repeated up to every size in --rows, with a
+distinct question per row. Every query hydrates --k random ids.
+
+    uv run python -m benchmarks.bench_record_hydration --rows 1000,10000,100000,1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from simple_rag.knowledge_base.store.record_index import RecordIndex
+
+
+def scan_hydrate(df: pd.DataFrame, ids) -> list[dict]:
+    return df[df["_id"].isin(set(ids))].to_dict(orient="records")
+
+
+def scan_get(df: pd.DataFrame, column: str, value) -> list[dict]:
+    return (
+        df[df[column] == value]
+        .drop(columns=["_id"], axis=1)
+        .apply(lambda x: x.to_dict(), axis=1)
+        .tolist()
+    )
+
+
+def per_query_us(fn, args: list) -> float:
+    started = time.perf_counter()
+    for arg in args:
+        fn(*arg)
+    return (time.perf_counter() - started) / len(args) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", default="1000,10000,100000,1000000")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    kbase = pd.read_csv("assets/support_kbase.csv")
+    rng = np.random.default_rng(0)
+    print(f"k: {args.k}, per query, microseconds")
+    print(f"{'rows':>9}{'scan hydrate':>14}{'index hydrate':>15}{'scan get':>12}{'index get':>12}{'build s':>9}")
+
+    for rows in (int(r) for r in args.rows.split(",")):
+        df = kbase.iloc[np.arange(rows) % len(kbase)].reset_index(drop=True)
+        df["Question"] = df["Question"] + [f" #{i}" for i in range(rows)]
+        df.insert(0, "_id", np.arange(rows) + 1)
+
+        started = time.perf_counter()
+        index = RecordIndex(df, ["Question"])
+        build_s = time.perf_counter() - started
+
+        id_queries = [(rng.integers(1, rows + 1, size=args.k).tolist(),) for _ in range(args.queries)]
+        get_queries = [("Question", df["Question"].iat[i]) for i in rng.integers(rows, size=args.queries)]
+        # scans are slow on large KBs, fewer queries are enough to time them
+        scan_count = max(5, args.queries * 1000 // rows)
+
+        print(
+            f"{rows:9}"
+            f"{per_query_us(lambda ids: scan_hydrate(df, ids), id_queries[:scan_count]):14.1f}"
+            f"{per_query_us(index.records_for_ids, id_queries):15.1f}"
+            f"{per_query_us(lambda c, v: scan_get(df, c, v), get_queries[:scan_count]):12.1f}"
+            f"{per_query_us(index.lookup, get_queries):12.1f}"
+            f"{build_s:9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
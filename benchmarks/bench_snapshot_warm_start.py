@@ -0,0 +1,88 @@
+"""
+Cold start of an in-memory store: embedding all rows vs loading a snapshot.
+
+Rows are synthetic support tickets, the embeddings model is a CPU-bound stand-in
+(--rounds of hashing per text), so the benchmark runs without the model files.
+
+    uv run python -m benchmarks.bench_snapshot_warm_start --rows 20000 --dim 768
+"""
+
+import argparse
+import hashlib
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from simple_rag.knowledge_base.store.default_store import Store
+
+
+class BusyEmbeddings(Embeddings):
+    model_name = "busy-embeddings"
+
+    def __init__(self, dim: int, rounds: int):
+        self.dim = dim
+        self.rounds = rounds
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        digest = text.encode()
+        for _ in range(self.rounds):
+            digest = hashlib.sha256(digest).digest()
+        seed = int.from_bytes(digest[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).tolist()
+
+
+def make_store(embeddings: Embeddings, **kwargs) -> Store:
+    return Store(vectorstore_cfg={"type": "numpy"}, embeddings=embeddings, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--rounds", type=int, default=2_000)
+    args = parser.parse_args()
+
+    logger.remove()
+    embeddings = BusyEmbeddings(args.dim, args.rounds)
+    df = pd.DataFrame(
+        {
+            "Question": [f"question {i}" for i in range(args.rows)],
+            "Description": [f"description of ticket {i}" for i in range(args.rows)],
+            "Solution": [f"solution {i}" for i in range(args.rows)],
+        }
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/snapshot"
+
+        started = time.perf_counter()
+        store = make_store(embeddings)
+        store.store_dataframe(df)
+        cold_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        store.export_snapshot(path)
+        export_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        warm = make_store(embeddings, snapshot_path=path)
+        warm_s = time.perf_counter() - started
+
+        query = "question 42"
+        assert warm.get_entries_similar_to_problem(query) == store.get_entries_similar_to_problem(query)
+
+    print(f"rows: {args.rows}, dim: {args.dim}")
+    print(f"embed all rows:  {cold_s:8.2f} s")
+    print(f"export snapshot: {export_s:8.2f} s")
+    print(f"load snapshot:   {warm_s:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+embeddings.py - Persistent, content-addressed cache for embedding vectors.
+
+`CachedEmbeddings` wraps any langchain `Embeddings` object. Vectors are keyed by
+(model name, kind, hash of the normalized text) and kept in a local SQLite file,
+so re-embedding a text that was already seen costs one indexed lookup instead of
+a forward pass of the model. This holds across restarts and across every vector
+store that shares the wrapper.
+
+The cache is bounded by `max_entries`; the least recently used entries are evicted.
+Hits don't write to SQLite: their `last_used` times are buffered and written with the
+next insert, every `touch_flush_interval_s`, or once `_TOUCH_FLUSH_ENTRIES` pile up.
+
+`QueryMemoEmbeddings` is an in-memory memo for query vectors in front of it, so
+repeated queries skip even the SQLite lookup.
+
+`embed_queries` / `aembed_queries` embed many queries at once. They give the vectors of
+`embed_query`, which asymmetric models compute differently from `embed_documents`, and
+the wrappers here batch them through their caches.
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables.config import run_in_executor
+from loguru import logger
+
+from simple_rag.cache.lru import LRUCache
+
+# SQLite limits the number of bound parameters per statement
+_SQL_CHUNK = 500
+# buffered `last_used` times written at once
+_TOUCH_FLUSH_ENTRIES = 1024
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC + collapsed whitespace. Texts equal after normalization share a vector."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def embed_queries(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    """`embed_query` of every text, batched if `embeddings` has `embed_queries`."""
+    batched = getattr(embeddings, "embed_queries", None)
+    if batched is not None:
+        return batched(texts)
+    return [embeddings.embed_query(text) for text in texts]
+
+
+async def aembed_queries(embeddings: Embeddings, texts: list[str]) -> list[list[float]]:
+    batched = getattr(embeddings, "aembed_queries", None)
+    if batched is not None:
+        return await batched(texts)
+    return list(await asyncio.gather(*(embeddings.aembed_query(text) for text in texts)))
+
+
+class CachedEmbeddings(Embeddings):
+    underlying: Embeddings
+    model_name: str
+    max_entries: int
+    hits: int
+    misses: int
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        path: str,
+        max_entries: int = 500_000,
+        touch_flush_interval_s: float = 30.0,
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.touch_flush_interval_s = touch_flush_interval_s
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        # key -> `last_used` of hits not written yet
+        self._touched: dict[bytes, int] = {}
+        self._touches_flushed_at = time.monotonic()
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)"
+        )
+        self._db.commit()
+        self._size = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        logger.debug(f"CachedEmbeddings: {path=}, {self._size} entries")
+
+    def _key(self, kind: str, text: str) -> bytes:
+        payload = f"{self.model_name}\0{kind}\0{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).digest()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed("doc", texts, self.underlying.embed_documents)
+
+    def embed_query(self, text: str) -> list[float]:
+        [vector] = self._embed(
+            "query", [text], lambda texts: [self.underlying.embed_query(texts[0])]
+        )
+        return vector
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return self._embed("query", texts, lambda missing: embed_queries(self.underlying, missing))
+
+    async def aembed_queries(self, texts: list[str]) -> list[list[float]]:
+        return await run_in_executor(None, self.embed_queries, texts)
+
+    def _embed(self, kind: str, texts: list[str], compute) -> list[list[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        found = self._lookup(set(keys))
+
+        # every distinct missing text is embedded once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        hits = sum(1 for key in keys if key in found)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        if missing:
+            vectors = np.asarray(compute(list(missing.values())), dtype=np.float32)
+            self._save(dict(zip(missing.keys(), vectors)))
+            # round-trip through float32, so a miss returns exactly what a later hit will
+            found.update(zip(missing.keys(), vectors.tolist()))
+
+        return [list(found[key]) for key in keys]
+
+    def _lookup(self, keys: set[bytes]) -> dict[bytes, list[float]]:
+        found = {}
+        keys = list(keys)
+        now = time.time_ns()
+
+        with self._lock:
+            for start in range(0, len(keys), _SQL_CHUNK):
+                chunk = keys[start : start + _SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                    self._touched[key] = now
+
+            if len(self._touched) >= _TOUCH_FLUSH_ENTRIES or (
+                self._touched
+                and time.monotonic() - self._touches_flushed_at >= self.touch_flush_interval_s
+            ):
+                self._flush_touches()
+                self._db.commit()
+
+        return found
+
+    def _flush_touches(self):
+        """Writes the buffered `last_used` times, the caller holds the lock and commits."""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, key) for key, now in self._touched.items()],
+            )
+            self._touched = {}
+        self._touches_flushed_at = time.monotonic()
+
+    def _save(self, vectors: dict[bytes, np.ndarray]):
+        now = time.time_ns()
+        rows = [(key, vector.tobytes(), now) for key, vector in vectors.items()]
+
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._size += self._db.total_changes - before
+            # eviction must see the recent hits
+            self._flush_touches()
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        excess = self._size - self.max_entries
+        if excess <= 0:
+            return
+
+        # evict a bit more than needed, so we don't run this on every insert
+        excess += self.max_entries // 20
+        self._db.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._size = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        logger.debug(f"CachedEmbeddings: evicted entries, {self._size} left")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": self._size,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_touches()
+            self._db.commit()
+            self._db.close()
+
+
+class QueryMemoEmbeddings(Embeddings):
+    """
+    In-memory LRU memo of `embed_query` results.
+
+    A query is often embedded several times per request: by the semantic cache, by every
+    KB model and vector store, and again on retries. With one wrapper shared by every
+    vector store in the process, the query is encoded once. Documents are passed through.
+    """
+
+    underlying: Embeddings
+    memo: LRUCache
+
+    def __init__(self, underlying: Embeddings, max_entries: int = 4096):
+        self.underlying = underlying
+        self.memo = LRUCache(max_entries)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.underlying.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.underlying.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        key = normalize_text(text)
+        vector = self.memo.get(key)
+        if vector is None:
+            vector = tuple(self.underlying.embed_query(text))
+            self.memo.put(key, vector)
+        return list(vector)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        key = normalize_text(text)
+        vector = self.memo.get(key)
+        if vector is None:
+            vector = tuple(await self.underlying.aembed_query(text))
+            self.memo.put(key, vector)
+        return list(vector)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        found, missing = self._recall(texts)
+        if missing:
+            self._remember(missing, embed_queries(self.underlying, list(missing.values())), found)
+        return [list(found[normalize_text(text)]) for text in texts]
+
+    async def aembed_queries(self, texts: list[str]) -> list[list[float]]:
+        found, missing = self._recall(texts)
+        if missing:
+            vectors = await aembed_queries(self.underlying, list(missing.values()))
+            self._remember(missing, vectors, found)
+        return [list(found[normalize_text(text)]) for text in texts]
+
+    def _recall(self, texts: list[str]) -> tuple[dict[str, tuple], dict[str, str]]:
+        """Memoized vectors by key, and one text per key that has none."""
+        found, missing = {}, {}
+        for text in texts:
+            key = normalize_text(text)
+            if key in found or key in missing:
+                continue
+            vector = self.memo.get(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                found[key] = vector
+        return found, missing
+
+    def _remember(self, missing: dict[str, str], vectors: list[list[float]], found: dict):
+        for key, vector in zip(missing, vectors):
+            found[key] = tuple(vector)
+            self.memo.put(key, found[key])
+
+    def stats(self) -> dict:
+        return self.memo.stats()
@@ -0,0 +1,258 @@
+"""
+semantic.py - Answer cache keyed by the meaning of the question.
+
+Support questions repeat a lot, with slightly different wording. `SemanticCache`
+stores generated answers together with the embedding of the question. A new question
+is a hit when its embedding is close enough (cosine similarity >= `threshold`) to a
+cached one, so retrieval and generation are skipped.
+
+Entries are scoped by (model, KB version): a model never gets answers of another
+model, and once a model reports a new KB version, the entries of its older versions
+are dropped. Entries expire after `ttl_s` seconds, the least recently used entries
+are evicted when the cache is full.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Optional, TypeVar
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from simple_rag.cache.embeddings import aembed_queries
+
+Scope = tuple[str, Hashable]  # (model name, KB version)
+T = TypeVar("T")
+
+
+@dataclass
+class _Entry:
+    scope: Scope
+    question: str
+    vector: np.ndarray  # normalized
+    answer: Any
+    expires_at: float
+
+
+class SemanticCache:
+    embeddings: Embeddings
+    threshold: float
+    ttl_s: float
+    max_entries: int
+    hits: int
+    misses: int
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        threshold: float = 0.95,
+        ttl_s: float = 3600,
+        max_entries: int = 1000,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._next_key = 0
+        # model -> current KB version
+        self._versions: dict[str, Hashable] = {}
+
+    def embed(self, question: str) -> np.ndarray:
+        return _normalize(self.embeddings.embed_query(question))
+
+    async def aembed(self, question: str) -> np.ndarray:
+        return _normalize(await self.embeddings.aembed_query(question))
+
+    def lookup(self, scope: Scope, question: str) -> tuple[Optional[Any], np.ndarray]:
+        """
+        Returns (cached answer or None, question vector).
+        The vector can be passed to `put`, so the question is embedded only once.
+        """
+        vector = self.embed(question)
+        return self.lookup_vector(scope, vector), vector
+
+    async def alookup(
+        self, scope: Scope, question: str
+    ) -> tuple[Optional[Any], np.ndarray]:
+        vector = await self.aembed(question)
+        return self.lookup_vector(scope, vector), vector
+
+    async def alookup_batch(
+        self, scope: Scope, questions: list[str]
+    ) -> list[tuple[Optional[Any], np.ndarray]]:
+        """`alookup` for many questions, embedded together with `aembed_queries`."""
+        vectors = await aembed_queries(self.embeddings, questions)
+        return [
+            (self.lookup_vector(scope, vector), vector)
+            for vector in map(_normalize, vectors)
+        ]
+
+    def cached(self, scope: Scope, question: str, compute: Callable[[], T]) -> T:
+        """Returns the cached answer for a similar question or computes and caches it."""
+        answer, vector = self.lookup(scope, question)
+        if answer is None:
+            answer = compute()
+            self.put(scope, question, vector, answer)
+        return answer
+
+    async def acached(
+        self, scope: Scope, question: str, compute: Callable[[], Awaitable[T]]
+    ) -> T:
+        answer, vector = await self.alookup(scope, question)
+        if answer is None:
+            answer = await compute()
+            self.put(scope, question, vector, answer)
+        return answer
+
+    async def acached_batch(
+        self,
+        scope: Scope,
+        questions: list[str],
+        compute: Callable[[list[str]], Awaitable[list[T | Exception]]],
+    ) -> list[T | Exception]:
+        """
+        `acached` for many questions: answers of all the misses are computed with one
+        `compute` call. Exceptions it returns in place of answers aren't cached.
+        """
+        found = await self.alookup_batch(scope, questions)
+        answers = [answer for answer, _ in found]
+        misses = [i for i, answer in enumerate(answers) if answer is None]
+        if misses:
+            computed = await compute([questions[i] for i in misses])
+            for i, answer in zip(misses, computed):
+                answers[i] = answer
+                if not isinstance(answer, Exception):
+                    self.put(scope, questions[i], found[i][1], answer)
+        return answers
+
+    async def astream_cached(
+        self, scope: Scope, question: str, stream: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """
+        Streaming version of `acached`: a hit is yielded as one chunk, a miss is
+        streamed through and cached when the stream is completed.
+        """
+        answer, vector = await self.alookup(scope, question)
+        if answer is not None:
+            yield answer
+            return
+
+        chunks = []
+        async for chunk in stream():
+            chunks.append(chunk)
+            yield chunk
+        self.put(scope, question, vector, "".join(chunks))
+
+    def lookup_vector(self, scope: Scope, vector: np.ndarray) -> Optional[Any]:
+        now = time.monotonic()
+
+        with self._lock:
+            self._check_version(scope)
+
+            keys, vectors = [], []
+            for key, entry in list(self._entries.items()):
+                if entry.expires_at <= now:
+                    del self._entries[key]
+                elif entry.scope == scope:
+                    keys.append(key)
+                    vectors.append(entry.vector)
+
+            if keys:
+                scores = np.stack(vectors) @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return self._entries[keys[best]].answer
+
+            self.misses += 1
+            return None
+
+    def put(self, scope: Scope, question: str, vector: np.ndarray, answer: Any):
+        with self._lock:
+            self._check_version(scope)
+
+            self._entries[self._next_key] = _Entry(
+                scope=scope,
+                question=question,
+                vector=vector,
+                answer=answer,
+                expires_at=time.monotonic() + self.ttl_s,
+            )
+            self._next_key += 1
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _check_version(self, scope: Scope):
+        """Drops entries of the older KB versions, when the model reports a new one."""
+        model, version = scope
+        if self._versions.get(model, version) != version:
+            stale = [k for k, e in self._entries.items() if e.scope[0] == model]
+            for key in stale:
+                del self._entries[key]
+            logger.debug(
+                f"SemanticCache: {model} version changed to {version}, "
+                f"dropped {len(stale)} entries"
+            )
+        self._versions[model] = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_s": self.ttl_s,
+        }
+
+
+def _normalize(vector: list[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+# one cache for the whole process, shared by every model
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache(embeddings: Embeddings, config: dict) -> Optional[SemanticCache]:
+    """
+    Returns the process-wide cache, or None if it's disabled in `config` (app settings).
+    The cache is created on the first call, later calls share it.
+    """
+    global _cache
+    if not config.get("semantic_cache_enabled", False):
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticCache(
+                embeddings,
+                threshold=config.get("semantic_cache_threshold", 0.95),
+                ttl_s=config.get("semantic_cache_ttl_s", 3600),
+                max_entries=config.get("semantic_cache_size", 1000),
+            )
+            logger.info(f"Semantic cache enabled: {_cache.stats()}")
+        return _cache
+
+
+def semantic_cache_stats() -> Optional[dict]:
+    return _cache.stats() if _cache is not None else None
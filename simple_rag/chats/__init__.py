@@ -1,13 +1,11 @@
 import asyncio
 from datetime import timedelta, datetime
-from typing import Optional
+from typing import AsyncIterator, Optional
 from uuid import UUID
 from simple_rag.chats.chat import Chat, ChatModel
 
 from loguru import logger
 
-from simple_rag.chats.history import clear_history
-
 
 class ChatManager:
     INACTIVITY_TIMEOUT = timedelta(minutes=5)  # FIXME: use config
@@ -30,8 +28,8 @@ class ChatManager:
     def total_chats(self):
         return 0
 
-    def create_chat(self, model: ChatModel):
-        chat = Chat(model)
+    def create_chat(self, model: ChatModel, model_name: str = ""):
+        chat = Chat(model, model_name)
         self._chats[chat.id] = chat
         return chat
 
@@ -39,6 +37,14 @@ class ChatManager:
         # if chat does not exist, raises KeyError automatically.
         return self._chats[chat_id].send(message)
 
+    async def asend_message(self, chat_id: UUID, message: str) -> str:
+        # if chat does not exist, raises KeyError automatically.
+        return await self._chats[chat_id].asend(message)
+
+    def astream_message(self, chat_id: UUID, message: str) -> AsyncIterator[str]:
+        # not a coroutine, so an unknown chat raises KeyError before the stream starts.
+        return self._chats[chat_id].astream(message)
+
     def get_chat(self, id: UUID) -> Optional[Chat]:
         return self._chats.get(id)
 
@@ -48,6 +54,9 @@ class ChatManager:
 
     async def __cleanup_task(self):
         """Background task for cleaning up inactive chats"""
+        # langchain-based history is imported only when the cleanup is running
+        from simple_rag.chats.history import clear_history
+
         while self._running:
             await asyncio.sleep(self._check_interval)
             logger.debug("Running cleanup task")
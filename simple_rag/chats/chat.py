@@ -1,5 +1,6 @@
 import abc
-from typing import TypedDict
+import asyncio
+from typing import AsyncIterator, TypedDict
 import uuid
 from datetime import timedelta, datetime
 
@@ -9,6 +10,29 @@ class ChatModel(abc.ABC):
     def send(self, id: uuid.UUID, message: str) -> str:
         raise NotImplementedError("Must be implemented")
 
+    async def asend(self, id: uuid.UUID, message: str) -> str:
+        """
+        Async version of `send`. Models with async-native I/O should override it,
+        by default `send` is run in a thread.
+        """
+        return await asyncio.to_thread(self.send, id, message)
+
+    @property
+    def has_async_send(self) -> bool:
+        """Whether `asend` is async-native, not the `send` in a thread fallback."""
+        return type(self).asend is not ChatModel.asend
+
+    @property
+    def has_async_stream(self) -> bool:
+        return type(self).astream is not ChatModel.astream
+
+    async def astream(self, id: uuid.UUID, message: str) -> AsyncIterator[str]:
+        """
+        Yields the answer in chunks (tokens) as they are generated.
+        Models which can't stream yield the whole answer as one chunk.
+        """
+        yield await self.asend(id, message)
+
     @abc.abstractmethod
     def update(self, new_cfg: dict[str, str]):
         raise NotImplementedError("Must be implemented")
@@ -22,15 +46,18 @@ class HistoryMessage(TypedDict):
 class Chat:
     id: uuid.UUID
     model: ChatModel
+    # name the model was built by, for logs and metrics
+    model_name: str
     last_active: timedelta
 
     # TODO: history might be a DB table in the future
     # TODO: so this is point of possible abstraction
     history: list[HistoryMessage]
 
-    def __init__(self, model: ChatModel):
+    def __init__(self, model: ChatModel, model_name: str = ""):
         self.id = uuid.uuid4()
         self.model = model
+        self.model_name = model_name
         self.last_active = datetime.now()
         self.history = []
 
@@ -41,3 +68,27 @@ class Chat:
         self.history.append({"role": "model", "msg": response})
 
         return response
+
+    async def asend(self, message: str) -> str:
+        self.last_active = datetime.now()
+        self.history.append({"role": "user", "msg": message})
+        response = await self.model.asend(self.id, message)
+        self.history.append({"role": "model", "msg": response})
+
+        return response
+
+    async def astream(self, message: str) -> AsyncIterator[str]:
+        """
+        Streams the model answer. The answer is added to the history
+        only when the stream is completed.
+        """
+        self.last_active = datetime.now()
+        self.history.append({"role": "user", "msg": message})
+
+        chunks = []
+        async for chunk in self.model.astream(self.id, message):
+            chunks.append(chunk)
+            yield chunk
+
+        self.last_active = datetime.now()
+        self.history.append({"role": "model", "msg": "".join(chunks)})
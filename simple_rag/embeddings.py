@@ -1,4 +1,216 @@
-from langchain_huggingface import HuggingFaceEmbeddings
+"""
+embeddings.py - Process-wide, lazily initialized embedding model.
 
-# FIXME: move to context
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
+Loading the sentence-transformers model takes seconds, so nothing is loaded at import.
+`embeddings` is a proxy which builds the model on the first call and is shared by every
+vector store in the process. Call `warmup()` at application startup so the first real
+request doesn't pay for the model load.
+
+Settings are read from the environment and can be overridden with `provider.configure()`
+before the model is loaded:
+
+- EMBEDDINGS_MODEL_NAME: sentence-transformers model (default: all-mpnet-base-v2)
+- EMBEDDINGS_MODEL_DIR: local directory for model files (default: HF cache)
+- EMBEDDINGS_OFFLINE: load the model from EMBEDDINGS_MODEL_DIR only, never download it
+- EMBEDDINGS_CACHE_PATH / EMBEDDINGS_CACHE_SIZE: persistent vector cache, see `CachedEmbeddings`
+- EMBEDDINGS_QUERY_CACHE_SIZE: in-memory memo of query vectors, see `QueryMemoEmbeddings`
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from simple_rag.cache.embeddings import (
+    CachedEmbeddings,
+    QueryMemoEmbeddings,
+    aembed_queries,
+    embed_queries,
+)
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+
+
+def make_embeddings(
+    model_name: str = DEFAULT_MODEL_NAME,
+    cache_path: str | None = None,
+    cache_size: int = 500_000,
+    model_dir: str | None = None,
+    offline: bool = False,
+    query_cache_size: int = 4096,
+) -> Embeddings:
+    """
+    Builds the embedding model. If `cache_path` is given, the model is wrapped
+    into a persistent `CachedEmbeddings`, so texts are embedded only once.
+    If `query_cache_size` > 0, query vectors are also memoized in memory.
+    """
+    # heavy import (torch, transformers), do it only when the model is really needed
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    model = HuggingFaceEmbeddings(
+        model_name=model_name,
+        cache_folder=model_dir,
+        model_kwargs={"local_files_only": offline},
+    )
+    if cache_path:
+        model = CachedEmbeddings(
+            model, model_name=model_name, path=cache_path, max_entries=cache_size
+        )
+    if query_cache_size > 0:
+        model = QueryMemoEmbeddings(model, max_entries=query_cache_size)
+
+    return model
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").lower() in ("1", "true", "yes")
+
+
+class EmbeddingsProvider:
+    """
+    Builds the embedding model once per process, on first use.
+    """
+
+    model_name: str
+    model_dir: Optional[str]
+    offline: bool
+    cache_path: Optional[str]
+    cache_size: int
+    query_cache_size: int
+
+    def __init__(self, factory: Callable[..., Embeddings] = make_embeddings):
+        self._factory = factory
+        self._model: Optional[Embeddings] = None
+        self._lock = threading.Lock()
+        self._timings: dict[str, float] = {}
+
+        self.model_name = os.environ.get("EMBEDDINGS_MODEL_NAME", DEFAULT_MODEL_NAME)
+        self.model_dir = os.environ.get("EMBEDDINGS_MODEL_DIR") or None
+        self.offline = _env_flag("EMBEDDINGS_OFFLINE")
+        self.cache_path = os.environ.get("EMBEDDINGS_CACHE_PATH", "embeddings_cache.db")
+        self.cache_size = int(os.environ.get("EMBEDDINGS_CACHE_SIZE", 500_000))
+        self.query_cache_size = int(os.environ.get("EMBEDDINGS_QUERY_CACHE_SIZE", 4096))
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def configure(self, **settings):
+        """
+        Overrides settings (model_name, model_dir, offline, cache_path, cache_size,
+        query_cache_size).
+        Has to be called before the model is loaded.
+        """
+        for key in settings:
+            if not hasattr(self, key):
+                raise AttributeError(f"Unknown embeddings setting: {key}")
+
+        changed = {k: v for k, v in settings.items() if getattr(self, k) != v}
+        if changed and self.loaded:
+            raise RuntimeError(f"Embeddings are already loaded, can't change {changed}")
+
+        for key, value in changed.items():
+            setattr(self, key, value)
+
+    def get(self) -> Embeddings:
+        if self._model is not None:
+            return self._model
+
+        with self._lock:
+            if self._model is None:
+                logger.info(f"Loading embeddings model {self.model_name}...")
+                started = time.perf_counter()
+                self._model = self._factory(
+                    model_name=self.model_name,
+                    cache_path=self.cache_path,
+                    cache_size=self.cache_size,
+                    model_dir=self.model_dir,
+                    offline=self.offline,
+                    query_cache_size=self.query_cache_size,
+                )
+                self._timings["load_s"] = time.perf_counter() - started
+                logger.info(f"Embeddings model loaded in {self._timings['load_s']:.2f}s")
+
+        return self._model
+
+    def warmup(self) -> dict[str, float]:
+        """
+        Loads the model and runs a dummy encode, so that lazy initialization inside
+        the model (weights to device, tokenizer, thread pools) is done before the first
+        real request. Returns the startup report.
+        """
+        model = self.get()
+
+        # bypass the caches, we want the model itself to run
+        while hasattr(model, "underlying"):
+            model = model.underlying
+
+        started = time.perf_counter()
+        model.embed_query("warmup")
+        self._timings["warmup_s"] = time.perf_counter() - started
+
+        logger.info(f"Embeddings warmup done: {self.startup_report()}")
+        return self.startup_report()
+
+    def startup_report(self) -> dict[str, float]:
+        return dict(self._timings)
+
+    def query_cache_stats(self) -> Optional[dict]:
+        """Stats of the query vectors memo, None if the model isn't loaded or has no memo."""
+        if isinstance(self._model, QueryMemoEmbeddings):
+            return self._model.stats()
+        return None
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    `Embeddings` proxy which loads the real model on first use.
+    """
+
+    def __init__(self, provider: EmbeddingsProvider):
+        self._provider = provider
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._provider.get().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._provider.get().embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self._provider.get().aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self._provider.get().aembed_query(text)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return embed_queries(self._provider.get(), texts)
+
+    async def aembed_queries(self, texts: list[str]) -> list[list[float]]:
+        return await aembed_queries(self._provider.get(), texts)
+
+
+def embeddings_model_name(model: Embeddings) -> str:
+    """
+    Name of the model behind `model`, without loading it. Used to tag data that holds
+    vectors (snapshots), so that vectors of different models are never mixed.
+    """
+    while True:
+        if isinstance(model, LazyEmbeddings):
+            return model._provider.model_name
+        name = getattr(model, "model_name", None)
+        if isinstance(name, str):
+            return name
+        if not hasattr(model, "underlying"):
+            return type(model).__name__
+        model = model.underlying
+
+
+provider = EmbeddingsProvider()
+embeddings = LazyEmbeddings(provider)
+
+
+def warmup() -> dict[str, float]:
+    return provider.warmup()
@@ -1,4 +1,6 @@
 import abc
+import asyncio
+from contextlib import AbstractAsyncContextManager, nullcontext
 from typing import Optional
 
 
@@ -6,3 +8,48 @@ class KnowledgeBaseModel(abc.ABC):
     @abc.abstractmethod
     def query(self, query: str) -> list[str]:
         pass
+
+    async def aquery(self, query: str) -> list[str]:
+        """
+        Async version of `query`. Models with async-native I/O should override it,
+        by default `query` is run in a thread.
+        """
+        return await asyncio.to_thread(self.query, query)
+
+    @property
+    def has_async_query(self) -> bool:
+        """Whether `aquery` is async-native, not the `query` in a thread fallback."""
+        return type(self).aquery is not KnowledgeBaseModel.aquery
+
+    @property
+    def has_async_batch(self) -> bool:
+        return type(self).aquery_batch is not KnowledgeBaseModel.aquery_batch
+
+    async def aquery_batch(
+        self,
+        queries: list[str],
+        max_concurrency: int = 8,
+        limit: Optional[AbstractAsyncContextManager] = None,
+    ) -> list[list[str] | Exception]:
+        """
+        Answers to `queries`, in order. A failed query gets its exception in place of
+        the answer, the others are still answered. By default `aquery` is run for
+        every query, at most `max_concurrency` at a time; models that can share work
+        between queries (one embedding call, one vector search) should override it.
+
+        `limit` (e.g. a semaphore shared with other requests) is entered around every
+        unit of concurrent work: a query here, a shared search or a generation in
+        overrides.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        limit = limit or nullcontext()
+
+        async def answer(query: str) -> list[str]:
+            async with semaphore, limit:
+                return await self.aquery(query)
+
+        return await asyncio.gather(*(answer(q) for q in queries), return_exceptions=True)
+
+    def cache_stats(self) -> dict:
+        """Stats of the caches owned by the model, reported by `GET /cache/`."""
+        return {}
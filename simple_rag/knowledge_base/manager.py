@@ -1,34 +1,39 @@
-from math import e
-from typing import Callable
-from langchain.chat_models.base import BaseChatModel
-from langchain.embeddings.base import Embeddings
+from typing import TYPE_CHECKING, Callable
 from loguru import logger
 
-from simple_rag.models.classic_static_file_rag import (
-    build_classic_rag_knowledgebase_model,
-)
-from simple_rag.models.classic_static_file_rag.kb_model_v2 import init_support_kb_model
+from simple_rag.lazy import lazy_builder
 
 from .base import KnowledgeBaseModel
 
+if TYPE_CHECKING:
+    from langchain.chat_models.base import BaseChatModel
+    from langchain.embeddings.base import Embeddings
+
 
 class KnowledgeBaseManager:
     """
     Provides access to registered knowledge base models
     """
 
-    _llm: BaseChatModel
-    _embeddings: Embeddings
+    _llm: "BaseChatModel"
+    _embeddings: "Embeddings"
     _app_config: dict
 
+    # builders are imported on first use, see `lazy_builder`
     builders: dict[
-        str, Callable[[BaseChatModel, Embeddings, dict], KnowledgeBaseModel]
+        str, Callable[["BaseChatModel", "Embeddings", dict], KnowledgeBaseModel]
     ] = {
-        "classic": build_classic_rag_knowledgebase_model,
-        "classic_v2": init_support_kb_model,
+        "classic": lazy_builder(
+            "simple_rag.models.classic_static_file_rag:build_classic_rag_knowledgebase_model"
+        ),
+        "classic_v2": lazy_builder(
+            "simple_rag.models.classic_static_file_rag.kb_model_v2:init_support_kb_model"
+        ),
     }
 
-    def __init__(self, llm: BaseChatModel, embeddings: Embeddings, app_config: dict):
+    def __init__(
+        self, llm: "BaseChatModel", embeddings: "Embeddings", app_config: dict
+    ):
         self._llm = llm
         self._embeddings = embeddings
         self._app_config = app_config
@@ -45,7 +50,8 @@ class KnowledgeBaseManager:
 
     @staticmethod
     def register_model(
-        key: str, model: Callable[[BaseChatModel, Embeddings, dict], KnowledgeBaseModel]
+        key: str,
+        model: Callable[["BaseChatModel", "Embeddings", dict], KnowledgeBaseModel],
     ):
         logger.debug(f"Registering model by {key=}")
         KnowledgeBaseManager.builders.update({key: model})
@@ -1,13 +1,15 @@
-from typing import Optional, Tuple, Type, TypedDict
+from typing import Iterator, NotRequired, Optional, Sequence, Tuple, Type, TypedDict
 from loguru import logger
 import pandas as pd
-from sqlalchemy import Engine, create_engine
+from sqlalchemy import Engine, create_engine, insert, update
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.exc import OperationalError
 
 from simple_rag.knowledge_base.store.entity.base import Base, BaseEntity
 from simple_rag.knowledge_base.store.entity.default import SampleKBase
+from simple_rag.knowledge_base.store.keyword_index import KeywordIndex
+from simple_rag.metrics.latency import timed
 
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import func
@@ -24,30 +26,47 @@ class DBEngineConf(TypedDict):
     db_link: str
     model_name: str
     entity_class: Type[BaseEntity] | None
+    # insert the whole DataFrame with executemany instead of row by row
+    bulk_insert: NotRequired[bool]
+    # rows per INSERT ... RETURNING statement when bulk_insert is on
+    bulk_chunk_size: NotRequired[int]
+    # FTS5 keyword index over the text columns (SQLite only)
+    keyword_index: NotRequired[bool]
 
 
 class PseudoDBEngine:
     def __init__(self):
         self._df = None
         self.version = 0
+        # ids of carried rows stay, so new rows need ids not used before
+        self._next_id = 0
 
     def load_dataframe(self) -> Optional[pd.DataFrame]:
         return self._df
 
-    def store_dataframe(self, df: pd.DataFrame) -> Tuple[int, list[int]]:
+    def store_dataframe(
+        self, df: pd.DataFrame, carried_ids: Sequence[int] = ()
+    ) -> Tuple[int, list[int]]:
         self._df = df
         self.version += 1
-        return self.version, list(range(self._df.shape[0]))
+        start, self._next_id = self._next_id, self._next_id + df.shape[0]
+        return self.version, list(range(start, self._next_id))
 
-    def rollback_version(self, version: int):
+    def rollback_version(
+        self, version: int, carried_ids: Sequence[int] = (), previous_version: int = 0
+    ):
         self.version -= 1
 
-    def process_unvectorized_rows(self):
-        logger.warning("PseudoDBEngine: process_unvectorized_rows() not implemented")
+    def iter_unvectorized_batches(self, batch_size: int):
+        logger.warning("PseudoDBEngine: iter_unvectorized_batches() not implemented")
         # actually this is how you make empty generator
         return
         yield
 
+    def mark_vectorized(self, ids: list[int]):
+        logger.warning("PseudoDBEngine: mark_vectorized() not implemented")
+        return
+
     def clear_old_versions(self):
         logger.warning("PseudoDBEngine: clear_old_versions() not implemented")
         return
@@ -56,6 +75,10 @@ class PseudoDBEngine:
         logger.warning("PseudoDBEngine: update_vectorized_flag() not implemented")
         return
 
+    def keyword_search(self, query: str, version: int, limit: int) -> list[tuple[int, float]]:
+        logger.warning("PseudoDBEngine: keyword_search() not implemented")
+        return []
+
 
 class DBEngine:
     db_link: str = None
@@ -63,21 +86,33 @@ class DBEngine:
     engine: Engine | None = None
     version: int = 0
     entity_class: Type[BaseEntity]
+    bulk_insert: bool = True
+    bulk_chunk_size: int = 1000
+    keyword_index: Optional[KeywordIndex] = None
 
     def __init__(self, db_cfg: DBEngineConf = {}):
         self.db_link = db_cfg["db_link"]
         self.model_name = db_cfg["model_name"]
         self.entity_class = db_cfg.get("entity_class", None) or SampleKBase
+        self.bulk_insert = db_cfg.get("bulk_insert", self.bulk_insert)
+        self.bulk_chunk_size = db_cfg.get("bulk_chunk_size", None) or self.bulk_chunk_size
 
         if self.db_link:
             logger.debug(f"DBEngine: db_link={self.db_link}")
             self.engine = create_engine(self.db_link)
             self.Session = sessionmaker(bind=self.engine)
 
+        if db_cfg.get("keyword_index", True) and self.engine is not None:
+            if self.engine.dialect.name == "sqlite":
+                self.keyword_index = KeywordIndex(self.entity_class)
+            else:
+                logger.info(f"No keyword index for {self.engine.dialect.name}, SQLite only")
+
     @property
     def is_configured(self) -> bool:
         return self.engine is not None
 
+    @timed("db_load_dataframe")
     def load_dataframe(self) -> Optional[pd.DataFrame]:
         no_db = self.engine is None
         if no_db:
@@ -88,6 +123,8 @@ class DBEngine:
         if not has_table:
             logger.info("LOAD_DF: No table in DB")
             return None
+        # tables created before the keyword index existed get it here
+        self._create_keyword_index()
 
         session = self.Session()
 
@@ -112,16 +149,23 @@ class DBEngine:
 
         return df
 
-    def store_dataframe(self, df: pd.DataFrame) -> Tuple[int, list[int]]:
+    @timed("db_store_dataframe")
+    def store_dataframe(
+        self, df: pd.DataFrame, carried_ids: Sequence[int] = ()
+    ) -> Tuple[int, list[int]]:
         """
         Store the DataFrame in the relational database and return the new version number.
         If something goes wrong, raise an exception.
 
         Args:
             df (pd.DataFrame): The DataFrame to be stored.
+            carried_ids: Ids of unchanged rows of the current version. They are moved
+                to the new version as they are, in the same transaction, instead of
+                being inserted again.
 
         Returns:
-            int: The new version number.
+            Tuple[int, list[int]]: The new version number and the ids of the new rows
+            in the order of the DataFrame rows.
 
         Raises:
             StoreDFError: If something goes wrong during the storage process.
@@ -136,7 +180,8 @@ class DBEngine:
             ):
                 Base.metadata.create_all(connection)
                 logger.info(f"Table '{self.model_name}' created in relational DB")
-
+                connection.commit()
+        self._create_keyword_index()
 
         session = self.Session()
         try:
@@ -147,13 +192,14 @@ class DBEngine:
             new_version = max_version + 1
             self.version = new_version
 
-            new_ids = []
-
-            for _, row in df.iterrows():
-                new_row = self.entity_class.from_row(row, new_version)
-                session.add(new_row)
-                session.flush()
-                new_ids.append(new_row.id)
+            if self.bulk_insert:
+                new_ids = self._insert_bulk(session, df, new_version)
+            else:
+                new_ids = self._insert_row_by_row(session, df, new_version)
+            if self.keyword_index:
+                # same transaction: the version is searchable once its rows are
+                self.keyword_index.add_version(session, new_version)
+            self._move_rows(session, carried_ids, new_version)
 
             session.commit()
             logger.debug(f"DataFrame saved to DB with version {new_version}")
@@ -168,9 +214,57 @@ class DBEngine:
         finally:
             session.close()
 
-    def rollback_version(self, version: int):
+    def _insert_bulk(self, session: Session, df: pd.DataFrame, version: int) -> list[int]:
+        """
+        Inserts the DataFrame with one executemany INSERT ... RETURNING per chunk.
+        Ids are returned in the order of the DataFrame rows.
+        """
+        records = self.entity_class.records_from_df(df, version)
+        stmt = insert(self.entity_class).returning(
+            self.entity_class.id, sort_by_parameter_order=True
+        )
+
+        new_ids = []
+        for start in range(0, len(records), self.bulk_chunk_size):
+            chunk = records[start : start + self.bulk_chunk_size]
+            new_ids.extend(session.scalars(stmt, chunk).all())
+            logger.debug(f"Inserted rows {start}..{start + len(chunk)}")
+
+        return new_ids
+
+    def _insert_row_by_row(
+        self, session: Session, df: pd.DataFrame, version: int
+    ) -> list[int]:
+        new_ids = []
+
+        for _, row in df.iterrows():
+            new_row = self.entity_class.from_row(row, version)
+            session.add(new_row)
+            session.flush()
+            new_ids.append(new_row.id)
+
+        return new_ids
+
+    def _move_rows(self, session: Session, ids: Sequence[int], version: int):
+        """Moves rows with `ids` to `version`, keyword search follows the entity rows."""
+        ids = [int(i) for i in ids]
+        for start in range(0, len(ids), self.bulk_chunk_size):
+            chunk = ids[start : start + self.bulk_chunk_size]
+            session.execute(
+                update(self.entity_class)
+                .where(self.entity_class.id.in_(chunk))
+                .values(version=version)
+            )
+        if ids:
+            logger.debug(f"Moved {len(ids)} rows to version {version}")
+
+    @timed("db_rollback_version")
+    def rollback_version(
+        self, version: int, carried_ids: Sequence[int] = (), previous_version: int = 0
+    ):
         """
         Удаляет все строки с указанной версией из таблицы.
+        Rows carried over to `version` go back to `previous_version`.
         """
         if not self.engine:
             logger.warning("DB engine not configured, skip rollback_version")
@@ -180,50 +274,88 @@ class DBEngine:
 
         try:
             with session.begin():
+                self._move_rows(session, carried_ids, previous_version)
                 session.query(self.entity_class).filter(
                     self.entity_class.version == version
                 ).delete()
+                if self.keyword_index:
+                    self.keyword_index.delete_version(session, version)
+                self.version = (
+                    session.query(func.max(self.entity_class.version)).scalar() or 0
+                )
                 logger.info(f"Rolled back DB changes for version {version}")
         except Exception as e:
             logger.error(f"Failed to roll back DB changes for version {version}: {e}")
             logger.exception(e)
             raise RollbackDBError("Failed to roll back DB changes") from e
 
-    def process_unvectorized_rows(self):
-        has_table = self._check_if_table_exists(self.model_name)
-        if not has_table:
-            logger.info("PROCE_UNVEC: No table in DB, return")
+    def iter_unvectorized_batches(
+        self, batch_size: int
+    ) -> Iterator[list[BaseEntity]]:
+        """
+        Streams rows that are not in the vector store yet, `batch_size` rows at a time.
+
+        Rows are paginated by id (keyset pagination), each page is read in its own short
+        session, so memory is bounded by the batch size and the caller is free to commit
+        the `vectorized` flag between batches with `mark_vectorized`.
+        """
+        if not self.engine:
+            logger.warning("DB engine not configured, skip iter_unvectorized_batches")
             return
-            
-        session = self.Session()
 
-        try:
-            unprocessed_rows = (
-                session.query(self.entity_class)
-                .filter(self.entity_class.vectorized == False)
-                .all()
-            )
+        has_table = self._check_if_table_exists(self.entity_class.__tablename__)
+        if not has_table:
+            logger.info("ITER_UNVEC: No table in DB, return")
+            return
 
-            for row in unprocessed_rows:
-                logger.debug(f"processing {row=}")
-                success = yield row
-                logger.debug(f"row processed. status={success}")
+        last_id = 0
+        while True:
+            with self.Session() as session:
+                batch = (
+                    session.query(self.entity_class)
+                    .filter(
+                        self.entity_class.vectorized == False,
+                        self.entity_class.id > last_id,
+                    )
+                    .order_by(self.entity_class.id)
+                    .limit(batch_size)
+                    .all()
+                )
+
+            if not batch:
+                logger.info("Processed all unvectorized rows")
+                return
+
+            last_id = batch[-1].id
+            logger.debug(f"ITER_UNVEC: batch of {len(batch)} rows, {last_id=}")
+            yield batch
+
+    @timed("db_mark_vectorized")
+    def mark_vectorized(self, ids: list[int]):
+        """
+        Sets the `vectorized` flag for the given rows and commits right away.
+        """
+        if not self.engine:
+            logger.warning("DB engine not configured, skip mark_vectorized")
+            return
 
-                if success:
-                    row.vectorized = True
-                else:
-                    # NOTE: maybe we need to raise and abort the rest processing.
-                    logger.warning(f"Vectorization failed for row with id={row.id}")
+        session = self.Session()
 
-            logger.debug("Loop finished, going to commit...")
+        try:
+            session.query(self.entity_class).filter(
+                self.entity_class.id.in_(ids)
+            ).update({self.entity_class.vectorized: True}, synchronize_session=False)
             session.commit()
-            logger.info("Processed all unvectorized rows")
+            logger.debug(f"Marked {len(ids)} rows as vectorized")
 
         except Exception as e:
             session.rollback()
-            logger.error(f"Failed to process unvectorized rows: {e}")
+            logger.error(f"Failed to mark rows as vectorized: {e}")
             raise
+        finally:
+            session.close()
 
+    @timed("db_clear_old_versions")
     def clear_old_versions(self):
         if not self.engine:
             logger.warning("DB engine not configured, skip clear_old_versions")
@@ -245,6 +377,8 @@ class DBEngine:
             session.query(self.entity_class).filter(
                 self.entity_class.version < max_version
             ).delete()
+            if self.keyword_index:
+                self.keyword_index.delete_removed_rows(session)
 
             session.commit()
             logger.info(
@@ -256,6 +390,26 @@ class DBEngine:
             logger.error(f"Failed to clear old versions from DB: {e}")
             raise
 
+    def _create_keyword_index(self):
+        if not self.keyword_index:
+            return
+        with self.engine.begin() as connection:
+            created = self.keyword_index.create(connection)
+        if not created:
+            logger.warning("SQLite is built without FTS5, keyword search is disabled")
+            self.keyword_index = None
+
+    @timed("db_keyword_search")
+    def keyword_search(self, query: str, version: int, limit: int) -> list[tuple[int, float]]:
+        """
+        Ids of the rows of `version` best matching `query` by BM25, with scores (higher
+        is better). Empty without a keyword index.
+        """
+        if not self.keyword_index:
+            return []
+        with self.engine.connect() as connection:
+            return self.keyword_index.search(connection, query, version, limit)
+
     def _check_if_table_exists(self, table_name):
         with self.engine.connect() as connection:
             has_table = self.engine.dialect.has_table(connection, table_name)
@@ -275,16 +429,14 @@ class DBEngine:
         session = self.Session()
 
         try:
-            unprocessed_rows = (
-                session.query(self.entity_class)
-                .filter(self.entity_class.version == version)
-                .all()
+            # rows carried over from the previous version are usually flagged already
+            session.query(self.entity_class).filter(
+                self.entity_class.version == version,
+                self.entity_class.vectorized.is_not(new_status),
+            ).update(
+                {self.entity_class.vectorized: new_status}, synchronize_session=False
             )
 
-            for row in unprocessed_rows:
-                logger.debug(f"processing {row=}")
-                row.vectorized = new_status
-
             session.commit()
             logger.info(f"Updated vectorized flag for version {version}")
 
@@ -1,15 +1,45 @@
-from typing import Optional, Type
+import asyncio
+import contextvars
+import copy
+import functools
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Literal, Optional, Type
 from langchain_core.vectorstores import InMemoryVectorStore
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
 from loguru import logger
+import numpy as np
 import pandas as pd
 from pydantic import BaseModel
 
 
+from simple_rag.cache.embeddings import normalize_text
+from simple_rag.cache.lru import LRUCache
 from simple_rag.knowledge_base.store.entity.base import BaseEntity
 from simple_rag.embeddings import embeddings as default_embeddings
+from simple_rag.embeddings import embeddings_model_name
+from simple_rag.knowledge_base.store.numpy_index import NumpyVectorStore
+from simple_rag.knowledge_base.store.projection import (
+    FIT_SAMPLE_ROWS,
+    Projection,
+    ProjectedEmbeddings,
+    load_projection,
+    make_projection,
+)
+from simple_rag.knowledge_base.store.quantization import VectorCodec
+from simple_rag.knowledge_base.store.record_index import RecordIndex
+from simple_rag.knowledge_base.store.snapshot import (
+    SnapshotError,
+    read_projection,
+    read_snapshot,
+    write_snapshot,
+)
 from simple_rag.knowledge_base.store.vectorizer import Vectorizer
+from simple_rag.metrics.latency import timed
 from .db_engine import DBEngine, DBEngineConf, PseudoDBEngine, RollbackDBError, StoreDFError
 
 
@@ -18,10 +48,24 @@ class DbConfig(BaseModel):
     model_name: Optional[str] = None
 
 
+RetrievalMode = Literal["vector", "hybrid", "keyword"]
+
+
 class Store:
     _is_empty = True
     df: pd.DataFrame = None
+    # lookups by id and by indexed columns, built from `df` of the same version
+    records: Optional[RecordIndex] = None
     engine: DBEngine = None
+    vectorize_batch_size: int = 256
+    incremental: bool = True
+    retrieval_mode: RetrievalMode = "vector"
+    # rank offset of reciprocal rank fusion, 60 is the usual choice
+    rrf_k: int = 60
+    # threads running keyword searches of async lookups, a batch queues behind them
+    keyword_search_workers: int = 4
+    results_cache: LRUCache
+    _vectorize_thread: Optional[threading.Thread] = None
 
     def __init__(
         self,
@@ -29,6 +73,16 @@ class Store:
         vectorstore_cfg: dict = {},
         entity: Type[BaseEntity] | None = None,
         embeddings=None,
+        vectorize_batch_size: Optional[int] = None,
+        vectorize_in_background: bool = False,
+        incremental: Optional[bool] = None,
+        results_cache_size: int = 1024,
+        results_cache_ttl_s: Optional[float] = 300,
+        snapshot_path: Optional[str] = None,
+        projection_cfg: dict = {},
+        retrieval_mode: Optional[RetrievalMode] = None,
+        rrf_k: Optional[int] = None,
+        keyword_search_workers: Optional[int] = None,
         *args,
         **kwargs,
     ):
@@ -36,14 +90,48 @@ class Store:
             **db_cfg,
             "entity_class": entity
         })
-        vectorStore = Store.build_vector_store(vectorstore_cfg)
-        self.vectorizer = Vectorizer(vectorStore)
+        projection, projection_version = Store.build_projection(projection_cfg)
+        if projection is not None:
+            # documents and queries are projected the same way
+            embeddings = ProjectedEmbeddings(embeddings or default_embeddings, projection)
+        vectorStore = Store.build_vector_store(vectorstore_cfg, embeddings)
+        self.vectorizer = Vectorizer(vectorStore, projection_path=projection_cfg.get("path"))
+        self.vectorizer.projection_version = projection_version
+        self.vectorize_batch_size = vectorize_batch_size or self.vectorize_batch_size
+        if incremental is not None:
+            self.incremental = incremental
+        self.retrieval_mode = retrieval_mode or self.retrieval_mode
+        self.rrf_k = rrf_k or self.rrf_k
+        self.keyword_search_workers = keyword_search_workers or self.keyword_search_workers
+        # threads are started on first use
+        self._keyword_pool = ThreadPoolExecutor(
+            max_workers=self.keyword_search_workers, thread_name_prefix="store-keyword"
+        )
 
-        self.df = self.engine.load_dataframe()
+        # results of `get_entries_similar_to_problem`, keyed by the live version
+        self.results_cache = LRUCache(results_cache_size, results_cache_ttl_s)
+
+        self._set_dataframe(self.engine.load_dataframe())
+        if self.df is not None and not self.vectorizer.persists_vectors:
+            # the index lost its vectors with the previous process, the rows are embedded again
+            self.engine._update_vectorized_flag(self.engine.version, False)
+        if self.df is None and snapshot_path and Path(snapshot_path).exists():
+            try:
+                self.import_snapshot(snapshot_path)
+            except SnapshotError as e:
+                logger.warning(f"Snapshot is not used: {e}")
 
         # sync and cleanup
         self.clear_old_versions()
-        self.check_and_vectorize_unprocessed()
+        if vectorize_in_background:
+            self._vectorize_thread = threading.Thread(
+                target=self._vectorize_unprocessed_in_background,
+                name="store-catch-up-vectorization",
+                daemon=True,
+            )
+            self._vectorize_thread.start()
+        else:
+            self.check_and_vectorize_unprocessed()
 
     @staticmethod
     def build_vector_store(cfg: dict, embeddings = None):
@@ -58,8 +146,53 @@ class Store:
                 collection_metadata={"hnsw:space": "cosine"},
             )
 
+        if cfg.get("type", None) == "faiss":
+            # optional dependency, imported only when selected
+            from simple_rag.knowledge_base.store.faiss_index import FaissVectorStore
+
+            return FaissVectorStore(
+                embeddings,
+                persist_directory=cfg.get("persist_directory"),
+                hnsw_m=cfg.get("hnsw_m", 32),
+                ef_construction=cfg.get("ef_construction", 200),
+                ef_search=cfg.get("ef_search", 64),
+                max_deleted_ratio=cfg.get("max_deleted_ratio", 0.5),
+            )
+
+        if cfg.get("type", None) == "numpy":
+            return NumpyVectorStore(
+                embeddings,
+                initial_capacity=cfg.get("initial_capacity", 1024),
+                quantization=cfg.get("quantization", "float32"),
+                binary_prefilter=cfg.get("binary_prefilter", False),
+                rescore_factor=cfg.get("rescore_factor", 10),
+            )
+
         return InMemoryVectorStore(embeddings)
 
+    @staticmethod
+    def build_projection(cfg: dict) -> tuple[Optional[Projection], Optional[int]]:
+        """
+        Projection configured by `cfg` (type, dim, path) and the KB version it was
+        fitted on. A projection saved to `path` is reused if it has the same type and
+        dim, otherwise it is fitted again on the next stored version.
+        """
+        if not cfg or not cfg.get("type"):
+            return None, None
+
+        projection = make_projection(cfg["type"], cfg.get("dim", 256))
+        path = cfg.get("path")
+        if path and Path(path).exists():
+            saved, version = load_projection(path)
+            if saved.same_kind(projection):
+                logger.info(f"Loaded {saved.name} projection of version {version} from {path}")
+                return saved, version
+            logger.warning(
+                f"{path} holds a {saved.name} projection to {saved.dim} dimensions, "
+                f"{projection.name} to {projection.dim} is configured; it will be refitted"
+            )
+        return projection, None
+
     @staticmethod
     def build_db_manager(cfg: DBEngineConf = {}):
         if not cfg or "db_link" not in cfg or "model_name" not in cfg:
@@ -68,13 +201,30 @@ class Store:
         logger.debug("Create default DBEngine()")
         return DBEngine(cfg)
 
+    def _set_dataframe(self, df: Optional[pd.DataFrame]):
+        """Makes `df` the live rows, the record index is replaced in one assignment."""
+        entity = getattr(self.engine, "entity_class", None)
+        indexed_columns = getattr(entity, "indexed_columns", ())
+        self.records = RecordIndex(df, indexed_columns) if df is not None else None
+        self.df = df
+
     @property
     def is_empty(self):
         return self.df is None
 
-    def check_and_vectorize_unprocessed(self):
+    @property
+    def version(self) -> int:
+        """Live KB version, changes on every `store_dataframe`."""
+        return self.engine.version
+
+    def check_and_vectorize_unprocessed(self, batch_size: Optional[int] = None):
         """
         Проверяет, есть ли невекторизованные записи в БД, и выполняет их векторизацию.
+
+        Rows are streamed from the DB and embedded `batch_size` rows at a time.
+        The `vectorized` flag is committed after every batch, so an interrupted
+        catch-up resumes from the first batch that was not committed. A projection
+        that isn't fitted yet is fitted on a sample of all the rows first.
         """
         if not self.engine:
             logger.warning(
@@ -82,68 +232,164 @@ class Store:
             )
             return
 
-        try:
-            gen = self.engine.process_unvectorized_rows()
-            entity = next(gen)
+        batch_size = batch_size or self.vectorize_batch_size
+        processed = 0
+        pending = []
+        # full-size vectors of the rows the projection was fitted on
+        sampled = {}
+        projection = self.vectorizer.projection
+        if projection is not None and not projection.fitted:
+            sampled = self._fit_projection_on_unvectorized(batch_size)
+
+        for batch in self.engine.iter_unvectorized_batches(batch_size):
+            logger.debug(f"transforming {len(batch)} rows to docs")
+            docs = [
+                self.vectorizer.transform_row_to_document(
+                    entity.to_vector_document(), entity.version, entity.id
+                )
+                for entity in batch
+            ]
 
-            while True:
-                df_row = entity.to_vector_document()
+            try:
+                self.vectorizer.vectorize_documents(docs, vectors=sampled)
+            except Exception as e:
+                # NOTE: rows stay unvectorized and will be picked up on the next start.
+                logger.error(f"Failed to add {len(docs)} docs to vectorstore: {e}")
+                continue
+            finally:
+                for entity in batch:
+                    sampled.pop(entity.id, None)
+
+            pending.extend(entity.id for entity in batch)
+            if not self.vectorizer.saves_explicitly:
+                self.engine.mark_vectorized(pending)
+                pending = []
+            # new vectors may change search results of the live version
+            self.results_cache.clear()
+            processed += len(batch)
+            logger.debug(f"Vectorized {processed} rows so far")
+
+        if pending:
+            # the index is saved once, rows are flagged only after it is on disk
+            self.vectorizer.persist()
+            self.engine.mark_vectorized(pending)
+
+        logger.info(f"All unvectorized rows have been processed ({processed} rows)")
+
+    def _fit_projection_on_unvectorized(self, batch_size: int) -> dict[int, np.ndarray]:
+        """
+        Fits the projection on a uniform sample (reservoir sampling) of the unvectorized
+        rows. Returns the full-size vectors of the sample by DB id.
+        """
+        rng = np.random.default_rng(0)
+        sample, seen = [], 0
+        for batch in self.engine.iter_unvectorized_batches(batch_size):
+            for entity in batch:
+                seen += 1
+                slot = len(sample) if len(sample) < FIT_SAMPLE_ROWS else rng.integers(seen)
+                if slot < FIT_SAMPLE_ROWS:
+                    doc = self.vectorizer.transform_row_to_document(
+                        entity.to_vector_document(), entity.version, entity.id
+                    )
+                    if slot == len(sample):
+                        sample.append(doc)
+                    else:
+                        sample[slot] = doc
+        if not sample:
+            return {}
+
+        logger.info(f"Fitting the projection on {len(sample)} of {seen} unvectorized rows")
+        try:
+            return self.vectorizer.fit_projection(sample, self.engine.version)
+        except Exception as e:
+            # the first batch that is vectorized gets the projection fitted on it
+            logger.error(f"Failed to fit the projection on a sample: {e}")
+            return {}
 
-                logger.debug(f"transforming row to doc")
-                doc = self.vectorizer.transform_row_to_document(
-                    df_row, entity.version, entity.id
-                )
-                logger.debug(f"transformed row to {doc=}")
-
-                try:
-                    ids = self.vectorizer.vectorize_documents([doc])
-                    success = True
-                    logger.debug(f"Vectorized. {ids=}")
-                except Exception as e:
-                    logger.error("Failed to add doc to vectorstore!")
-                    success = False
-                finally:
-                    entity = gen.send(success)
-
-        except StopIteration:
-            logger.info("All unvectorized rows have been processed")
+    def _vectorize_unprocessed_in_background(self):
+        try:
+            self.check_and_vectorize_unprocessed()
         except Exception as e:
-            logger.error(f"Failed to vectorize: {e}")
-            raise
+            logger.exception(f"Background vectorization failed: {e}")
+
+    def wait_for_vectorization(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits for the background catch-up vectorization (if any) to finish.
+        Returns False if it is still running after `timeout` seconds.
+        """
+        if self._vectorize_thread is None:
+            return True
+
+        self._vectorize_thread.join(timeout)
+        return not self._vectorize_thread.is_alive()
 
     def store_dataframe(
         self,
         df: pd.DataFrame,
+        incremental: Optional[bool] = None,
     ):
+        """
+        Stores the DataFrame as a new version of the knowledge base.
+
+        In incremental mode (the default) rows are compared with the current version
+        by content hash. Only added or changed rows are inserted and embedded; unchanged
+        rows and their vectors are moved to the new version as they are. The previous
+        version keeps only its changed and removed rows, until old versions are cleared.
+        """
         if not self.engine:
             logger.warning("DB engine not configured, skip store_dataframe")
             return
 
+        if incremental is None:
+            incremental = self.incremental
+
+        previous_projection = None
+        carried_ids, moved = [], set()
         try:
             df = df.copy()
-            # Step 1: Store DataFrame in the database
-            new_version, new_ids = self.engine.store_dataframe(df)
+            old_version = self.engine.version
+
+            # Step 1: Store changed rows in the database, carry unchanged ones over
+            carried = self._match_unchanged_rows(df) if incremental else {}
+            is_new = np.ones(len(df), dtype=bool)
+            is_new[list(carried)] = False
+            carried_ids = list(carried.values())
+            new_version, new_ids = self.engine.store_dataframe(
+                df[is_new], carried_ids=carried_ids
+            )
             logger.info("DataFrame saved to DB")
-            df["_id"] = new_ids
+            ids = np.empty(len(df), dtype=np.int64)
+            ids[is_new] = new_ids
+            ids[list(carried)] = carried_ids
+            df["_id"] = ids
+
+            # Step 2: Move vectors of unchanged rows, vectorize the rest
+            previous_projection = (self.vectorizer.projection, self.vectorizer.projection_version)
+            moved = self.vectorizer.retag_vectors(carried_ids, old_version, new_version)
 
-            # Step 2: Vectorize the data
             docs = []
-            for _, row in df.iterrows():
+            for _, row in df[~df["_id"].isin(moved)].iterrows():
                 doc = self.vectorizer.transform_row_to_document(
-                    row.to_dict(), version=new_version, db_id=row["_id"]
+                    row.drop("_id").to_dict(), version=new_version, db_id=row["_id"]
                 )
                 docs.append(doc)
 
-            logger.debug("docs created", docs_len=len(docs))
+            logger.debug("docs created", docs_len=len(docs), moved=len(moved))
 
-            self.vectorizer.vectorize_documents(docs)
-            logger.info("docs added to vectorStore")
+            if docs:
+                # a version without moved vectors gets a projection fitted on its rows
+                self.vectorizer.vectorize_documents(docs, refit=not moved)
+            logger.info(
+                f"docs added to vectorStore: {len(docs)} vectorized, {len(moved)} moved"
+            )
 
             # Step 2.5: Update vectorized attr in DB
+            self.vectorizer.persist()
             self.engine._update_vectorized_flag(new_version)
 
             # Step 3: Update the DataFrame in memory
-            self.df = df
+            self._set_dataframe(df)
+            self.results_cache.clear()
 
         except StoreDFError as store_df_error:
             logger.error(f"Failed to store DataFrame: {store_df_error}")
@@ -154,48 +400,310 @@ class Store:
             logger.error(
                 f"Vectorization failed: {vectorization_error}. Rolling back DB changes."
             )
+            if previous_projection and previous_projection[0] is not None:
+                # queries of the live version need the projection of its vectors
+                self.vectorizer.set_projection(*previous_projection)
+            if moved:
+                # unchanged rows go back to the live version, here and in the DB
+                self.vectorizer.retag_vectors(list(moved), new_version, old_version)
             try:
-                self.engine.rollback_version(new_version)
+                self.engine.rollback_version(new_version, carried_ids, old_version)
             except RollbackDBError as rollback_error:
                 logger.error(f"Failed to roll back DB changes: {rollback_error}")
                 raise rollback_error from vectorization_error
 
             raise vectorization_error
 
+    def export_snapshot(self, path: str):
+        """
+        Writes the live version (rows and vectors) to `path`, see `snapshot.py`.
+        Every row has to be vectorized.
+        """
+        if self.df is None:
+            raise SnapshotError("Store is empty, nothing to export")
+
+        db_ids, vectors = self.vectorizer.get_vectors(self.version)
+        positions = pd.Index(db_ids).get_indexer(self.df["_id"])
+        if (positions < 0).any():
+            raise SnapshotError(
+                f"{int((positions < 0).sum())} rows of version {self.version} "
+                "are not vectorized yet"
+            )
+
+        # a quantized store exports its codes, with the same scales
+        codec = copy.deepcopy(getattr(self.vectorizer.vector_store, "codec", VectorCodec()))
+        vectors = vectors[positions]
+        codec.fit(vectors, np.empty((0, vectors.shape[1]), dtype=codec.dtype))
+        manifest = write_snapshot(
+            path,
+            self.df,
+            vectors,
+            embeddings_model=embeddings_model_name(self.vectorizer.vector_store.embeddings),
+            kb_version=self.version,
+            codec=codec,
+            projection=self.vectorizer.projection,
+        )
+        logger.info(f"Exported snapshot of {manifest.rows} rows to {path}")
+
+    def import_snapshot(self, path: str):
+        """
+        Stores the snapshot rows as a new version, with the snapshot vectors instead
+        of embedding the rows. Raises `SnapshotError` if the snapshot was made with
+        another embeddings model or projection.
+        """
+        started = time.perf_counter()
+        model = embeddings_model_name(self.vectorizer.vector_store.embeddings)
+        df, vectors, manifest = read_snapshot(path, embeddings_model=model)
+        df = df.drop(columns=["_id"], errors="ignore")
+        projection = read_projection(path, manifest)
+        configured = self.vectorizer.projection
+        if (projection is None) != (configured is None) or (
+            configured is not None and not configured.same_kind(projection)
+        ):
+            raise SnapshotError(
+                f"{path}: snapshot has {describe_projection(projection)} projection, "
+                f"{describe_projection(configured)} projection is configured"
+            )
+
+        new_version, new_ids = self.engine.store_dataframe(df)
+        try:
+            docs = [
+                self.vectorizer.transform_row_to_document(row, new_version, db_id)
+                for row, db_id in zip(df.to_dict(orient="records"), new_ids)
+            ]
+            self.vectorizer.add_vectors(docs, vectors, codec=manifest.codec())
+            if projection is not None:
+                self.vectorizer.set_projection(projection, new_version)
+            self.vectorizer.persist()
+        except Exception:
+            self.engine.rollback_version(new_version)
+            raise
+        self.engine._update_vectorized_flag(new_version)
+
+        df["_id"] = new_ids
+        self._set_dataframe(df)
+        self.results_cache.clear()
+        logger.info(
+            f"Imported snapshot of {manifest.rows} rows (version {manifest.kb_version}) "
+            f"from {path} in {time.perf_counter() - started:.2f}s"
+        )
+
+    def _match_unchanged_rows(self, df: pd.DataFrame) -> dict[int, int]:
+        """
+        Maps positions of `df` rows to ids of identical rows of the current version.
+        """
+        if self.df is None or self.df.empty:
+            return {}
+
+        columns = sorted(c for c in df.columns if c != "_id")
+        if columns != sorted(c for c in self.df.columns if c != "_id"):
+            logger.info("Columns changed, every row will be vectorized")
+            return {}
+
+        old_rows = defaultdict(list)
+        for row_hash, old_id in zip(row_hashes(self.df[columns]), self.df["_id"]):
+            old_rows[row_hash].append(int(old_id))
+
+        carried = {}
+        for position, row_hash in enumerate(row_hashes(df[columns])):
+            if old_rows[row_hash]:
+                carried[position] = old_rows[row_hash].pop()
+
+        logger.debug(f"{len(carried)} of {len(df)} rows are unchanged")
+        return carried
+
     def clear_old_versions(self):
         self.engine.clear_old_versions()
         self.vectorizer.delete_old_vectors(self.engine.version)
+        self.vectorizer.persist()
+        self.results_cache.clear()
 
     def get(self, column_name, value) -> list[dict]:
-        if self.df is None:
+        records = self.records
+        if records is None:
             return []
 
-        return (
-            self.df[self.df[column_name] == value]
-            .drop(columns=["_id"], axis=1)
-            .apply(lambda x: x.to_dict(), axis=1)
-            .tolist()
-        )
+        return records.lookup(column_name, value)
 
     def similarity_search(self, query, config: dict = {}) -> list[Document]:
         return self.vectorizer.similarity_search(query, **config)
 
+    @timed("store_get_entries")
     def get_entries_similar_to_problem(
         self, problem: str, search_config: dict = {}, *args, **kwargs
     ) -> list[dict]:
-        docs = self.vectorizer.similarity_search_with_relevance_scores(
-            problem,
-            **search_config,
-            filter={"_version": self.engine.version},
+        """Entries for `problem`, found as configured by `retrieval_mode`."""
+        key = self._results_cache_key(problem, search_config)
+        records = self.results_cache.get(key)
+        if records is None:
+            if self.retrieval_mode == "vector":
+                docs = self.vectorizer.similarity_search_with_relevance_scores(
+                    problem,
+                    search_config,
+                    filter={"_version": self.engine.version},
+                )
+                records = self._records_for_docs([doc for doc, _ in docs])
+            else:
+                records = self.hybrid_search(
+                    problem, search_config.get("k", 4), self.retrieval_mode
+                )
+            self.results_cache.put(key, records)
+
+        # callers get their own dicts, the cached ones stay intact
+        return [dict(record) for record in records]
+
+    @timed("store_get_entries")
+    async def aget_entries_similar_to_problem(
+        self, problem: str, search_config: dict = {}, *args, **kwargs
+    ) -> list[dict]:
+        key = self._results_cache_key(problem, search_config)
+        records = self.results_cache.get(key)
+        if records is None:
+            if self.retrieval_mode == "vector":
+                docs = await self.vectorizer.asimilarity_search_with_relevance_scores(
+                    problem,
+                    search_config,
+                    filter={"_version": self.engine.version},
+                )
+                records = self._records_for_docs([doc for doc, _ in docs])
+            else:
+                records = await self.ahybrid_search(
+                    problem, search_config.get("k", 4), self.retrieval_mode
+                )
+            self.results_cache.put(key, records)
+
+        return [dict(record) for record in records]
+
+    @timed("store_get_entries_batch")
+    async def aget_entries_for_problems(
+        self, problems: list[str], search_config: dict = {}
+    ) -> list[list[dict]]:
+        """
+        `aget_entries_similar_to_problem` for many problems at once: problems missing
+        from the results cache are embedded together and searched together (one
+        matrix search for the NumPy index). Hybrid and keyword searches run concurrently.
+
+        The batch search takes `k` only. With other options (e.g. `score_threshold`)
+        every problem is searched as `aget_entries_similar_to_problem` would.
+        """
+        if self.retrieval_mode == "vector" and set(search_config) - {"k"}:
+            unique = list(dict.fromkeys(problems))
+            found = await asyncio.gather(
+                *(self.aget_entries_similar_to_problem(p, search_config) for p in unique)
+            )
+            found = dict(zip(unique, found))
+            return [[dict(record) for record in found[problem]] for problem in problems]
+
+        keys = [self._results_cache_key(problem, search_config) for problem in problems]
+        results = [self.results_cache.get(key) for key in keys]
+        # a problem repeated in the batch is searched once
+        missing = list(dict.fromkeys(p for p, r in zip(problems, results) if r is None))
+
+        if missing:
+            k = search_config.get("k", 4)
+            if self.retrieval_mode == "vector":
+                vectors = await self.vectorizer.aembed_queries(missing)
+                found = await self.vectorizer.asimilarity_search_by_vectors(
+                    vectors, k, filter={"_version": self.engine.version}
+                )
+                found = [self._records_for_docs(docs) for docs in found]
+            else:
+                found = await asyncio.gather(
+                    *(self.ahybrid_search(p, k, self.retrieval_mode) for p in missing)
+                )
+            found = dict(zip(missing, found))
+
+            for i, (problem, key) in enumerate(zip(problems, keys)):
+                if results[i] is None:
+                    results[i] = found[problem]
+                    self.results_cache.put(key, results[i])
+
+        return [[dict(record) for record in records] for records in results]
+
+    def hybrid_search(
+        self, problem: str, k: int = 4, mode: RetrievalMode = "hybrid"
+    ) -> list[dict]:
+        """
+        Entries of the live version for `problem`, best first. `hybrid` fuses the
+        keyword (BM25) and vector rankings with reciprocal rank fusion, `keyword` uses
+        the keyword index only, nothing is embedded.
+        """
+        version = self.engine.version
+        candidates = self._fusion_candidates(k, mode)
+        rankings = [
+            [row_id for row_id, _ in self.engine.keyword_search(problem, version, candidates)]
+        ]
+        if mode != "keyword":
+            # only ranks are fused, scores aren't needed
+            docs = self.vectorizer.similarity_search(
+                problem, {"k": candidates, "filter": {"_version": version}}
+            )
+            rankings.append([doc.metadata["_db_id"] for doc in docs])
+        return self._records_for_ids(reciprocal_rank_fusion(rankings, self.rrf_k)[:k])
+
+    async def ahybrid_search(
+        self, problem: str, k: int = 4, mode: RetrievalMode = "hybrid"
+    ) -> list[dict]:
+        version = self.engine.version
+        candidates = self._fusion_candidates(k, mode)
+        # a bounded pool, not `asyncio.to_thread`: a batch starts a search per problem
+        loop = asyncio.get_running_loop()
+        keyword = await loop.run_in_executor(
+            self._keyword_pool,
+            functools.partial(
+                contextvars.copy_context().run,
+                self.engine.keyword_search,
+                problem,
+                version,
+                candidates,
+            ),
         )
+        rankings = [[row_id for row_id, _ in keyword]]
+        if mode != "keyword":
+            docs = await self.vectorizer.asimilarity_search(
+                problem, {"k": candidates, "filter": {"_version": version}}
+            )
+            rankings.append([doc.metadata["_db_id"] for doc in docs])
+        return self._records_for_ids(reciprocal_rank_fusion(rankings, self.rrf_k)[:k])
+
+    @staticmethod
+    def _fusion_candidates(k: int, mode: RetrievalMode) -> int:
+        # rows ranked low by one search can still win with the other one
+        return k if mode == "keyword" else max(4 * k, 20)
+
+    def _results_cache_key(self, problem: str, search_config: dict) -> tuple:
+        config = tuple(sorted((k, repr(v)) for k, v in search_config.items()))
+        return (normalize_text(problem), config, self.engine.version)
+
+    def _records_for_ids(self, ids: list[int]) -> list[dict]:
+        """Records of the rows with DB `ids`, in the order of `ids`."""
+        records = self.records
+        if records is None or not ids:
+            return []
+        return records.records_for_ids(ids)
+
+    def _records_for_docs(self, docs: list[Document]) -> list[dict]:
+        """Records of the rows of `docs`, in the order of `docs`, each row once."""
         logger.debug("GET_ENTRIES docs retrieved {docs_len}", docs_len=len(docs))
-        logger.debug("GET_ENTRIES {docs}", docs=docs)
+        return self._records_for_ids(list(dict.fromkeys(doc.metadata["_db_id"] for doc in docs)))
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = 60) -> list[int]:
+    """
+    Ids ordered by `sum(1 / (k + rank))` over the rankings they appear in (rank is
+    1-based), so rows ranked high by several searches come first.
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, row_id in enumerate(ranking, start=1):
+            scores[row_id] += 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def describe_projection(projection: Optional[Projection]) -> str:
+    return f"{projection.name} to {projection.dim} dimensions" if projection else "no"
 
-        doc_ids = {doc.metadata["_db_id"] for (doc, _) in docs}
-        logger.debug(
-            "GET_ENTRIES unique doc_ids retrieved {doc_ids_len}",
-            doc_ids_len=len(doc_ids),
-        )
-        records = self.df[self.df["_id"].isin(doc_ids)].to_dict(orient="records")
 
-        return records
+def row_hashes(df: pd.DataFrame) -> list[int]:
+    """Per-row content hash, computed column-wise by pandas."""
+    return pd.util.hash_pandas_object(df, index=False).tolist()
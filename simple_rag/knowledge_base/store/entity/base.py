@@ -63,12 +63,35 @@ class BaseEntity(Base):
     version = Column(Integer, default=0)
     vectorized = Column(Boolean, default=False)
 
+    # DataFrame columns with an equality index in `Store`, for O(1) `Store.get`
+    indexed_columns: tuple[str, ...] = ()
+
     @classmethod
     @abstractmethod
     def from_row(cls, row: pd.Series, version: int):
         '''Create instance from a DataFrame row'''
         raise NotImplementedError("Subclasses must implement this method")
     
+    @classmethod
+    def records_from_df(cls, df: pd.DataFrame, version: int) -> list[dict]:
+        '''
+        Turn a whole DataFrame into a list of column->value mappings suitable for
+        a bulk (executemany) INSERT.
+
+        The default implementation goes through `from_row` for every row, so any entity
+        supports bulk insertion out of the box. Override it with a column-wise
+        implementation if the entity is used for large DataFrames.
+        '''
+        # `id` and `vectorized` are filled in by the DB defaults
+        columns = [
+            c.key for c in cls.__table__.columns if c.key not in ("id", "vectorized")
+        ]
+        records = []
+        for _, row in df.iterrows():
+            entity = cls.from_row(row, version)
+            records.append({col: getattr(entity, col) for col in columns})
+        return records
+
     @classmethod
     @abstractmethod
     def make_df(cls, batch: list[Self]) -> pd.DataFrame:
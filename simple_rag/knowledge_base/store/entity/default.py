@@ -10,6 +10,14 @@ class SampleKBase(BaseEntity):
     description = Column(String)
     solution = Column(String)
 
+    # DataFrame column -> ORM attribute
+    df_columns = {
+        "Question": "question",
+        "Description": "description",
+        "Solution": "solution",
+    }
+    indexed_columns = ("Question",)
+
     @classmethod
     def from_row(cls, row: pd.Series, version: int):
         return cls(
@@ -19,6 +27,13 @@ class SampleKBase(BaseEntity):
             version=version
         )
     
+    @classmethod
+    def records_from_df(cls, df: pd.DataFrame, version: int) -> list[dict]:
+        records = df[list(cls.df_columns)].rename(columns=cls.df_columns)
+        records = records.astype(object).where(records.notna(), None)
+        records["version"] = version
+        return records.to_dict(orient="records")
+
     @classmethod
     def make_df(cls, batch: list[Self]):
         return pd.DataFrame(
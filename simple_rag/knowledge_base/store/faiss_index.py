@@ -0,0 +1,318 @@
+"""
+faiss_index.py - Persistent approximate nearest neighbour index (FAISS HNSW).
+
+Metadata handling, filters and the VectorStore API come from `NumpyVectorStore`, the
+vectors live in a `faiss.IndexHNSWFlat` whose internal ids are the row numbers.
+HNSW graphs can't remove nodes, so deletes only mark rows as dead: dead rows are
+excluded from every search through an id selector, and the index is rebuilt from the
+live vectors once more than `max_deleted_ratio` of the rows are dead.
+
+`save()` writes the index and the metadata to a new generation directory under
+`persist_directory`, then points the `CURRENT` file at it with one rename, so a crash
+mid-save leaves the previous save intact. On start the index file of the current
+generation is memory-mapped read-only, so serving starts without rebuilding the graph or
+reading all vectors into RAM; it is loaded into memory on the first write.
+
+Requires `faiss-cpu` (`uv sync --extra faiss`).
+"""
+
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from simple_rag.knowledge_base.store.numpy_index import NumpyVectorStore, normalize_rows
+from simple_rag.knowledge_base.store.quantization import VectorCodec
+
+_INDEX_FILE = "index.faiss"
+_COLUMNS_FILE = "columns.npz"
+_DOCS_FILE = "docs.json"
+# names the generation directory of the last complete save
+_CURRENT_FILE = "CURRENT"
+_GENERATION_PREFIX = "gen-"
+
+
+class FaissVectorStore(NumpyVectorStore):
+    """
+    HNSW index over inner product of normalized vectors, i.e. cosine similarity.
+
+    `hnsw_m` and `ef_construction` are build parameters (graph degree and build-time
+    beam width), `ef_search` is the search-time beam width: higher values trade
+    latency for recall.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        persist_directory: Optional[str] = None,
+        hnsw_m: int = 32,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        max_deleted_ratio: float = 0.5,
+        initial_capacity: int = 1024,
+    ):
+        super().__init__(embedding, initial_capacity=initial_capacity)
+        self.persist_directory = persist_directory
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.max_deleted_ratio = max_deleted_ratio
+
+        self._index: Optional[faiss.IndexHNSWFlat] = None
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        # the index is a read-only memory map of the persisted file
+        self._mapped = False
+        self._mapped_path: Optional[Path] = None
+
+        saved = _current_directory(Path(persist_directory)) if persist_directory else None
+        if saved is not None:
+            self._load(saved)
+
+    def __len__(self) -> int:
+        return int(self._alive[: self._size].sum())
+
+    # storage hooks
+
+    def _new_index(self, dim: int) -> faiss.IndexHNSWFlat:
+        index = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = self.ef_construction
+        index.hnsw.efSearch = self.ef_search
+        return index
+
+    def _init_storage(self, dim: int):
+        self._index = self._new_index(dim)
+
+    def _grow_storage(self, capacity: int):
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: self._size] = self._alive[: self._size]
+        self._alive = alive
+
+    def _adopt_vectors(self, matrix: np.ndarray) -> bool:
+        # vectors always go into the HNSW graph
+        return False
+
+    def _accepts_codes(self, codec: VectorCodec) -> bool:
+        return False
+
+    def _write_vectors(self, start: int, matrix: np.ndarray):
+        self._ensure_writable()
+        if self._index.ntotal != start:
+            raise RuntimeError(
+                f"FAISS index has {self._index.ntotal} vectors, expected {start}"
+            )
+        self._index.add(np.ascontiguousarray(matrix))
+        self._alive[start : start + len(matrix)] = True
+
+    def _read_vectors(self, rows: np.ndarray) -> np.ndarray:
+        return self._index.reconstruct_batch(np.asarray(rows, dtype=np.int64))
+
+    def _compact_storage(self, kept: np.ndarray):
+        vectors = self._read_vectors(kept)
+        self._index = self._new_index(self._dim)
+        self._mapped = False
+        if len(vectors):
+            self._index.add(vectors)
+        self._alive[: self._size] = False
+        self._alive[: len(kept)] = True
+
+    def _compact(self, keep: np.ndarray):
+        self._alive[: self._size] &= keep
+        dead = self._size - int(self._alive[: self._size].sum())
+        if dead > self.max_deleted_ratio * self._size:
+            logger.info(f"Rebuilding FAISS index without {dead} deleted vectors")
+            super()._compact(self._alive[: self._size].copy())
+
+    def _where_mask(self, where: dict) -> np.ndarray:
+        return super()._where_mask(where) & self._alive[: self._size]
+
+    def _ensure_writable(self):
+        if self._mapped:
+            logger.debug("Loading memory-mapped FAISS index into memory")
+            self._index = faiss.read_index(str(self._mapped_path))
+            self._mapped = False
+
+    # reads
+
+    def get_by_ids(self, ids: Sequence[str], /) -> list[Document]:
+        with self._lock:
+            positions = {
+                doc_id: row
+                for row, doc_id in enumerate(self._ids)
+                if self._alive[row]
+            }
+            return [self._document(positions[i]) for i in ids if i in positions]
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: Sequence[float],
+        k: int = 4,
+        filter: Optional[dict | Callable[[Document], bool]] = None,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        """Returns up to `k` approximate nearest documents with cosine similarity."""
+        return self.similarity_search_with_score_by_vectors([embedding], k, filter)[0]
+
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]] | np.ndarray,
+        k: int = 4,
+        filter: Optional[dict | Callable[[Document], bool]] = None,
+        **kwargs: Any,
+    ) -> list[list[tuple[Document, float]]]:
+        """Searches the index for all `embeddings` at once."""
+        queries = normalize_rows(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        if k <= 0:
+            return [[] for _ in queries]
+
+        with self._lock:
+            n = self._size
+            if n == 0:
+                return [[] for _ in queries]
+            if callable(filter):
+                mask = self._where_mask({}) & np.fromiter(
+                    (filter(self._document(row)) for row in range(n)), dtype=bool, count=n
+                )
+            else:
+                mask = self._where_mask(filter or {})
+
+            params = faiss.SearchParametersHNSW(efSearch=max(self.ef_search, k))
+            if not mask.all():
+                bitmap = np.packbits(mask, bitorder="little")
+                # the selector keeps a raw pointer, `bitmap` must outlive the search
+                params.sel = faiss.IDSelectorBitmap(n, faiss.swig_ptr(bitmap))
+            scores, rows = self._index.search(queries, k, params=params)
+
+            return [
+                [
+                    (self._document(int(row)), float(score))
+                    for score, row in zip(query_scores, query_rows)
+                    if row >= 0
+                ]
+                for query_scores, query_rows in zip(scores, rows)
+            ]
+
+    # persistence
+
+    def save(self, directory: Optional[str] = None):
+        """
+        Writes the index and metadata as a new generation and switches to it atomically.
+        Without a directory (in-memory index) this is a no-op.
+        """
+        if not (directory or self.persist_directory):
+            return
+        directory = Path(directory or self.persist_directory)
+        generation = f"{_GENERATION_PREFIX}{uuid.uuid4().hex}"
+        target = directory / generation
+        target.mkdir(parents=True)
+
+        with self._lock:
+            n = self._size
+            if self._mapped:
+                # the mapped file is what was saved last, it is linked, not rewritten
+                _link_or_copy(self._mapped_path, target / _INDEX_FILE)
+            elif self._index is not None:
+                faiss.write_index(self._index, str(target / _INDEX_FILE))
+            columns = {field: values[:n] for field, values in self._columns.items()}
+            _savez(str(target / _COLUMNS_FILE), alive=self._alive[:n], **columns)
+            docs = {"ids": self._ids, "texts": self._texts, "metadatas": self._metadatas}
+            (target / _DOCS_FILE).write_text(
+                json.dumps(docs, ensure_ascii=False, default=_json_scalar)
+            )
+
+            _replace(directory / _CURRENT_FILE, lambda p: Path(p).write_text(generation))
+            if self._mapped and directory == Path(self.persist_directory):
+                self._mapped_path = target / _INDEX_FILE
+        _remove_old_generations(directory, generation)
+        logger.debug(f"Saved FAISS index with {n} vectors to {target}")
+
+    def _load(self, directory: Path):
+        self._index = faiss.read_index(str(directory / _INDEX_FILE), faiss.IO_FLAG_MMAP_IFC)
+        self._index.hnsw.efSearch = self.ef_search
+        self._mapped = True
+        self._mapped_path = directory / _INDEX_FILE
+        self._dim = self._index.d
+
+        docs = json.loads((directory / _DOCS_FILE).read_text())
+        self._ids, self._texts, self._metadatas = docs["ids"], docs["texts"], docs["metadatas"]
+        self._size = len(self._ids)
+        if self._index.ntotal != self._size:
+            raise RuntimeError(
+                f"{directory}: index has {self._index.ntotal} vectors, "
+                f"metadata has {self._size} rows"
+            )
+
+        self._capacity = max(self._capacity, self._size)
+        with np.load(directory / _COLUMNS_FILE) as columns:
+            self._alive = np.zeros(self._capacity, dtype=bool)
+            self._alive[: self._size] = columns["alive"]
+            for field in self._columns:
+                values = np.empty(self._capacity, dtype=np.int64)
+                values[: self._size] = columns[field]
+                self._columns[field] = values
+        logger.info(f"Memory-mapped FAISS index with {self._size} vectors from {directory}")
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> "FaissVectorStore":
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+
+def _json_scalar(value: Any) -> Any:
+    # numpy scalars in metadata, e.g. `_db_id` taken from a DataFrame
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+def _savez(path: str, **arrays: np.ndarray):
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def _replace(path: Path, write: Callable[[str], Any]):
+    tmp = path.with_name(path.name + ".tmp")
+    write(str(tmp))
+    os.replace(tmp, path)
+
+
+def _current_directory(directory: Path) -> Optional[Path]:
+    """
+    The directory with the files of the last complete save: the generation named by
+    `CURRENT`, or `directory` itself for indexes saved before generations.
+    """
+    current = directory / _CURRENT_FILE
+    if current.exists():
+        directory = directory / current.read_text().strip()
+    return directory if (directory / _INDEX_FILE).exists() else None
+
+
+def _link_or_copy(source: Path, target: Path):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def _remove_old_generations(directory: Path, keep: str):
+    """Removes older generations, unfinished saves and files of the flat layout."""
+    # a memory-mapped file stays readable after it is unlinked
+    for path in directory.iterdir():
+        if path.name.startswith(_GENERATION_PREFIX) and path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+        elif path.name in (_INDEX_FILE, _COLUMNS_FILE, _DOCS_FILE):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,167 @@
+"""
+keyword_index.py - SQLite FTS5 (BM25) index over the text columns of an entity table.
+
+The index is a virtual table `<table>_fts` whose rowid is the entity id, with the text
+columns and an unindexed `version`, the version the row was inserted with. Rows carried
+over to a newer version are not reindexed: searches filter by the version of the entity
+row. `DBEngine` writes it in the same transactions as the entity table, so a version is
+searchable exactly when its rows are committed, and is gone after a rollback or cleanup.
+
+Queries are plain user text: every token (words, error codes like `0x80070005`,
+`ERR-42`) becomes a quoted FTS5 phrase and tokens are OR-ed, BM25 ranks rows matching
+more and rarer tokens higher. The `unicode61` tokenizer folds case and diacritics for
+any script, Cyrillic included.
+
+Words found in a large share of the rows ("how", "do", "my") are left out of queries:
+they barely change BM25 ranks, but every row they match would have to be ranked.
+Document frequencies come from an `fts5vocab` table and are cached until the next write
+(or for a few minutes, other processes may write the same DB).
+"""
+
+import re
+from typing import Type
+
+from sqlalchemy import Connection, String, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from simple_rag.cache.lru import LRUCache
+from simple_rag.knowledge_base.store.entity.base import BaseEntity
+
+# words, optionally joined by punctuation inside codes and versions: ERR-42, v1.2, a/b
+_TOKEN = re.compile(r"\w+(?:[-.:/]\w+)*")
+_WORD = re.compile(r"\w+")
+
+# words in more than this share of the rows are dropped from queries, unless they
+# are in fewer rows than the minimum (ranking those is cheap anyway)
+_COMMON_WORD_SHARE = 0.2
+_COMMON_WORD_MIN_ROWS = 100
+# cache key of the number of indexed rows, next to per-word document frequencies
+_ROWS = ""
+
+
+def keyword_tokens(query: str) -> list[str]:
+    return list(dict.fromkeys(t.lower() for t in _TOKEN.findall(query)))
+
+
+def keyword_query(query: str | list[str]) -> str:
+    """FTS5 MATCH expression for free text (or its tokens), empty if there are none."""
+    tokens = keyword_tokens(query) if isinstance(query, str) else query
+    return " OR ".join('"' + token.replace('"', '""') + '"' for token in tokens)
+
+
+class KeywordIndex:
+    def __init__(self, entity_class: Type[BaseEntity]):
+        self.entity_table = entity_class.__tablename__
+        self.table = f"{self.entity_table}_fts"
+        self.vocab_table = f"{self.table}_vocab"
+        self.columns = [
+            c.key for c in entity_class.__table__.columns if isinstance(c.type, String)
+        ]
+        self._doc_freq = LRUCache(max_entries=10_000, ttl_s=300)
+
+    def create(self, connection: Connection) -> bool:
+        """
+        Creates the index if it doesn't exist and indexes rows already in the entity
+        table. Returns False if SQLite is built without FTS5.
+        """
+        if connection.dialect.has_table(connection, self.table):
+            return True
+
+        self._doc_freq.clear()
+        columns = ", ".join(self.columns)
+        try:
+            connection.execute(
+                text(
+                    f"CREATE VIRTUAL TABLE {self.table} USING fts5("
+                    f"{columns}, version UNINDEXED, "
+                    "tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            )
+        except OperationalError:
+            return False
+        connection.execute(
+            text(f"CREATE VIRTUAL TABLE {self.vocab_table} USING fts5vocab({self.table}, 'row')")
+        )
+        connection.execute(
+            text(
+                f"INSERT INTO {self.table} (rowid, {columns}, version) "
+                f"SELECT id, {columns}, version FROM {self.entity_table}"
+            )
+        )
+        return True
+
+    def add_version(self, session: Session, version: int):
+        self._doc_freq.clear()
+        columns = ", ".join(self.columns)
+        session.execute(
+            text(
+                f"INSERT INTO {self.table} (rowid, {columns}, version) "
+                f"SELECT id, {columns}, version FROM {self.entity_table} "
+                "WHERE version = :version"
+            ),
+            {"version": version},
+        )
+
+    def delete_version(self, session: Session, version: int):
+        self._doc_freq.clear()
+        session.execute(
+            text(f"DELETE FROM {self.table} WHERE version = :version"), {"version": version}
+        )
+
+    def delete_removed_rows(self, session: Session):
+        """Deletes entries of rows no longer in the entity table."""
+        self._doc_freq.clear()
+        session.execute(
+            text(
+                f"DELETE FROM {self.table} "
+                f"WHERE rowid NOT IN (SELECT id FROM {self.entity_table})"
+            )
+        )
+
+    def search(
+        self, connection: Connection, query: str, version: int, limit: int
+    ) -> list[tuple[int, float]]:
+        """Ids of the best matching rows of `version` with BM25 scores, best first."""
+        match = keyword_query(self._informative_tokens(connection, keyword_tokens(query)))
+        if not match:
+            return []
+        rows = connection.execute(
+            text(
+                f"SELECT {self.table}.rowid, bm25({self.table}) AS rank FROM {self.table} "
+                f"JOIN {self.entity_table} AS e ON e.id = {self.table}.rowid "
+                f"WHERE {self.table} MATCH :match AND e.version = :version "
+                "ORDER BY rank LIMIT :limit"
+            ),
+            {"match": match, "version": version, "limit": limit},
+        )
+        # bm25() is lower for better matches
+        return [(row_id, -rank) for row_id, rank in rows]
+
+    def _informative_tokens(self, connection: Connection, tokens: list[str]) -> list[str]:
+        """`tokens` without common words; the rarest word is kept if all are common."""
+        words = [token for token in tokens if _WORD.fullmatch(token)]
+        if not words:
+            return tokens
+
+        freq = {word: self._frequency(connection, word) for word in words}
+        limit = max(
+            _COMMON_WORD_SHARE * self._frequency(connection, _ROWS), _COMMON_WORD_MIN_ROWS
+        )
+        kept = [t for t in tokens if t not in freq or freq[t] <= limit]
+        return kept or [min(words, key=freq.get)]
+
+    def _frequency(self, connection: Connection, word: str) -> int:
+        """Number of indexed rows containing `word`, of all rows for `_ROWS`."""
+        count = self._doc_freq.get(word)
+        if count is None:
+            if word == _ROWS:
+                count = connection.execute(text(f"SELECT count(*) FROM {self.table}")).scalar()
+            else:
+                count = connection.execute(
+                    text(f"SELECT doc FROM {self.vocab_table} WHERE term = :term"),
+                    {"term": word},
+                ).scalar()
+            count = count or 0
+            self._doc_freq.put(word, count)
+        return count
@@ -0,0 +1,559 @@
+"""
+numpy_index.py - Exact in-memory vector index backed by NumPy arrays.
+
+All vectors are L2-normalized and kept in one contiguous float32 matrix, so a search is
+a single matrix-vector product followed by `argpartition` top-k. `_version` and `_db_id`
+metadata live in parallel int64 arrays, so version filters are boolean masks and deletes
+compact the arrays in bulk.
+
+The matrix can be quantized to float16 or int8 (see `quantization.py`), and a binary
+prefilter can pick candidates by Hamming distance before they are scored exactly.
+"""
+
+import threading
+import uuid
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from simple_rag.knowledge_base.store.quantization import (
+    Quantization,
+    VectorCodec,
+    binary_codes,
+    hamming_distances,
+    make_codec,
+)
+
+# metadata fields mirrored in NumPy arrays
+_INDEXED_FIELDS = ("_version", "_db_id")
+_MISSING_ID = -1
+
+_COMPARATORS = {
+    "$eq": np.equal,
+    "$ne": np.not_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+}
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact cosine search over all stored vectors.
+
+    Filters are Chroma-style `where` dicts: `{"_version": 3}`,
+    `{"_version": {"$lt": 3}}`, `{"_db_id": {"$in": [...]}}`, `{"$and": [...]}`.
+    Conditions on `_version`/`_db_id` are evaluated on the NumPy arrays, other fields
+    fall back to a scan over metadata dicts. A callable `filter(doc) -> bool` is
+    accepted as well, like `InMemoryVectorStore`.
+
+    `quantization` is the storage type of the vectors: float32, float16 (half the
+    memory, slower scoring without the prefilter) or int8 (a quarter of the memory).
+    With `binary_prefilter` the `k * rescore_factor` rows nearest by Hamming distance of
+    the sign bits are scored, instead of every row.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        initial_capacity: int = 1024,
+        quantization: Quantization = "float32",
+        binary_prefilter: bool = False,
+        rescore_factor: int = 10,
+    ):
+        self.embedding = embedding
+        self.codec: VectorCodec = make_codec(quantization)
+        self.binary_prefilter = binary_prefilter
+        self.rescore_factor = rescore_factor
+        self._lock = threading.Lock()
+        self._size = 0
+        self._dim: Optional[int] = None
+        self._capacity = max(int(initial_capacity), 1)
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        self._bits = np.empty((0, 0), dtype=np.uint8)
+        self._columns = {
+            field: np.empty(self._capacity, dtype=np.int64) for field in _INDEXED_FIELDS
+        }
+        self._ids: list[str] = []
+        self._texts: list[str] = []
+        self._metadatas: list[dict] = []
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return self._size
+
+    def memory_bytes(self) -> int:
+        """Memory taken by the stored vectors (and binary codes) of all rows."""
+        size = self._size
+        return self._vectors[:size].nbytes + (
+            self._bits[:size].nbytes if self.binary_prefilter else 0
+        )
+
+    # writes
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = self.embedding.embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas, ids=ids)
+
+    async def aadd_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = await self.embedding.aembed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas, ids=ids)
+
+    def add_vectors(
+        self,
+        vectors: Sequence[Sequence[float]] | np.ndarray,
+        texts: list[str],
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        normalized: bool = False,
+        codec: Optional[VectorCodec] = None,
+    ) -> list[str]:
+        """
+        Adds already computed embeddings, no model call. A read-only matrix of
+        `normalized` vectors added to an empty store (a memory-mapped snapshot) is used
+        as is, without a copy, until the first write.
+
+        With `codec`, `vectors` are codes of that codec (e.g. an int8 snapshot); they
+        are stored as is if the store is empty and uses the same quantization.
+        """
+        encoded = codec is not None and self._accepts_codes(codec)
+        if encoded:
+            matrix = np.atleast_2d(vectors)
+        else:
+            if codec is not None:
+                vectors = codec.decode(np.atleast_2d(vectors))
+            matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+            if not normalized:
+                matrix = normalize_rows(matrix)
+        metadatas = [dict(m or {}) for m in metadatas] if metadatas else [{} for _ in texts]
+        ids = [i or str(uuid.uuid4()) for i in ids] if ids else [str(uuid.uuid4()) for _ in texts]
+        if not len(matrix) == len(texts) == len(metadatas) == len(ids):
+            raise ValueError("vectors, texts, metadatas and ids must have the same length")
+
+        columns = {
+            field: np.fromiter(
+                (m.get(field, _MISSING_ID) for m in metadatas), dtype=np.int64, count=len(texts)
+            )
+            for field in _INDEXED_FIELDS
+        }
+        with self._lock:
+            if encoded:
+                self.codec = codec
+            self._append(matrix, columns, list(texts), metadatas, ids, encoded=encoded)
+        return ids
+
+    def _accepts_codes(self, codec: VectorCodec) -> bool:
+        return self._size == 0 and codec.name == self.codec.name
+
+    def _append(
+        self,
+        matrix: np.ndarray,
+        columns: dict[str, np.ndarray],
+        texts: list[str],
+        metadatas: list[dict],
+        ids: list[str],
+        encoded: bool = False,
+    ):
+        """Appends rows; `matrix` holds float32 vectors, or codes if `encoded`."""
+        if self._dim is not None and matrix.shape[1] != self._dim:
+            raise ValueError(f"expected vectors of size {self._dim}, got {matrix.shape[1]}")
+
+        start, end = self._size, self._size + len(matrix)
+        adopted = (
+            start == 0
+            and (encoded or self.codec.name == "float32")
+            and self._adopt_vectors(matrix)
+        )
+        if self._dim is None:
+            self._dim = matrix.shape[1]
+            if not adopted:
+                self._init_storage(self._dim)
+
+        if end > self._capacity:
+            self._grow(end)
+
+        if encoded and not adopted:
+            self._write_codes(start, matrix)
+        elif not adopted:
+            self._write_vectors(start, matrix)
+        for field, values in columns.items():
+            self._columns[field][start:end] = values
+        self._ids.extend(ids)
+        self._texts.extend(texts)
+        self._metadatas.extend(metadatas)
+        self._size = end
+
+    def _grow(self, min_capacity: int):
+        capacity = self._capacity
+        while capacity < min_capacity:
+            capacity *= 2
+
+        self._grow_storage(capacity)
+        for field, values in self._columns.items():
+            grown = np.empty(capacity, dtype=np.int64)
+            grown[: self._size] = values[: self._size]
+            self._columns[field] = grown
+        self._capacity = capacity
+
+    # vector storage, overridden by index-backed subclasses
+
+    def _init_storage(self, dim: int):
+        self._vectors = np.empty((self._capacity, dim), dtype=self.codec.dtype)
+        if self.binary_prefilter:
+            self._bits = np.empty((self._capacity, (dim + 7) // 8), dtype=np.uint8)
+
+    def _grow_storage(self, capacity: int):
+        vectors = np.empty((capacity, self._dim), dtype=self.codec.dtype)
+        vectors[: self._size] = self._vectors[: self._size]
+        self._vectors = vectors
+        if self.binary_prefilter:
+            bits = np.empty((capacity, self._bits.shape[1]), dtype=np.uint8)
+            bits[: self._size] = self._bits[: self._size]
+            self._bits = bits
+
+    def _adopt_vectors(self, matrix: np.ndarray) -> bool:
+        if (
+            matrix.flags.writeable
+            or not matrix.flags.c_contiguous
+            or matrix.dtype != self.codec.dtype
+        ):
+            return False
+        self._vectors = matrix
+        self._capacity = len(matrix)
+        self._columns = {
+            field: np.empty(self._capacity, dtype=np.int64) for field in self._columns
+        }
+        if self.binary_prefilter:
+            self._bits = binary_codes(matrix)
+        return True
+
+    def _write_vectors(self, start: int, matrix: np.ndarray):
+        self.codec.fit(matrix, self._vectors[:start])
+        self._write_codes(start, self.codec.encode(matrix))
+
+    def _write_codes(self, start: int, codes: np.ndarray):
+        self._vectors[start : start + len(codes)] = codes
+        if self.binary_prefilter:
+            # scales are positive, so codes have the signs of the vectors
+            self._bits[start : start + len(codes)] = binary_codes(codes)
+
+    def _read_vectors(self, rows: np.ndarray) -> np.ndarray:
+        return self.codec.decode(self._vectors[rows])
+
+    def _compact_storage(self, kept: np.ndarray):
+        if self.binary_prefilter:
+            self._bits[: len(kept)] = self._bits[kept]
+        if not self._vectors.flags.writeable:
+            # adopted read-only matrix, the store gets its own copy
+            vectors = np.empty((self._capacity, self._dim), dtype=self.codec.dtype)
+            vectors[: len(kept)] = self._vectors[kept]
+            self._vectors = vectors
+            return
+        # rows only move towards the start, so the gather can be done in place
+        self._vectors[: len(kept)] = self._vectors[kept]
+
+    def delete(
+        self,
+        ids: Optional[list[str]] = None,
+        where: Optional[dict] = None,
+        **kwargs: Any,
+    ) -> Optional[bool]:
+        """Deletes by ids and/or a `where` filter, compacting the arrays once."""
+        with self._lock:
+            drop = np.zeros(self._size, dtype=bool)
+            if ids:
+                wanted = set(ids)
+                drop |= np.fromiter(
+                    (i in wanted for i in self._ids), dtype=bool, count=self._size
+                )
+            if where:
+                drop |= self._where_mask(where)
+            if drop.any():
+                self._compact(~drop)
+        return True
+
+    def _compact(self, keep: np.ndarray):
+        kept = np.flatnonzero(keep)
+        size = len(kept)
+        self._compact_storage(kept)
+        for values in self._columns.values():
+            values[:size] = values[kept]
+        self._ids = [self._ids[i] for i in kept]
+        self._texts = [self._texts[i] for i in kept]
+        self._metadatas = [self._metadatas[i] for i in kept]
+        self._size = size
+
+    def retag_vectors(
+        self, db_ids: Iterable[int], old_version: int, new_version: int
+    ) -> set[int]:
+        """Moves rows of `old_version` whose `_db_id` is in `db_ids` to `new_version`."""
+        db_ids = list(db_ids)
+        if not db_ids:
+            return set()
+
+        with self._lock:
+            rows = np.flatnonzero(
+                self._where_mask({"_version": old_version, "_db_id": {"$in": db_ids}})
+            )
+            self._columns["_version"][rows] = new_version
+            for row in rows:
+                self._metadatas[row] = {**self._metadatas[row], "_version": new_version}
+            return {int(i) for i in self._columns["_db_id"][rows]}
+
+    # reads
+
+    def get_vectors(self, version: int) -> tuple[np.ndarray, np.ndarray]:
+        """DB ids and vectors of all rows of `version`."""
+        with self._lock:
+            rows = np.flatnonzero(self._where_mask({"_version": version}))
+            return self._columns["_db_id"][rows].copy(), self._read_vectors(rows)
+
+    def get_by_ids(self, ids: Sequence[str], /) -> list[Document]:
+        with self._lock:
+            positions = {doc_id: row for row, doc_id in enumerate(self._ids)}
+            return [self._document(positions[i]) for i in ids if i in positions]
+
+    def _document(self, row: int) -> Document:
+        return Document(
+            id=self._ids[row],
+            page_content=self._texts[row],
+            metadata=dict(self._metadatas[row]),
+        )
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: Sequence[float],
+        k: int = 4,
+        filter: Optional[dict | Callable[[Document], bool]] = None,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        """Returns up to `k` documents with their cosine similarity, best first."""
+        if k <= 0:
+            return []
+        query = normalize_rows(np.asarray(embedding, dtype=np.float32))
+
+        with self._lock:
+            selected = self._filtered_range(filter)
+            if selected is None:
+                return []
+            rows, scores = self._search_range(*selected, query, k)
+            return [(self._document(row), float(score)) for row, score in zip(rows, scores)]
+
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]] | np.ndarray,
+        k: int = 4,
+        filter: Optional[dict | Callable[[Document], bool]] = None,
+        **kwargs: Any,
+    ) -> list[list[tuple[Document, float]]]:
+        """
+        `similarity_search_with_score_by_vector` for every row of `embeddings`. The
+        filter is evaluated once, and a float32 index scores all queries with one
+        matrix product.
+        """
+        queries = normalize_rows(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        if k <= 0:
+            return [[] for _ in queries]
+
+        with self._lock:
+            selected = self._filtered_range(filter)
+            if selected is None:
+                return [[] for _ in queries]
+            lo, hi, mask = selected
+            if self.binary_prefilter or self.codec.name != "float32":
+                found = [self._search_range(lo, hi, mask, query, k) for query in queries]
+            else:
+                scores = self._vectors[lo:hi] @ queries.T
+                if mask is not None:
+                    scores[~mask] = -np.inf
+                top_k = min(k, hi - lo if mask is None else int(mask.sum()))
+                found = []
+                for column in scores.T:
+                    top = self._top_k(column, top_k)
+                    found.append((lo + top, column[top]))
+            return [
+                [(self._document(row), float(score)) for row, score in zip(rows, row_scores)]
+                for rows, row_scores in found
+            ]
+
+    def _filtered_range(
+        self, filter: Optional[dict | Callable[[Document], bool]]
+    ) -> Optional[tuple[int, int, Optional[np.ndarray]]]:
+        """
+        `(lo, hi, mask)`: the rows matching `filter` are in `lo:hi`, where `mask`
+        (relative to `lo`) is set, or all of them if it is None. None if no row matches.
+        """
+        n = self._size
+        if isinstance(filter, dict):
+            mask = self._where_mask(filter)
+        elif callable(filter):
+            mask = np.fromiter(
+                (filter(self._document(row)) for row in range(n)), dtype=bool, count=n
+            )
+        else:
+            mask = None
+
+        if mask is None:
+            lo, hi = 0, n
+        else:
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                return None
+            # versions are appended in blocks, so the matching rows usually are
+            # one contiguous range and only that range has to be scored (rows carried
+            # over to a new version stay in place until old versions are cleared)
+            lo, hi = int(rows[0]), int(rows[-1]) + 1
+            mask = None if len(rows) == hi - lo else mask[lo:hi]
+        if hi == lo:
+            return None
+        return lo, hi, mask
+
+    def _search_range(
+        self, lo: int, hi: int, mask: Optional[np.ndarray], query: np.ndarray, k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Top `k` rows in `lo:hi` (where `mask`, relative to `lo`) and their scores."""
+        valid = hi - lo if mask is None else int(mask.sum())
+        k = min(k, valid)
+        candidates = k * self.rescore_factor
+        if self.binary_prefilter and candidates < valid:
+            distances = hamming_distances(self._bits[lo:hi], binary_codes(query))
+            if mask is not None:
+                distances[~mask] = np.iinfo(distances.dtype).max
+            rows = lo + np.argpartition(distances, candidates - 1)[:candidates]
+            scores = self.codec.score(self._vectors[rows], query)
+            top = self._top_k(scores, k)
+            return rows[top], scores[top]
+
+        scores = self.codec.score(self._vectors[lo:hi], query)
+        if mask is not None:
+            scores[~mask] = -np.inf
+        top = self._top_k(scores, k)
+        return lo + top, scores[top]
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        embedding = self.embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, **kwargs)
+
+    async def asimilarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        embedding = await self.embedding.aembed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, **kwargs)
+
+    def similarity_search_by_vector(
+        self, embedding: list[float], k: int = 4, **kwargs: Any
+    ) -> list[Document]:
+        return [
+            doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)
+        ]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    async def asimilarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # scores are cosine similarities in [-1, 1], relevance scores are in [0, 1]
+        return lambda score: (1.0 + score) / 2.0
+
+    # filters
+
+    def _where_mask(self, where: dict) -> np.ndarray:
+        mask = np.ones(self._size, dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._where_mask(clause)
+            elif key == "$or":
+                mask &= np.logical_or.reduce(
+                    [self._where_mask(clause) for clause in condition]
+                    or [np.zeros(self._size, dtype=bool)]
+                )
+            else:
+                mask &= self._field_mask(key, condition)
+        return mask
+
+    def _field_mask(self, field: str, condition: Any) -> np.ndarray:
+        if field in self._columns:
+            values = self._columns[field][: self._size]
+        else:
+            values = np.array(
+                [m.get(field) for m in self._metadatas[: self._size]], dtype=object
+            )
+
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        mask = np.ones(self._size, dtype=bool)
+        for op, operand in condition.items():
+            if op == "$in":
+                mask &= np.isin(values, list(operand))
+            elif op == "$nin":
+                mask &= ~np.isin(values, list(operand))
+            elif op in _COMPARATORS:
+                mask &= _COMPARATORS[op](values, operand).astype(bool)
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        return mask
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
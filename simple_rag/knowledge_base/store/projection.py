@@ -0,0 +1,176 @@
+"""
+projection.py - Dimensionality reduction of embedding vectors before indexing.
+
+- pca: principal components of the KB's own embeddings, fitted at ingestion time
+- truncate: the first `dim` dimensions (Matryoshka-style models are trained for it)
+
+Documents and queries go through the same projection, `ProjectedEmbeddings` applies it
+to queries. Projected vectors are L2-normalized, search stays cosine.
+
+A fitted projection is saved with the KB version it was fitted on (`save_projection`),
+so a restarted store projects queries exactly like the stored vectors.
+"""
+
+import os
+from pathlib import Path
+from typing import Literal, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from simple_rag.cache.embeddings import aembed_queries, embed_queries
+from simple_rag.knowledge_base.store.numpy_index import normalize_rows
+
+ProjectionType = Literal["pca", "truncate"]
+
+# rows used to fit PCA, a random sample of them for larger KBs
+_MAX_FIT_ROWS = 50_000
+# rows sampled to fit a projection before catch-up vectorization; their full-size
+# vectors are kept until their batch is stored
+FIT_SAMPLE_ROWS = 10_000
+
+
+class Projection:
+    name: ProjectionType
+
+    def __init__(self, dim: int):
+        self.dim = int(dim)
+
+    @property
+    def fitted(self) -> bool:
+        return True
+
+    def fit(self, vectors: np.ndarray) -> "Projection":
+        """Returns the projection fitted on `vectors`, `self` is left as is."""
+        return self
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def state(self) -> dict[str, np.ndarray]:
+        return {}
+
+    def same_kind(self, other: Optional["Projection"]) -> bool:
+        return other is not None and (self.name, self.dim) == (other.name, other.dim)
+
+
+class TruncateProjection(Projection):
+    name = "truncate"
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[-1] < self.dim:
+            raise ValueError(f"can't truncate {vectors.shape[-1]} dimensions to {self.dim}")
+        return normalize_rows(vectors[..., : self.dim])
+
+
+class PCAProjection(Projection):
+    """
+    `x @ components.T`, components are the top `dim` principal axes of the vectors.
+    The axes are not centered on the mean: search compares vectors by their angle,
+    and uncentered axes are the ones that keep dot products best.
+    """
+
+    name = "pca"
+
+    def __init__(self, dim: int, components: Optional[np.ndarray] = None):
+        super().__init__(dim)
+        self.components = (
+            None if components is None else np.asarray(components, dtype=np.float32)
+        )
+
+    @property
+    def fitted(self) -> bool:
+        return self.components is not None
+
+    def fit(self, vectors: np.ndarray) -> "PCAProjection":
+        vectors = normalize_rows(vectors)
+        if len(vectors) > _MAX_FIT_ROWS:
+            rows = np.random.default_rng(0).choice(len(vectors), _MAX_FIT_ROWS, replace=False)
+            vectors = vectors[rows]
+        if self.dim > vectors.shape[1]:
+            raise ValueError(f"can't project {vectors.shape[1]} dimensions to {self.dim}")
+
+        _, _, vt = np.linalg.svd(vectors, full_matrices=False)
+        components = np.zeros((self.dim, vectors.shape[1]), dtype=np.float32)
+        components[: min(self.dim, len(vt))] = vt[: self.dim]
+        if len(vt) < self.dim:
+            # fewer rows than dimensions, the rest of the axes are left empty
+            logger.warning(
+                f"PCA fitted on {len(vectors)} rows, {self.dim - len(vt)} of "
+                f"{self.dim} dimensions are unused"
+            )
+        return PCAProjection(self.dim, components)
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        if not self.fitted:
+            raise ValueError("PCA projection is not fitted yet, store some rows first")
+        return normalize_rows(normalize_rows(vectors) @ self.components.T)
+
+    def state(self) -> dict[str, np.ndarray]:
+        return {"components": self.components} if self.fitted else {}
+
+
+def make_projection(name: ProjectionType, dim: int, **state) -> Projection:
+    if name == "pca":
+        return PCAProjection(dim, **state)
+    if name == "truncate":
+        return TruncateProjection(dim)
+    raise ValueError(f"Unknown projection: {name}")
+
+
+def save_projection(projection: Projection, path: str | Path, kb_version: int):
+    """Writes the fitted `projection` to `path` (.npz), atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            name=projection.name,
+            dim=projection.dim,
+            kb_version=kb_version,
+            **projection.state(),
+        )
+    os.replace(tmp, path)
+
+
+def load_projection(path: str | Path) -> tuple[Projection, int]:
+    """Returns the projection saved to `path` and the KB version it was fitted on."""
+    with np.load(path) as data:
+        state = {key: data[key] for key in data.files}
+    name, dim, kb_version = (state.pop(key).item() for key in ("name", "dim", "kb_version"))
+    return make_projection(name, dim, **state), kb_version
+
+
+class ProjectedEmbeddings(Embeddings):
+    """
+    Embeddings of `underlying`, projected with `projection`. The projection can be
+    replaced when it is refitted; `underlying` gives the full-size vectors.
+    """
+
+    def __init__(self, underlying: Embeddings, projection: Projection):
+        self.underlying = underlying
+        self.projection = projection
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.projection.transform(self.underlying.embed_documents(texts)).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.projection.transform(self.underlying.embed_query(text)).tolist()
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors = await self.underlying.aembed_documents(texts)
+        return self.projection.transform(vectors).tolist()
+
+    async def aembed_query(self, text: str) -> list[float]:
+        vector = await self.underlying.aembed_query(text)
+        return self.projection.transform(vector).tolist()
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return self.projection.transform(embed_queries(self.underlying, texts)).tolist()
+
+    async def aembed_queries(self, texts: list[str]) -> list[list[float]]:
+        vectors = await aembed_queries(self.underlying, texts)
+        return self.projection.transform(vectors).tolist()
@@ -0,0 +1,130 @@
+"""
+quantization.py - Compact encodings of normalized embedding vectors.
+
+- float32: as is, 4 bytes per dimension
+- float16: 2 bytes per dimension
+- int8: 1 byte per dimension, symmetric scalar quantization with per-dimension scales
+
+Binary codes (1 bit per dimension, the sign) are used as a coarse prefilter: candidates
+are picked by Hamming distance and rescored with the stored vectors.
+"""
+
+from typing import Literal, Optional
+
+import numpy as np
+
+Quantization = Literal["float32", "float16", "int8"]
+
+# rows decoded to float32 at once when scoring; small enough to stay in cache
+_SCORE_CHUNK = 256
+
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+_POPCOUNT16 = (_POPCOUNT[:, None] + _POPCOUNT[None, :]).astype(np.uint8).reshape(-1)
+
+
+class VectorCodec:
+    name: Quantization = "float32"
+    dtype = np.float32
+
+    def fit(self, vectors: np.ndarray, codes: np.ndarray):
+        """Adapts the codec to new `vectors`; `codes` (already stored) are updated in place."""
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float32)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return np.asarray(codes, dtype=np.float32)
+
+    def query_weights(self, query: np.ndarray) -> np.ndarray:
+        """Query such that `decode(codes) @ query == codes @ query_weights(query)`."""
+        return query
+
+    def state(self) -> dict:
+        return {}
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """`decode(codes) @ query`, without decoding all rows at once."""
+        weights = self.query_weights(query)
+        if codes.dtype == np.float32:
+            return codes @ weights
+
+        scores = np.empty(len(codes), dtype=np.float32)
+        buffer = np.empty((min(_SCORE_CHUNK, len(codes)), codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(codes), _SCORE_CHUNK):
+            chunk = codes[start : start + _SCORE_CHUNK]
+            decoded = buffer[: len(chunk)]
+            np.copyto(decoded, chunk)
+            scores[start : start + len(chunk)] = decoded @ weights
+        return scores
+
+
+class Float16Codec(VectorCodec):
+    name = "float16"
+    dtype = np.float16
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float16)
+
+
+class Int8Codec(VectorCodec):
+    """
+    `code = round(x / scale)` per dimension, `scale = max|x| / 127` over all vectors
+    seen so far. When new vectors widen the range, stored codes are requantized.
+    """
+
+    name = "int8"
+    dtype = np.int8
+
+    def __init__(self, scales: Optional[list[float] | np.ndarray] = None):
+        self.scales = None if scales is None else np.asarray(scales, dtype=np.float32)
+
+    def fit(self, vectors: np.ndarray, codes: np.ndarray):
+        scales = np.abs(vectors).max(axis=0) / 127
+        scales[scales == 0] = np.finfo(np.float32).tiny
+        if self.scales is None:
+            self.scales = scales.astype(np.float32)
+            return
+
+        wider = scales > self.scales
+        if not wider.any():
+            return
+        new_scales = np.where(wider, scales, self.scales).astype(np.float32)
+        if len(codes):
+            factor = self.scales / new_scales
+            codes[:] = np.rint(codes * factor).astype(np.int8)
+        self.scales = new_scales
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scales), -127, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scales
+
+    def query_weights(self, query: np.ndarray) -> np.ndarray:
+        return (query * self.scales).astype(np.float32)
+
+    def state(self) -> dict:
+        return {"scales": None if self.scales is None else self.scales.tolist()}
+
+
+def make_codec(name: Quantization = "float32", **state) -> VectorCodec:
+    if name == "float32":
+        return VectorCodec()
+    if name == "float16":
+        return Float16Codec()
+    if name == "int8":
+        return Int8Codec(**state)
+    raise ValueError(f"Unknown quantization: {name}")
+
+
+def binary_codes(vectors: np.ndarray) -> np.ndarray:
+    """Sign bits of every dimension, packed: `dim / 8` bytes per row."""
+    return np.packbits(np.asarray(vectors) > 0, axis=-1)
+
+
+def hamming_distances(codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Hamming distance between every row of packed `codes` and packed `query`."""
+    if codes.shape[-1] % 2:
+        return _POPCOUNT[codes ^ query].sum(axis=1, dtype=np.uint16)
+    xor = np.ascontiguousarray(codes).view(np.uint16) ^ query.view(np.uint16)
+    return _POPCOUNT16[xor].sum(axis=1, dtype=np.uint16)
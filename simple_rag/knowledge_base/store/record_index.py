@@ -0,0 +1,70 @@
+"""
+record_index.py - In-memory records of the live KB version, indexed for lookups.
+
+`Store` keeps the rows of the live version as a DataFrame for bulk work (hashing rows
+for incremental ingest, snapshots). Per-request lookups go through `RecordIndex`
+instead: rows are kept as dicts keyed by DB id, and the columns an entity declares in
+`indexed_columns` get a hash index from value to ids. Hydrating search results and
+equality lookups on indexed columns then cost O(results), not O(rows), and allocate
+only the returned dicts.
+
+An index is built once per version and never changed. `Store` builds the index of a
+new version before replacing the old one with a single assignment, so readers see
+either the old or the new version, never a mix.
+"""
+
+from typing import Any, Iterable, Optional, Sequence
+
+import pandas as pd
+
+ID_COLUMN = "_id"
+
+
+def _indexable(value: Any) -> bool:
+    # pandas equality never matches None or NaN, neither does the index
+    return value is not None and value == value
+
+
+class RecordIndex:
+    def __init__(self, df: pd.DataFrame, indexed_columns: Sequence[str] = ()):
+        records = df.to_dict(orient="records")
+        self._by_id: dict[int, dict] = {record[ID_COLUMN]: record for record in records}
+        self.indexed_columns = tuple(c for c in indexed_columns if c in df.columns)
+
+        self._by_value: dict[str, dict[Any, list[int]]] = {}
+        for column in self.indexed_columns:
+            index: dict[Any, list[int]] = {}
+            for record in records:
+                value = record[column]
+                if _indexable(value):
+                    index.setdefault(value, []).append(record[ID_COLUMN])
+            self._by_value[column] = index
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def get(self, record_id: int) -> Optional[dict]:
+        """A copy of the record with DB id `record_id`, None if there is no such row."""
+        record = self._by_id.get(record_id)
+        return dict(record) if record is not None else None
+
+    def records_for_ids(self, ids: Iterable[int]) -> list[dict]:
+        """Copies of the records with DB `ids`, in the order of `ids`, unknown ids skipped."""
+        by_id = self._by_id
+        return [dict(by_id[i]) for i in ids if i in by_id]
+
+    def lookup(self, column: str, value: Any) -> list[dict]:
+        """
+        Copies of the records where `column` equals `value`, without the id column.
+        O(matches) for indexed columns, other columns are scanned.
+        """
+        if not _indexable(value):
+            return []
+        if column in self._by_value:
+            records = (self._by_id[i] for i in self._by_value[column].get(value, ()))
+        else:
+            records = (r for r in self._by_id.values() if r.get(column) == value)
+        return [
+            {key: val for key, val in record.items() if key != ID_COLUMN}
+            for record in records
+        ]
@@ -0,0 +1,168 @@
+"""
+snapshot.py - Store snapshot: the live KB version with its vectors, loadable without
+embedding anything.
+
+A snapshot is a directory:
+
+- rows.parquet: the rows of the version, `_id` included
+- embeddings.f32: raw row-major matrix of L2-normalized vectors, one row per row above;
+  float32, or float16/int8 codes for a quantized store (see `quantization.py`)
+- manifest.json: format, embeddings model, vector size, row count, KB version,
+  quantization and its state (int8 scales), projection
+- projection.npz: the fitted projection of the vectors, if any (see `projection.py`)
+
+The matrix is opened with `np.memmap`, so loading is I/O bound and worker processes
+loading the same snapshot share its pages through the OS page cache.
+"""
+
+import json
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from simple_rag.knowledge_base.store.projection import (
+    Projection,
+    load_projection,
+    save_projection,
+)
+from simple_rag.knowledge_base.store.quantization import VectorCodec, make_codec
+
+FORMAT_VERSION = 1
+
+_MANIFEST_FILE = "manifest.json"
+_ROWS_FILE = "rows.parquet"
+_EMBEDDINGS_FILE = "embeddings.f32"
+_PROJECTION_FILE = "projection.npz"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+@dataclass
+class SnapshotManifest:
+    embeddings_model: str
+    dim: int
+    rows: int
+    kb_version: int
+    format_version: int = FORMAT_VERSION
+    created_at: float = 0.0
+    quantization: str = "float32"
+    codec_state: dict = field(default_factory=dict)
+    projection: Optional[str] = None
+    projection_dim: Optional[int] = None
+
+    def codec(self) -> VectorCodec:
+        return make_codec(self.quantization, **self.codec_state)
+
+
+def write_snapshot(
+    path: str | Path,
+    df: pd.DataFrame,
+    vectors: np.ndarray,
+    embeddings_model: str,
+    kb_version: int,
+    codec: Optional[VectorCodec] = None,
+    projection: Optional[Projection] = None,
+) -> SnapshotManifest:
+    """
+    Writes `df` and its float32 `vectors` (same row order) to `path`, encoded with
+    `codec` (already fitted). `projection` is the fitted projection `vectors` were
+    made with. The directory is written next to `path` and renamed into place, an
+    existing snapshot is replaced.
+    """
+    codec = codec or VectorCodec()
+    if len(df) != len(vectors):
+        raise SnapshotError(f"{len(df)} rows, but {len(vectors)} vectors")
+
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    manifest = SnapshotManifest(
+        embeddings_model=embeddings_model,
+        dim=int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        rows=len(df),
+        kb_version=kb_version,
+        created_at=time.time(),
+        quantization=codec.name,
+        codec_state=codec.state(),
+        projection=projection.name if projection else None,
+        projection_dim=projection.dim if projection else None,
+    )
+    df.reset_index(drop=True).to_parquet(tmp / _ROWS_FILE, index=False)
+    np.ascontiguousarray(codec.encode(vectors), dtype=codec.dtype).tofile(
+        tmp / _EMBEDDINGS_FILE
+    )
+    if projection is not None:
+        save_projection(projection, tmp / _PROJECTION_FILE, kb_version)
+    (tmp / _MANIFEST_FILE).write_text(json.dumps(asdict(manifest)))
+
+    if path.exists():
+        old = path.with_name(path.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(tmp, path)
+
+    return manifest
+
+
+def read_manifest(path: str | Path) -> SnapshotManifest:
+    manifest = json.loads((Path(path) / _MANIFEST_FILE).read_text())
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise SnapshotError(
+            f"{path}: snapshot format {manifest.get('format_version')}, "
+            f"expected {FORMAT_VERSION}"
+        )
+    return SnapshotManifest(**manifest)
+
+
+def read_snapshot(
+    path: str | Path, embeddings_model: str
+) -> tuple[pd.DataFrame, np.ndarray, SnapshotManifest]:
+    """
+    Returns rows, memory-mapped read-only vectors (codes of `manifest.codec()`) and
+    the manifest. Raises `SnapshotError` if the snapshot was made with another
+    embeddings model.
+    """
+    path = Path(path)
+    manifest = read_manifest(path)
+    if manifest.embeddings_model != embeddings_model:
+        raise SnapshotError(
+            f"{path}: snapshot was made with {manifest.embeddings_model!r} embeddings, "
+            f"current model is {embeddings_model!r}"
+        )
+
+    df = pd.read_parquet(path / _ROWS_FILE)
+    if len(df) != manifest.rows:
+        raise SnapshotError(f"{path}: {len(df)} rows, manifest says {manifest.rows}")
+    dtype = manifest.codec().dtype
+    if not manifest.rows:
+        return df, np.empty((0, manifest.dim), dtype=dtype), manifest
+
+    vectors = np.memmap(
+        path / _EMBEDDINGS_FILE,
+        dtype=dtype,
+        mode="r",
+        shape=(manifest.rows, manifest.dim),
+    )
+    return df, vectors, manifest
+
+
+def read_projection(path: str | Path, manifest: SnapshotManifest) -> Optional[Projection]:
+    """The projection the snapshot vectors were made with, None if they are full size."""
+    if manifest.projection is None:
+        return None
+    projection, _ = load_projection(Path(path) / _PROJECTION_FILE)
+    return projection
@@ -1,7 +1,33 @@
+import asyncio
+import uuid
+from typing import Callable, Optional
+
+import numpy as np
 from langchain.vectorstores.base import VectorStore
+from langchain_chroma import Chroma
 from langchain_core.documents import Document
+from langchain_core.vectorstores import InMemoryVectorStore
 from loguru import logger
 
+from simple_rag.cache.embeddings import aembed_queries, embed_queries
+from simple_rag.metrics.latency import time_stage, timed
+
+from simple_rag.knowledge_base.store.numpy_index import normalize_rows
+from simple_rag.knowledge_base.store.projection import (
+    Projection,
+    ProjectedEmbeddings,
+    save_projection,
+)
+from simple_rag.knowledge_base.store.quantization import VectorCodec
+
+# max number of ids in one Chroma `$in` filter
+_CHROMA_CHUNK = 1000
+
+
+def metadata_filter(filter: dict) -> Callable[[Document], bool]:
+    """The `InMemoryVectorStore` form (a predicate) of an equality `filter` on metadata."""
+    return lambda doc: all(doc.metadata.get(key) == value for key, value in filter.items())
+
 
 def default_doc_transform(row: dict) -> Document:
     return Document(
@@ -12,8 +38,11 @@ def default_doc_transform(row: dict) -> Document:
 class Vectorizer:
     vector_store: VectorStore
 
-    def __init__(self, vector_store):
+    def __init__(self, vector_store, projection_path: Optional[str] = None):
         self.vector_store = vector_store
+        self.projection_path = projection_path
+        # KB version the current projection was fitted on
+        self.projection_version: Optional[int] = None
 
     def transform_row_to_document(
         self, row: dict, version: int, db_id: int
@@ -29,11 +58,39 @@ class Vectorizer:
 
         return doc
 
-    def vectorize_documents(self, docs: list[Document]) -> list[str]:
+    @property
+    def projected_embeddings(self) -> Optional[ProjectedEmbeddings]:
+        embeddings = self.vector_store.embeddings
+        return embeddings if isinstance(embeddings, ProjectedEmbeddings) else None
+
+    @property
+    def projection(self) -> Optional[Projection]:
+        projected = self.projected_embeddings
+        return projected.projection if projected else None
+
+    def set_projection(self, projection: Projection, version: Optional[int] = None):
+        """Replaces the projection of documents and queries, e.g. one from a snapshot."""
+        self.projected_embeddings.projection = projection
+        self.projection_version = version
+
+    def vectorize_documents(
+        self,
+        docs: list[Document],
+        refit: bool = False,
+        vectors: Optional[dict[int, np.ndarray]] = None,
+    ) -> list[str]:
         """
         Векторизует список документов и возвращает их идентификаторы.
+
+        With a projection, documents are embedded at full size and projected. The
+        projection is fitted on them if it isn't fitted yet, or if `refit` (`docs` are
+        a whole new KB version, no vectors of the current projection are reused).
+        `vectors` are full-size vectors by DB id of documents embedded already, see
+        `fit_projection`.
         """
         try:
+            if self.projection is not None:
+                return self._vectorize_projected(docs, refit, vectors or {})
             ids = self.vector_store.add_documents(docs)
             logger.debug(f"Vectorized {len(docs)} documents. IDs: {ids}")
             return ids
@@ -41,6 +98,211 @@ class Vectorizer:
             logger.error(f"Failed to vectorize documents: {e}")
             raise
 
+    def _vectorize_projected(
+        self, docs: list[Document], refit: bool, known: dict[int, np.ndarray]
+    ) -> list[str]:
+        projected = self.projected_embeddings
+        missing = [doc.page_content for doc in docs if doc.metadata.get("_db_id") not in known]
+        computed = iter(projected.underlying.embed_documents(missing) if missing else [])
+        vectors = np.asarray(
+            [
+                known[doc.metadata["_db_id"]]
+                if doc.metadata.get("_db_id") in known
+                else next(computed)
+                for doc in docs
+            ],
+            dtype=np.float32,
+        )
+
+        projection = projected.projection
+        if refit or not projection.fitted:
+            projection = projection.fit(vectors)
+        ids = self.add_vectors(docs, projection.transform(vectors))
+        if projection is not projected.projection:
+            # queries switch to the new projection once its vectors are stored
+            self.set_projection(projection, docs[0].metadata.get("_version"))
+            logger.info(
+                f"Fitted {projection.name} projection to {projection.dim} dimensions "
+                f"on {len(docs)} rows"
+            )
+        logger.debug(f"Vectorized {len(docs)} documents with {projection.name} projection")
+        return ids
+
+    def fit_projection(
+        self, docs: list[Document], version: Optional[int] = None
+    ) -> dict[int, np.ndarray]:
+        """
+        Fits the projection on `docs`, e.g. a sample of all rows about to be vectorized
+        in batches, so it isn't fitted on the first batch only. Returns the full-size
+        vectors of `docs` by DB id, to pass to `vectorize_documents`.
+        """
+        projected = self.projected_embeddings
+        vectors = np.asarray(
+            projected.underlying.embed_documents([doc.page_content for doc in docs]),
+            dtype=np.float32,
+        )
+        projection = projected.projection.fit(vectors)
+        self.set_projection(projection, version)
+        logger.info(
+            f"Fitted {projection.name} projection to {projection.dim} dimensions "
+            f"on a sample of {len(docs)} rows"
+        )
+        return {doc.metadata["_db_id"]: vector for doc, vector in zip(docs, vectors)}
+
+    def retag_vectors(
+        self, db_ids: list[int], old_version: int, new_version: int
+    ) -> set[int]:
+        """
+        Moves vectors of unchanged rows from `old_version` to `new_version` in place,
+        without embedding or copying them.
+
+        Returns the set of DB ids whose vectors were moved. Rows missing from the
+        result (e.g. not vectorized yet, or a backend without metadata updates) have
+        to be vectorized as usual.
+        """
+        if not db_ids:
+            return set()
+
+        if hasattr(self.vector_store, "retag_vectors"):
+            moved = self.vector_store.retag_vectors(db_ids, old_version, new_version)
+        elif isinstance(self.vector_store, InMemoryVectorStore):
+            moved = self._retag_in_memory_vectors(db_ids, old_version, new_version)
+        elif isinstance(self.vector_store, Chroma):
+            moved = self._retag_chroma_vectors(db_ids, old_version, new_version)
+        else:
+            logger.warning(
+                f"{type(self.vector_store).__name__} can't update metadata, re-vectorizing"
+            )
+            moved = set()
+
+        logger.debug(f"Moved {len(moved)} vectors to version {new_version}")
+        return moved
+
+    def _retag_in_memory_vectors(
+        self, db_ids: list[int], old_version: int, new_version: int
+    ) -> set[int]:
+        wanted = set(db_ids)
+        moved = set()
+
+        for entry in self.vector_store.store.values():
+            metadata = entry["metadata"]
+            if metadata.get("_version") == old_version and metadata.get("_db_id") in wanted:
+                entry["metadata"] = {**metadata, "_version": new_version}
+                moved.add(metadata["_db_id"])
+
+        return moved
+
+    def _retag_chroma_vectors(
+        self, db_ids: list[int], old_version: int, new_version: int
+    ) -> set[int]:
+        db_ids = [int(i) for i in db_ids]
+        moved = set()
+
+        for start in range(0, len(db_ids), _CHROMA_CHUNK):
+            chunk = db_ids[start : start + _CHROMA_CHUNK]
+            found = self.vector_store.get(
+                where={
+                    "$and": [{"_version": old_version}, {"_db_id": {"$in": chunk}}]
+                },
+                include=["metadatas"],
+            )
+            if not found["ids"]:
+                continue
+
+            self.vector_store._collection.update(
+                ids=found["ids"],
+                metadatas=[{**m, "_version": new_version} for m in found["metadatas"]],
+            )
+            moved.update(int(m["_db_id"]) for m in found["metadatas"])
+
+        return moved
+
+    def get_vectors(self, version: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns DB ids and the L2-normalized float32 vectors of all rows of `version`.
+        """
+        if hasattr(self.vector_store, "get_vectors"):
+            db_ids, vectors = self.vector_store.get_vectors(version)
+        elif isinstance(self.vector_store, InMemoryVectorStore):
+            entries = [
+                entry
+                for entry in self.vector_store.store.values()
+                if entry["metadata"].get("_version") == version
+            ]
+            db_ids = [entry["metadata"]["_db_id"] for entry in entries]
+            vectors = [entry["vector"] for entry in entries]
+        elif isinstance(self.vector_store, Chroma):
+            db_ids, vectors = self._get_chroma_vectors(version)
+        else:
+            raise NotImplementedError(
+                f"{type(self.vector_store).__name__} can't export vectors"
+            )
+
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(db_ids), -1)
+        return np.asarray(db_ids, dtype=np.int64), normalize_rows(vectors)
+
+    def _get_chroma_vectors(self, version: int) -> tuple[list[int], list]:
+        db_ids, vectors = [], []
+        offset = 0
+        while True:
+            found = self.vector_store.get(
+                where={"_version": version},
+                include=["embeddings", "metadatas"],
+                limit=_CHROMA_CHUNK,
+                offset=offset,
+            )
+            if not found["ids"]:
+                return db_ids, vectors
+            db_ids.extend(int(m["_db_id"]) for m in found["metadatas"])
+            vectors.extend(found["embeddings"])
+            offset += len(found["ids"])
+
+    def add_vectors(
+        self,
+        docs: list[Document],
+        vectors: np.ndarray,
+        codec: Optional[VectorCodec] = None,
+    ) -> list[str]:
+        """
+        Adds documents with already computed vectors, e.g. from a snapshot. With
+        `codec`, `vectors` are its codes. Backends without such support embed the
+        documents again.
+        """
+        ids = [str(uuid.uuid4()) for _ in docs]
+        texts = [doc.page_content for doc in docs]
+        metadatas = [doc.metadata for doc in docs]
+
+        if hasattr(self.vector_store, "add_vectors"):
+            return self.vector_store.add_vectors(
+                vectors, texts, metadatas, ids=ids, normalized=True, codec=codec
+            )
+        if codec is not None:
+            vectors = codec.decode(vectors)
+        if isinstance(self.vector_store, InMemoryVectorStore):
+            for doc_id, text, metadata, vector in zip(ids, texts, metadatas, vectors):
+                self.vector_store.store[doc_id] = {
+                    "id": doc_id,
+                    "vector": vector.tolist(),
+                    "text": text,
+                    "metadata": metadata,
+                }
+            return ids
+        if isinstance(self.vector_store, Chroma):
+            for start in range(0, len(docs), _CHROMA_CHUNK):
+                end = start + _CHROMA_CHUNK
+                self.vector_store._collection.add(
+                    ids=ids[start:end],
+                    embeddings=np.asarray(vectors[start:end]),
+                    documents=texts[start:end],
+                    metadatas=metadatas[start:end],
+                )
+            return ids
+
+        logger.warning(
+            f"{type(self.vector_store).__name__} can't add vectors, re-vectorizing"
+        )
+        return self.vectorize_documents(docs)
+
     def delete_old_vectors(self, current_version: int):
         """
         Deletes all documents from the VectorStore where the "_version" metadata field is less than the current_version.
@@ -54,13 +316,107 @@ class Vectorizer:
             logger.error(f"Failed to clear old vectors from VectorStore: {e}")
             raise
 
+    @property
+    def saves_explicitly(self) -> bool:
+        """True for backends that persist only on `persist()`, e.g. the FAISS index."""
+        return hasattr(self.vector_store, "save")
+
+    @property
+    def persists_vectors(self) -> bool:
+        """False for memory-only backends (NumPy, in-memory), they start empty."""
+        return self.saves_explicitly or isinstance(self.vector_store, Chroma)
+
+    def persist(self):
+        if self.saves_explicitly:
+            self.vector_store.save()
+        projection = self.projection
+        if self.projection_path and projection is not None and projection.fitted:
+            save_projection(projection, self.projection_path, self.projection_version or 0)
+
+    def backend_filter(self, filter):
+        """
+        `filter` as the backend takes it: Chroma and the NumPy and FAISS indexes take
+        metadata dicts such as `{"_version": 3}`, `InMemoryVectorStore` a predicate.
+        """
+        if isinstance(filter, dict) and isinstance(self.vector_store, InMemoryVectorStore):
+            return metadata_filter(filter)
+        return filter
+
+    def _search_kwargs(self, config: dict) -> dict:
+        if config.get("filter") is None:
+            return config
+        return {**config, "filter": self.backend_filter(config["filter"])}
+
+    @timed("vectorizer_search")
     def similarity_search(self, query, config: dict = {}) -> list[Document]:
-        return self.vector_store.similarity_search(query, **config)
+        return self.vector_store.similarity_search(query, **self._search_kwargs(config))
+
+    @timed("vectorizer_search")
+    async def asimilarity_search(self, query, config: dict = {}) -> list[Document]:
+        return await self.vector_store.asimilarity_search(query, **self._search_kwargs(config))
+
+    @timed("vectorizer_embed")
+    def embed_queries(self, queries: list[str]) -> np.ndarray:
+        """
+        Query vectors of `queries` (projected, if configured), the ones `embed_query`
+        gives, batched where the embeddings wrappers can.
+        """
+        vectors = embed_queries(self.vector_store.embeddings, queries)
+        return np.asarray(vectors, dtype=np.float32)
+
+    @timed("vectorizer_embed")
+    async def aembed_queries(self, queries: list[str]) -> np.ndarray:
+        vectors = await aembed_queries(self.vector_store.embeddings, queries)
+        return np.asarray(vectors, dtype=np.float32)
+
+    @timed("vectorizer_search")
+    def similarity_search_by_vectors(
+        self, vectors: np.ndarray, k: int = 4, filter: Optional[dict] = None
+    ) -> list[list[Document]]:
+        """
+        Documents nearest to each of `vectors`. Backends with a batch search (the NumPy
+        and FAISS indexes) search all of them at once, others one by one.
+        """
+        if hasattr(self.vector_store, "similarity_search_with_score_by_vectors"):
+            found = self.vector_store.similarity_search_with_score_by_vectors(
+                vectors, k=k, filter=filter
+            )
+            return [[doc for doc, _ in docs] for docs in found]
+        filter = self.backend_filter(filter)
+        return [
+            self.vector_store.similarity_search_by_vector(vector.tolist(), k=k, filter=filter)
+            for vector in vectors
+        ]
+
+    async def asimilarity_search_by_vectors(
+        self, vectors: np.ndarray, k: int = 4, filter: Optional[dict] = None
+    ) -> list[list[Document]]:
+        if hasattr(self.vector_store, "similarity_search_with_score_by_vectors"):
+            return await asyncio.to_thread(self.similarity_search_by_vectors, vectors, k, filter)
+        # the batch search above is timed by `similarity_search_by_vectors`
+        filter = self.backend_filter(filter)
+        with time_stage("vectorizer_search"):
+            return await asyncio.gather(
+                *(
+                    self.vector_store.asimilarity_search_by_vector(
+                        vector.tolist(), k=k, filter=filter
+                    )
+                    for vector in vectors
+                )
+            )
 
+    @timed("vectorizer_search")
     def similarity_search_with_relevance_scores(
         self, query: str, search_config: dict = {}, *args, **kwargs
     ) -> list[tuple[Document, float]]:
         return self.vector_store.similarity_search_with_relevance_scores(
-            query,
-            **search_config,
+            query, **self._search_kwargs({**search_config, **kwargs})
+        )
+
+    @timed("vectorizer_search")
+    async def asimilarity_search_with_relevance_scores(
+        self, query: str, search_config: dict = {}, *args, **kwargs
+    ) -> list[tuple[Document, float]]:
+        return await self.vector_store.asimilarity_search_with_relevance_scores(
+            query, **self._search_kwargs({**search_config, **kwargs})
         )
@@ -0,0 +1,20 @@
+import importlib
+from typing import Any, Callable
+
+
+def lazy_builder(path: str) -> Callable[..., Any]:
+    """
+    Returns a model builder which imports "package.module:function" on the first call.
+
+    Model builders pull in heavy packages (langchain, chroma, pandas, langgraph),
+    so they are only imported when the model is actually built.
+    """
+    module_name, attr = path.split(":")
+
+    def build(*args, **kwargs):
+        builder = getattr(importlib.import_module(module_name), attr)
+        return builder(*args, **kwargs)
+
+    build.__name__ = attr
+    build.__qualname__ = attr
+    return build
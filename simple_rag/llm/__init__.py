@@ -1 +1 @@
-from .groq import llm
+from .groq import make_llm
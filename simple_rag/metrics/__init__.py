@@ -1,27 +1,74 @@
 from collections import defaultdict
-from typing import Tuple
+from typing import TYPE_CHECKING, Optional, Tuple
 
 # metrics.py
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from .kbase_metric import KBaseMetric
 
-def increment_metric(db: Session, endpoint: str, model_name: str):
-    """Increase count for the specified endpoint and model_name."""
-    metric = db.query(KBaseMetric).filter_by(endpoint=endpoint, model_name=model_name).first()
-    if metric:
-        metric.count += 1
-    else:
-        metric = KBaseMetric(endpoint=endpoint, model_name=model_name, count=1)
-        db.add(metric)
+if TYPE_CHECKING:
+    from .counters import MetricCounters
+
+
+def _upsert(db: Session, endpoint: str, model_name: str, count: int):
+    """
+    Adds `count` to the counter in one statement, so concurrent writers (workers,
+    processes) never lose increments or create duplicate rows.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+
+        statement = insert(KBaseMetric).values(
+            endpoint=endpoint, model_name=model_name, count=count
+        )
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[KBaseMetric.endpoint, KBaseMetric.model_name],
+                set_={"count": KBaseMetric.count + statement.excluded.count},
+            )
+        )
+        return
+
+    updated = db.execute(
+        update(KBaseMetric)
+        .where(KBaseMetric.endpoint == endpoint, KBaseMetric.model_name == model_name)
+        .values(count=KBaseMetric.count + count)
+    )
+    if not updated.rowcount:
+        db.add(KBaseMetric(endpoint=endpoint, model_name=model_name, count=count))
+
+
+def add_metrics(db: Session, deltas: dict[tuple[str, str], int]):
+    """Adds `deltas` keyed by (endpoint, model_name) in one transaction."""
+    for (endpoint, model_name), count in deltas.items():
+        _upsert(db, endpoint, model_name, count)
     db.commit()
 
-def get_metrics(db: Session) -> Tuple[dict[str, dict[str, int]], int]:
-    """Get all metrics from the database."""
-    metrics = db.query(KBaseMetric).all()
+
+def get_metrics(
+    db: Session, counters: Optional["MetricCounters"] = None
+) -> Tuple[dict[str, dict[str, int]], int]:
+    """Get all metrics from the database, with the not yet flushed `counters`."""
     report = defaultdict(dict)
 
-    for metric in metrics:
-        report[metric.endpoint][metric.model_name] = metric.count
+    def read():
+        for metric in db.query(KBaseMetric).all():
+            report[metric.endpoint][metric.model_name] = metric.count
+        return counters.pending() if counters is not None else {}
+
+    if counters is not None:
+        # a flush in progress would be counted twice or not at all
+        with counters.flushing():
+            pending = read()
+    else:
+        pending = read()
+
+    for (endpoint, model_name), count in pending.items():
+        report[endpoint][model_name] = report[endpoint].get(model_name, 0) + count
 
-    totals = sum(metric.count for metric in metrics)
-    return report, totals
\ No newline at end of file
+    totals = sum(count for models in report.values() for count in models.values())
+    return report, totals
@@ -0,0 +1,100 @@
+"""
+counters.py - In-process request counters, flushed to the metrics database periodically.
+
+Counting a request is a dict update under a lock, no database round trip. A background
+thread adds the counts to the database every `flush_interval_s` seconds, all counters in
+one transaction of UPSERTs (`count = count + delta`), so several workers or processes
+can share one database. Counts that failed to flush are kept for the next flush.
+"""
+
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from . import add_metrics, kbase_metric
+
+
+def _default_session() -> Session:
+    kbase_metric.get_engine()
+    return kbase_metric.SessionLocal()
+
+
+class MetricCounters:
+    flush_interval_s: float
+
+    def __init__(
+        self,
+        flush_interval_s: float = 5.0,
+        session_factory: Callable[[], Session] = _default_session,
+    ):
+        self.flush_interval_s = flush_interval_s
+        self._session_factory = session_factory
+
+        self._lock = threading.Lock()
+        # held for the whole flush, so readers see counts either pending or in the db
+        self._flush_lock = threading.Lock()
+        self._pending: Counter[tuple[str, str]] = Counter()
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def increment(self, endpoint: str, model_name: str, count: int = 1):
+        with self._lock:
+            self._pending[(endpoint, model_name)] += count
+
+    def pending(self) -> dict[tuple[str, str], int]:
+        """Counts not flushed yet, keyed by (endpoint, model_name)."""
+        with self._lock:
+            return dict(self._pending)
+
+    @contextmanager
+    def flushing(self) -> Iterator[None]:
+        """No flush runs while in the block."""
+        with self._flush_lock:
+            yield
+
+    def flush(self) -> int:
+        """Adds the pending counts to the database, returns the number of counters written."""
+        with self._flush_lock:
+            with self._lock:
+                deltas, self._pending = self._pending, Counter()
+            if not deltas:
+                return 0
+
+            try:
+                with self._session_factory() as db:
+                    add_metrics(db, deltas)
+            except Exception:
+                with self._lock:
+                    self._pending.update(deltas)
+                raise
+            return len(deltas)
+
+    def start(self):
+        """Starts flushing every `flush_interval_s` seconds in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-flush", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval_s):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception(f"Failed to flush metrics, will retry: {e}")
+
+    def close(self):
+        """Stops the flush thread and flushes what is pending."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
@@ -1,13 +1,27 @@
 # database.py
-from sqlalchemy import create_engine, Column, Integer, String
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from typing import Optional
+
+from sqlalchemy import (
+    Engine,
+    create_engine,
+    Column,
+    Index,
+    Integer,
+    String,
+    delete,
+    func,
+    inspect,
+    select,
+    update,
+)
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+DEFAULT_METRICS_DB_URL = "sqlite:///metrics.db"
 
-# Create the database engine
-# NOTE: extract into parameters
-engine = create_engine('sqlite:///metrics.db', connect_args={"check_same_thread": False})
 Base = declarative_base()
 
+UNIQUE_INDEX = "metrics_endpoint_model_name"
+
 # Storing accesses to kbase models
 class KBaseMetric(Base):
     __tablename__ = 'metrics'
@@ -16,14 +30,88 @@ class KBaseMetric(Base):
     model_name = Column(String, nullable=False)
     count = Column(Integer, default=0)
 
-Base.metadata.create_all(engine)
+    # one row per counter, increments are UPSERTs
+    __table_args__ = (
+        Index(UNIQUE_INDEX, "endpoint", "model_name", unique=True),
+    )
+
+
+# The database is created on first use, not at import
+_engine: Optional[Engine] = None
+_db_url: str = DEFAULT_METRICS_DB_URL
+SessionLocal: Optional[sessionmaker] = None
+
+
+def configure_db(db_url: str):
+    """Sets the database URL, the database is opened on first use."""
+    global _db_url, _engine, SessionLocal
+
+    if db_url != _db_url and _engine is not None:
+        _engine.dispose()
+        _engine, SessionLocal = None, None
+    _db_url = db_url
+
+
+def init_db(db_url: Optional[str] = None) -> Engine:
+    """Create the database engine and the metrics table."""
+    global _engine, _db_url, SessionLocal
+
+    _db_url = db_url or _db_url
+    connect_args = {"check_same_thread": False} if _db_url.startswith("sqlite") else {}
+    _engine = create_engine(_db_url, connect_args=connect_args)
+    Base.metadata.create_all(_engine)
+    _add_unique_index(_engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+
+    return _engine
+
+
+def _add_unique_index(engine: Engine):
+    """
+    Tables created before counters were UPSERTed can have several rows per counter
+    (concurrent first increments), they are merged before the unique index is added.
+    Only SQLAlchemy constructs are used, so this works with any backend.
+    """
+    if any(index["name"] == UNIQUE_INDEX for index in inspect(engine).get_indexes("metrics")):
+        return
+
+    with engine.begin() as connection:
+        duplicates = connection.execute(
+            select(
+                KBaseMetric.endpoint,
+                KBaseMetric.model_name,
+                func.min(KBaseMetric.id),
+                func.sum(KBaseMetric.count),
+            )
+            .group_by(KBaseMetric.endpoint, KBaseMetric.model_name)
+            .having(func.count() > 1)
+        ).all()
+        for endpoint, model_name, kept_id, total in duplicates:
+            connection.execute(
+                update(KBaseMetric).where(KBaseMetric.id == kept_id).values(count=total)
+            )
+            connection.execute(
+                delete(KBaseMetric).where(
+                    KBaseMetric.endpoint == endpoint,
+                    KBaseMetric.model_name == model_name,
+                    KBaseMetric.id != kept_id,
+                )
+            )
+        index = next(i for i in KBaseMetric.__table__.indexes if i.name == UNIQUE_INDEX)
+        index.create(connection, checkfirst=True)
+
+
+def get_engine() -> Engine:
+    if _engine is None:
+        init_db()
+    return _engine
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
     """Function for getting a new session."""
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
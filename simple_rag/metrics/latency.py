@@ -0,0 +1,253 @@
+"""
+latency.py - Latency histograms of request stages, in the Prometheus text format.
+
+Stages are timed with `timed` (a decorator for sync and async functions) or
+`time_stage` (a context manager) and observed into `STAGE_SECONDS`, labelled with the
+stage and the model that serves the request. The model comes from a context variable:
+routes call `set_model_label` once, and everything called from the request (executor
+threads included, see `Executors.run`) is labelled with it.
+
+A histogram keeps cumulative bucket counts only, so an observation is a bisect and a
+few additions under a lock (about a microsecond), cheap enough to leave on. Quantiles
+are derived by the scraper, e.g. p95 per stage and model:
+
+    histogram_quantile(0.95, sum by (le, stage, model) (rate(simple_rag_stage_duration_seconds_bucket[5m])))
+"""
+
+import functools
+import inspect
+import math
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import accumulate
+from typing import Callable, Iterator, Optional, Sequence
+
+# seconds, from a cached lookup to a slow LLM answer
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+_model_label: ContextVar[str] = ContextVar("model_label", default="")
+# labels of the HTTP request being served, filled in by the route
+_request_labels: ContextVar[Optional[dict]] = ContextVar("request_labels", default=None)
+
+
+class _Series:
+    __slots__ = ("counts", "total")
+
+    def __init__(self, size: int):
+        # per bucket, not cumulative, the last one is +Inf
+        self.counts = [0] * size
+        self.total = 0.0
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, one series per combination of labels."""
+
+    name: str
+    documentation: str
+    label_names: tuple[str, ...]
+    buckets: tuple[float, ...]
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, ...], _Series] = {}
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = _Series(len(self.buckets) + 1)
+            series.counts[index] += 1
+            series.total += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self) -> dict[tuple[str, ...], tuple[list[int], float]]:
+        """Label values -> cumulative counts per bucket (+Inf last), sum of observations."""
+        with self._lock:
+            series = [(labels, list(s.counts), s.total) for labels, s in self._series.items()]
+        return {labels: (list(accumulate(counts)), total) for labels, counts, total in series}
+
+    def quantile(self, q: float, *label_values: str) -> Optional[float]:
+        """
+        `q`-quantile estimated from the buckets as Prometheus `histogram_quantile` does
+        (linear within a bucket), None without observations.
+        """
+        series = self.snapshot().get(label_values)
+        if series is None:
+            return None
+        cumulative = series[0]
+        rank = q * cumulative[-1]
+        # rank 0 falls into the first bucket with observations, not an empty leading one
+        index = bisect_left(cumulative, rank) if rank > 0 else bisect_right(cumulative, 0)
+        if index == len(self.buckets):
+            # in the +Inf bucket, the largest finite bound is the best estimate
+            return self.buckets[-1]
+        lower = self.buckets[index - 1] if index > 0 else 0.0
+        below = cumulative[index - 1] if index > 0 else 0
+        in_bucket = cumulative[index] - below
+        if in_bucket == 0:
+            # no observations to interpolate between
+            return lower
+        return lower + (self.buckets[index] - lower) * (rank - below) / in_bucket
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+        for label_values, (cumulative, total) in sorted(self.snapshot().items()):
+            labels = [
+                f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, label_values)
+            ]
+            for bound, count in zip(bounds, cumulative):
+                bucket_labels = ",".join(labels + [f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {count}")
+            series_labels = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{series_labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{series_labels} {cumulative[-1]}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if math.isfinite(value) else "+Inf"
+
+
+STAGE_SECONDS = Histogram(
+    "simple_rag_stage_duration_seconds",
+    "Duration of request stages (retrieval, generation, DB operations) in seconds.",
+    ("stage", "model"),
+)
+HTTP_SECONDS = Histogram(
+    "simple_rag_http_request_duration_seconds",
+    "Duration of HTTP requests in seconds, until the response body is sent.",
+    ("method", "route", "status", "model"),
+)
+HISTOGRAMS = (STAGE_SECONDS, HTTP_SECONDS)
+
+
+def render_prometheus() -> str:
+    """All histograms in the Prometheus text exposition format."""
+    return "\n".join(line for histogram in HISTOGRAMS for line in histogram.render()) + "\n"
+
+
+def set_model_label(model: str):
+    """Labels the stages of the current request, and the request itself, with `model`."""
+    _model_label.set(model)
+    request_labels = _request_labels.get()
+    if request_labels is not None:
+        request_labels["model"] = model
+
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage, _model_label.get())
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def timed(stage: str) -> Callable[[Callable], Callable]:
+    """Decorator observing the duration of every call, failed ones included, as `stage`."""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    observe_stage(stage, time.perf_counter() - started)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe_stage(stage, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+class LatencyMiddleware:
+    """
+    ASGI middleware observing every HTTP request into `HTTP_SECONDS`, labelled by the
+    route template (not the path, so ids don't multiply series) and the response status.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        labels = {"status": "500", "model": ""}
+        token = _request_labels.set(labels)
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                labels["status"] = str(message["status"])
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_labels.reset(token)
+            route = scope.get("route")
+            HTTP_SECONDS.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                labels["status"],
+                labels["model"],
+            )
+
+
+__all__ = [
+    "Histogram",
+    "STAGE_SECONDS",
+    "HTTP_SECONDS",
+    "LatencyMiddleware",
+    "render_prometheus",
+    "set_model_label",
+    "time_stage",
+    "timed",
+]
@@ -1,34 +1,43 @@
-from typing import Callable
-from langchain.chat_models.base import BaseChatModel
-from langchain.embeddings.base import Embeddings
+from typing import TYPE_CHECKING, Callable
 from loguru import logger
 
 from simple_rag.chats.chat import ChatModel
-from simple_rag.models.classic_static_file_rag import build_classic_rag_model
-from simple_rag.models.qna_rag.model import QnAServiceConfig, build_static_file_model
-from simple_rag.models.simple_chat_models.raw_chat import build_raw_chat_model
+from simple_rag.lazy import lazy_builder
 from simple_rag.models.stub_model import StubModel
 
+if TYPE_CHECKING:
+    from langchain.chat_models.base import BaseChatModel
+    from langchain.embeddings.base import Embeddings
+
+    from simple_rag.models.qna_rag.model import QnAServiceConfig
+
 
 class ModelCreator:
-    _llm: BaseChatModel
-    _embeddings: Embeddings
-    _models: dict[str, Callable[[BaseChatModel, Embeddings, dict], ChatModel]]
+    _llm: "BaseChatModel"
+    _embeddings: "Embeddings"
+    _models: dict[str, Callable[["BaseChatModel", "Embeddings", dict], ChatModel]]
     _config: dict[str, str]
 
     # FIXME: config should be generalized or the whole approach to models should be changed
     def __init__(
-        self, llm: BaseChatModel, embeddings: Embeddings, config: QnAServiceConfig
+        self, llm: "BaseChatModel", embeddings: "Embeddings", config: "QnAServiceConfig"
     ):
         self._llm = llm
         self._embeddings = embeddings
         self._config = config
 
+        # builders are imported on first use, see `lazy_builder`
         self._models = {
-            "rag_question_vector": build_static_file_model,
-            "classic_rag": build_classic_rag_model,
+            "rag_question_vector": lazy_builder(
+                "simple_rag.models.qna_rag.model:build_static_file_model"
+            ),
+            "classic_rag": lazy_builder(
+                "simple_rag.models.classic_static_file_rag:build_classic_rag_model"
+            ),
             "echo": lambda *args: ChatModel(),
-            "raw": build_raw_chat_model,
+            "raw": lazy_builder(
+                "simple_rag.models.simple_chat_models.raw_chat:build_raw_chat_model"
+            ),
             "stub_model": lambda *args: StubModel(),
         }
 
@@ -7,9 +7,10 @@ from langchain_core.vectorstores import VectorStore
 
 from loguru import logger
 
+from simple_rag.cache.semantic import get_semantic_cache
 from simple_rag.models.classic_static_file_rag.kb_model import ClassicRagKnowledgeBase
 
-from .csv_parser import parse_csv
+from .csv_parser import iter_csv_batches
 from .chat_model import ClassicRagModel
 
 _store: Optional[VectorStore] = None
@@ -21,8 +22,8 @@ def get_store(embeddings: Embeddings, filename: str) -> VectorStore:
     if _store is None:
         logger.debug("Populating VectorStore for classic rag.")
         _store = make_store(embeddings)
-        docs = parse_csv(filename)
-        _store.add_documents(docs)
+        for docs in iter_csv_batches(filename):
+            _store.add_documents(docs)
         logger.debug("VectorStore populated successfully.")
 
     return _store
@@ -42,11 +43,15 @@ def build_classic_rag_model(
 ):
     # FIXME: use different key from config
     store = get_store(embeddings, config["qna_path"])
-    return ClassicRagModel(llm=llm, store=store)
+    return ClassicRagModel(
+        llm=llm, store=store, semantic_cache=get_semantic_cache(embeddings, config)
+    )
 
 
 def build_classic_rag_knowledgebase_model(
     llm: BaseChatModel, embeddings: Embeddings, config: dict[str, str]
 ):
     store = get_store(embeddings, config["qna_path"])
-    return ClassicRagKnowledgeBase(llm=llm, store=store)
+    return ClassicRagKnowledgeBase(
+        llm=llm, store=store, semantic_cache=get_semantic_cache(embeddings, config)
+    )
@@ -1,14 +1,19 @@
 import uuid
+from typing import AsyncIterator, Optional
 
 from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain_core.vectorstores import VectorStore
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import START, StateGraph
 from langgraph.graph.state import CompiledStateGraph
 from loguru import logger
 
+from simple_rag.cache.semantic import SemanticCache
 from simple_rag.chats import ChatModel
+from simple_rag.metrics.latency import timed
+from simple_rag.models.streaming import astream_node_tokens
 
 from .prompt import default_rag_prompt
 from .state import RagState
@@ -20,30 +25,60 @@ class ClassicRagModel(ChatModel):
     prompt: PromptTemplate = default_rag_prompt
     checkpointer: MemorySaver
     graph: CompiledStateGraph
+    semantic_cache: Optional[SemanticCache]
 
-    def __init__(self, llm, store: VectorStore):
+    def __init__(
+        self, llm, store: VectorStore, semantic_cache: Optional[SemanticCache] = None
+    ):
         self.llm = llm
         self.store = store
+        self.semantic_cache = semantic_cache
         self.checkpointer = MemorySaver()
         self._build_graph()
 
+    @property
+    def cache_scope(self):
+        # the answer depends on the question and the prompt only, not on the chat history.
+        # The store is built once from a static file, so its version never changes.
+        return (f"classic_rag:{hash(self.prompt.template)}", 0)
+
+    @timed("classic_retrieve")
     def _retrieve(self, state: RagState):
         retrieved_docs = self.store.similarity_search(state["question"])
 
         return {"context": retrieved_docs}
 
+    @timed("classic_retrieve")
+    async def _aretrieve(self, state: RagState):
+        retrieved_docs = await self.store.asimilarity_search(state["question"])
+
+        return {"context": retrieved_docs}
+
+    @timed("classic_generate")
     def _generate(self, state: RagState):
-        docs_content = "\n\n".join(doc.page_content for doc in state["context"])
-        messages = self.prompt.invoke(
-            {"question": state["question"], "context": docs_content}
-        )
+        messages = self.prompt.invoke(self._prompt_input(state))
         response = self.llm.invoke(messages)
 
         return {"answer": response.content}
 
+    @timed("classic_generate")
+    async def _agenerate(self, state: RagState):
+        messages = await self.prompt.ainvoke(self._prompt_input(state))
+        response = await self.llm.ainvoke(messages)
+
+        return {"answer": response.content}
+
+    def _prompt_input(self, state: RagState) -> dict:
+        docs_content = "\n\n".join(doc.page_content for doc in state["context"])
+        return {"question": state["question"], "context": docs_content}
+
     def _build_graph(self):
+        # every node has an async version, so the graph can be used with `ainvoke`
         graph_builder = StateGraph(RagState).add_sequence(
-            [self._retrieve, self._generate]
+            [
+                ("_retrieve", RunnableLambda(self._retrieve, afunc=self._aretrieve)),
+                ("_generate", RunnableLambda(self._generate, afunc=self._agenerate)),
+            ]
         )
         graph_builder.add_edge(START, "_retrieve")
         graph = graph_builder.compile()
@@ -51,11 +86,47 @@ class ClassicRagModel(ChatModel):
         self.graph = graph
 
     def send(self, conversation_id: uuid.UUID, message: str) -> str:
+        if self.semantic_cache:
+            return self.semantic_cache.cached(
+                self.cache_scope, message, lambda: self._send(conversation_id, message)
+            )
+        return self._send(conversation_id, message)
+
+    async def asend(self, conversation_id: uuid.UUID, message: str) -> str:
+        if self.semantic_cache:
+            return await self.semantic_cache.acached(
+                self.cache_scope, message, lambda: self._asend(conversation_id, message)
+            )
+        return await self._asend(conversation_id, message)
+
+    def astream(self, conversation_id: uuid.UUID, message: str) -> AsyncIterator[str]:
+        if self.semantic_cache:
+            return self.semantic_cache.astream_cached(
+                self.cache_scope, message, lambda: self._astream(conversation_id, message)
+            )
+        return self._astream(conversation_id, message)
+
+    def _send(self, conversation_id: uuid.UUID, message: str) -> str:
         config = {"configurable": {"thread_id": str(conversation_id)}}
         answer = self.graph.invoke({"question": message}, config=config)
 
         return answer["answer"]
 
+    async def _asend(self, conversation_id: uuid.UUID, message: str) -> str:
+        config = {"configurable": {"thread_id": str(conversation_id)}}
+        answer = await self.graph.ainvoke({"question": message}, config=config)
+
+        return answer["answer"]
+
+    async def _astream(
+        self, conversation_id: uuid.UUID, message: str
+    ) -> AsyncIterator[str]:
+        config = {"configurable": {"thread_id": str(conversation_id)}}
+        async for token in astream_node_tokens(
+            self.graph, {"question": message}, config, node="_generate"
+        ):
+            yield token
+
     def update(self, new_cfg: dict[str, str]):
         logger.debug("QnaStaticFileService::update()")
 
@@ -1,9 +1,15 @@
+from itertools import islice
+from typing import Iterator
+
 from langchain.docstore.document import Document
 from langchain_community.document_loaders import CSVLoader
 
+# documents embedded and added to the vector store at once
+DEFAULT_BATCH_SIZE = 1000
 
-def parse_csv(filename) -> list[Document]:
-    loader = CSVLoader(
+
+def make_loader(filename) -> CSVLoader:
+    return CSVLoader(
         file_path=filename,
         csv_args={
             "delimiter": ",",
@@ -13,4 +19,16 @@ def parse_csv(filename) -> list[Document]:
         encoding="utf-8",
     )
 
-    return loader.load()
+
+def iter_csv_batches(filename, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[list[Document]]:
+    """
+    Yields the documents of `parse_csv` in batches of `batch_size`, the file is read
+    lazily, so only one batch is in memory at a time.
+    """
+    docs = make_loader(filename).lazy_load()
+    while batch := list(islice(docs, batch_size)):
+        yield batch
+
+
+def parse_csv(filename) -> list[Document]:
+    return make_loader(filename).load()
@@ -1,5 +1,11 @@
+import asyncio
+from contextlib import AbstractAsyncContextManager, nullcontext
+from typing import Optional
+
 from loguru import logger
+from simple_rag.cache.semantic import SemanticCache
 from simple_rag.knowledge_base.base import KnowledgeBaseModel
+from simple_rag.knowledge_base.store.vectorizer import Vectorizer
 from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import PromptTemplate
 from langchain_core.vectorstores import VectorStore
@@ -14,10 +20,17 @@ class ClassicRagKnowledgeBase(KnowledgeBaseModel):
     llm: BaseChatModel
     store: VectorStore
     prompt: PromptTemplate = default_rag_prompt
+    semantic_cache: Optional[SemanticCache]
+
+    # the store is built once from a static file, so its version never changes
+    cache_scope = ("classic", 0)
 
-    def __init__(self, llm, store: VectorStore):
+    def __init__(
+        self, llm, store: VectorStore, semantic_cache: Optional[SemanticCache] = None
+    ):
         self.llm = llm
         self.store = store
+        self.semantic_cache = semantic_cache
 
     def _retrieve(self, query: str):
         retrieved_docs = self.store.similarity_search(query)
@@ -25,13 +38,91 @@ class ClassicRagKnowledgeBase(KnowledgeBaseModel):
         logger.debug(f"{len(retrieved_docs)} found")
         return retrieved_docs
 
+    async def _aretrieve(self, query: str):
+        retrieved_docs = await self.store.asimilarity_search(query)
+
+        logger.debug(f"{len(retrieved_docs)} found")
+        return retrieved_docs
+
     def _generate(self, docs: list[Document], query: str):
-        docs_content = "\n\n".join(doc.page_content for doc in docs)
-        messages = self.prompt.invoke({"question": query, "context": docs_content})
+        messages = self.prompt.invoke(self._prompt_input(docs, query))
         response = self.llm.invoke(messages)
 
         return response.content
 
+    async def _agenerate(self, docs: list[Document], query: str):
+        messages = await self.prompt.ainvoke(self._prompt_input(docs, query))
+        response = await self.llm.ainvoke(messages)
+
+        return response.content
+
+    def _prompt_input(self, docs: list[Document], query: str) -> dict:
+        docs_content = "\n\n".join(doc.page_content for doc in docs)
+        return {"question": query, "context": docs_content}
+
     def query(self, query) -> list[str]:
+        if self.semantic_cache:
+            return self.semantic_cache.cached(
+                self.cache_scope, query, lambda: self._query(query)
+            )
+        return self._query(query)
+
+    async def aquery(self, query) -> list[str]:
+        if self.semantic_cache:
+            return await self.semantic_cache.acached(
+                self.cache_scope, query, lambda: self._aquery(query)
+            )
+        return await self._aquery(query)
+
+    def _query(self, query) -> list[str]:
         docs = self._retrieve(query)
         return [self._generate(docs, query)]
+
+    async def _aquery(self, query) -> list[str]:
+        docs = await self._aretrieve(query)
+        return [await self._agenerate(docs, query)]
+
+    async def aquery_batch(
+        self,
+        queries: list[str],
+        max_concurrency: int = 8,
+        limit: Optional[AbstractAsyncContextManager] = None,
+    ) -> list[list[str] | Exception]:
+        if self.semantic_cache:
+            return await self.semantic_cache.acached_batch(
+                self.cache_scope,
+                queries,
+                lambda misses: self._aquery_batch(misses, max_concurrency, limit),
+            )
+        return await self._aquery_batch(queries, max_concurrency, limit)
+
+    async def _aquery_batch(
+        self,
+        queries: list[str],
+        max_concurrency: int,
+        limit: Optional[AbstractAsyncContextManager] = None,
+    ) -> list[list[str] | Exception]:
+        """
+        Queries are embedded together and searched together, then answers are
+        generated at most `max_concurrency` at a time, each one inside `limit`.
+        """
+        limit = limit or nullcontext()
+        try:
+            async with limit:
+                vectorizer = Vectorizer(self.store)
+                vectors = await vectorizer.aembed_queries(queries)
+                retrieved = await vectorizer.asimilarity_search_by_vectors(vectors)
+            prompts = await self.prompt.abatch(
+                [self._prompt_input(docs, q) for docs, q in zip(retrieved, queries)]
+            )
+        except Exception as e:
+            logger.exception(f"Batch retrieval failed: {e}")
+            return [e] * len(queries)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def generate(prompt) -> list[str]:
+            async with semaphore, limit:
+                return [(await self.llm.ainvoke(prompt)).content]
+
+        return await asyncio.gather(*(generate(p) for p in prompts), return_exceptions=True)
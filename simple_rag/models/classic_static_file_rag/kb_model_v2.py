@@ -1,31 +1,68 @@
+from contextlib import AbstractAsyncContextManager, nullcontext
+from typing import Optional
+
 from loguru import logger
 import pandas as pd
 from langchain.chat_models.base import BaseChatModel
 from langchain.embeddings.base import Embeddings
+from simple_rag.cache.semantic import SemanticCache, get_semantic_cache
 from simple_rag.knowledge_base.base import KnowledgeBaseModel
 from simple_rag.knowledge_base.store.default_store import Store
+from simple_rag.knowledge_base.store.snapshot import SnapshotError
 
 
 def init_support_kb_model(
     llm: BaseChatModel, embeddings: Embeddings, app_cfg: dict, *args, **kwargs
 ):
-    store = Store(db_cfg=app_cfg["db_cfg"], vectorstore_cfg=app_cfg["vectorstore_cfg"])
+    store = Store(
+        db_cfg=app_cfg["db_cfg"],
+        vectorstore_cfg=app_cfg["vectorstore_cfg"],
+        embeddings=embeddings,
+        vectorize_batch_size=app_cfg.get("vectorize_batch_size"),
+        vectorize_in_background=app_cfg.get("vectorize_in_background", False),
+        incremental=app_cfg.get("incremental_ingest"),
+        results_cache_size=app_cfg.get("results_cache_size", 1024),
+        results_cache_ttl_s=app_cfg.get("results_cache_ttl_s", 300),
+        snapshot_path=app_cfg.get("snapshot_path"),
+        projection_cfg=app_cfg.get("projection_cfg") or {},
+        retrieval_mode=app_cfg.get("retrieval_mode"),
+        rrf_k=app_cfg.get("rrf_k"),
+        keyword_search_workers=app_cfg.get("keyword_search_workers"),
+    )
 
     if store.is_empty:
         logger.warning("Store is empty, populating it with data...")
         df = pd.read_csv(app_cfg["csv_fallback_path"])
         store.store_dataframe(df)
         logger.info("Store populated successfully.")
+        if app_cfg.get("snapshot_path"):
+            # next cold start loads the snapshot instead of embedding the CSV again
+            try:
+                store.export_snapshot(app_cfg["snapshot_path"])
+            except (SnapshotError, OSError) as e:
+                logger.warning(f"Failed to export snapshot: {e}")
 
     logger.info("Initializing Support KB model...")
-    return ClassicV2RagKBModel(store=store)
+    return ClassicV2RagKBModel(
+        store=store, semantic_cache=get_semantic_cache(embeddings, app_cfg)
+    )
 
 
 class ClassicV2RagKBModel(KnowledgeBaseModel):
     store: Store
+    semantic_cache: Optional[SemanticCache]
 
-    def __init__(self, store: Store):
+    def __init__(self, store: Store, semantic_cache: Optional[SemanticCache] = None):
         self.store = store
+        self.semantic_cache = semantic_cache
+
+    @property
+    def cache_scope(self):
+        # a new KB version (store_dataframe) invalidates cached answers
+        return ("classic_v2", self.store.version)
+
+    def cache_stats(self) -> dict:
+        return {"retrieval": self.store.results_cache.stats()}
 
     def _format_doc(self, doc: dict) -> str:
         return (
@@ -39,5 +76,46 @@ class ClassicV2RagKBModel(KnowledgeBaseModel):
         fmt_docs = [self._format_doc(d) for d in docs]
         return fmt_docs
 
+    async def _aretrieve(self, query: str) -> list[str]:
+        docs = await self.store.aget_entries_similar_to_problem(query)
+        logger.debug("Found {} documents", len(docs))
+
+        return [self._format_doc(d) for d in docs]
+
     def query(self, query: str) -> list[str]:
+        if self.semantic_cache:
+            return self.semantic_cache.cached(
+                self.cache_scope, query, lambda: self._retrieve(query)
+            )
         return self._retrieve(query)
+
+    async def aquery(self, query: str) -> list[str]:
+        if self.semantic_cache:
+            return await self.semantic_cache.acached(
+                self.cache_scope, query, lambda: self._aretrieve(query)
+            )
+        return await self._aretrieve(query)
+
+    async def aquery_batch(
+        self,
+        queries: list[str],
+        max_concurrency: int = 8,
+        limit: Optional[AbstractAsyncContextManager] = None,
+    ) -> list[list[str] | Exception]:
+        if self.semantic_cache:
+            return await self.semantic_cache.acached_batch(
+                self.cache_scope, queries, lambda misses: self._aretrieve_batch(misses, limit)
+            )
+        return await self._aretrieve_batch(queries, limit)
+
+    async def _aretrieve_batch(
+        self, queries: list[str], limit: Optional[AbstractAsyncContextManager] = None
+    ) -> list[list[str] | Exception]:
+        # no generation here, the whole batch is one embedding call and one search
+        try:
+            async with limit or nullcontext():
+                found = await self.store.aget_entries_for_problems(queries)
+        except Exception as e:
+            logger.exception(f"Batch retrieval failed: {e}")
+            return [e] * len(queries)
+        return [[self._format_doc(d) for d in docs] for docs in found]
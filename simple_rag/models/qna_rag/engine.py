@@ -1,15 +1,27 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
 from simple_rag.models.qna_rag.state import RagState
 from simple_rag.models.qna_rag.store import QuestionVectorStore
 from langgraph.graph import START, StateGraph
 from langgraph.graph.state import CompiledStateGraph
 from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langchain.chat_models.base import BaseChatModel
 from langchain.docstore.document import Document
 
 from langgraph.checkpoint.memory import MemorySaver
 
+from simple_rag.metrics.latency import timed
+
 from .prompts import rag_prompt
 
+# answers of async requests are looked up here, not on the event loop. Shared by all
+# engines (one per chat), threads are started on first use.
+_ANSWER_LOOKUP_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="qna-lookup")
+
 
 class RagEngineDynamicPrompt:
     """
@@ -29,6 +41,8 @@ class RagEngineDynamicPrompt:
     engine = RagEngineDynamicPrompt(llm, vector_store)
     rag = engine.build_rag()
     response = rag.invoke({"raw_input": "question goes here"})
+    # or, in async code
+    response = await rag.ainvoke({"raw_input": "question goes here"})
 
     engine.change_prompt("new prompt goes here")
     """
@@ -56,6 +70,7 @@ class RagEngineDynamicPrompt:
         self.vector_store = vector_store
         self.checkpointer = MemorySaver()
 
+    @timed("qna_retrieve")
     def manual_retrieve(self, state: RagState):
         """
         Returns questions related to input data.
@@ -69,6 +84,13 @@ class RagEngineDynamicPrompt:
         questions = self.vector_store.similarity_search(state["raw_input"])
         return {"questions": questions}
 
+    @timed("qna_retrieve")
+    async def amanual_retrieve(self, state: RagState):
+        """Async version of `manual_retrieve`."""
+        questions = await self.vector_store.asimilarity_search(state["raw_input"])
+        return {"questions": questions}
+
+    @timed("qna_get_answers")
     def get_answers(self, state: RagState):
         """
         Returns answers to questions.
@@ -79,14 +101,24 @@ class RagEngineDynamicPrompt:
         Returns:
             dict: Dictionary with the key "qna_context" and a list of answers.
         """
-        answers = [
-            i
-            for d in state["questions"]
-            for i in self.vector_store.lookup_answers(d.page_content)
-        ]
+        questions = get_questions_texts(state["questions"])
+        # one lookup for all retrieved questions
+        found = self.vector_store.batch_lookup_answers(questions)
+        answers = [i for q in questions for i in found.get(q, [])]
 
         return {"qna_context": answers}
 
+    async def aget_answers(self, state: RagState):
+        """
+        Async version of `get_answers`. The lookup may read an SQLite file, it runs
+        in a small shared pool, so it doesn't block the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        # the latency labels of the request are kept
+        call = functools.partial(contextvars.copy_context().run, self.get_answers, state)
+        return await loop.run_in_executor(_ANSWER_LOOKUP_POOL, call)
+
+    @timed("qna_generate")
     def answer_based_on_context(self, state: RagState):
         """
         Returns an answer based on context.
@@ -97,28 +129,53 @@ class RagEngineDynamicPrompt:
         Returns:
             dict: Dictionary with the key "answer" and the answer.
         """
-        context = "\n\n".join(doc for doc in state["qna_context"])
         llm = self.prompt_template | self.llm
+        response = llm.invoke(self._prompt_input(state))
 
-        response = llm.invoke(
-            {
-                "questions": get_questions_texts(state["questions"]),
-                "answers": context,
-                "raw_input": state["raw_input"],
-            }
-        )
+        return {"answer": response.content}
+
+    @timed("qna_generate")
+    async def aanswer_based_on_context(self, state: RagState):
+        """Async version of `answer_based_on_context`."""
+        llm = self.prompt_template | self.llm
+        response = await llm.ainvoke(self._prompt_input(state))
 
         return {"answer": response.content}
 
+    def _prompt_input(self, state: RagState) -> dict:
+        context = "\n\n".join(doc for doc in state["qna_context"])
+        return {
+            "questions": get_questions_texts(state["questions"]),
+            "answers": context,
+            "raw_input": state["raw_input"],
+        }
+
     def build_rag(self) -> CompiledStateGraph:
         """
         Creates a state graph.
+        The graph supports both `invoke` and `ainvoke`, I/O-bound steps have async versions.
 
         Returns:
             CompiledStateGraph: State graph.
         """
         graph_builder = StateGraph(RagState).add_sequence(
-            [self.manual_retrieve, self.get_answers, self.answer_based_on_context]
+            [
+                (
+                    "manual_retrieve",
+                    RunnableLambda(self.manual_retrieve, afunc=self.amanual_retrieve),
+                ),
+                (
+                    "get_answers",
+                    RunnableLambda(self.get_answers, afunc=self.aget_answers),
+                ),
+                (
+                    "answer_based_on_context",
+                    RunnableLambda(
+                        self.answer_based_on_context,
+                        afunc=self.aanswer_based_on_context,
+                    ),
+                ),
+            ]
         )
         graph_builder.add_edge(START, "manual_retrieve")
         graph = graph_builder.compile(checkpointer=self.checkpointer)
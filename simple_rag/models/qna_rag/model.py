@@ -1,12 +1,14 @@
 import logging
-from typing import Optional
+from typing import AsyncIterator, Optional
 import uuid
 from langgraph.graph.state import CompiledStateGraph
 from langchain.chat_models.base import BaseChatModel
 from langchain.embeddings.base import Embeddings
 
+from simple_rag.cache.semantic import SemanticCache, get_semantic_cache
 from simple_rag.chats.chat import ChatModel
-from simple_rag.models.qna_rag.parser.csv_parser import QnAFileParser
+from simple_rag.models.streaming import astream_node_tokens
+from simple_rag.models.qna_rag.parser.csv_parser import DEFAULT_CHUNK_ROWS, QnAFileParser
 from typing_extensions import TypedDict
 
 from .store import QuestionVectorStore
@@ -18,6 +20,9 @@ from loguru import logger
 class QnAServiceConfig(TypedDict):
     qna_path: str
     qna_delimiter: str
+    qna_db_path: Optional[str]
+    qna_hot_set_size: int
+    qna_chunk_rows: int
 
 
 class QnaStaticFileQuestionVectoredModel(ChatModel):
@@ -25,12 +30,19 @@ class QnaStaticFileQuestionVectoredModel(ChatModel):
     llm: BaseChatModel
     engine: RagEngineDynamicPrompt
     rag: CompiledStateGraph
-
-    def __init__(self, store: QuestionVectorStore, llm: BaseChatModel):
+    semantic_cache: Optional[SemanticCache]
+
+    def __init__(
+        self,
+        store: QuestionVectorStore,
+        llm: BaseChatModel,
+        semantic_cache: Optional[SemanticCache] = None,
+    ):
         logger.debug("QnaStaticFileService::init()")
 
         self.store = store
         self.llm = llm
+        self.semantic_cache = semantic_cache
 
         logger.debug("QnaStaticFileService:: building rag graph...")
         self.engine = RagEngineDynamicPrompt(self.llm, self.store)
@@ -38,12 +50,52 @@ class QnaStaticFileQuestionVectoredModel(ChatModel):
 
         logger.debug("QnaStaticFileService:: init() DONE")
 
+    @property
+    def cache_scope(self):
+        # the answer depends on the question and the prompt only, not on the chat history.
+        # The store is immutable, so its version never changes.
+        return (f"rag_question_vector:{hash(self.engine.prompt_template.template)}", 0)
+
     def send(self, id: uuid.UUID, question: str) -> str:
+        if self.semantic_cache:
+            return self.semantic_cache.cached(
+                self.cache_scope, question, lambda: self._send(id, question)
+            )
+        return self._send(id, question)
+
+    async def asend(self, id: uuid.UUID, question: str) -> str:
+        if self.semantic_cache:
+            return await self.semantic_cache.acached(
+                self.cache_scope, question, lambda: self._asend(id, question)
+            )
+        return await self._asend(id, question)
+
+    def astream(self, id: uuid.UUID, question: str) -> AsyncIterator[str]:
+        if self.semantic_cache:
+            return self.semantic_cache.astream_cached(
+                self.cache_scope, question, lambda: self._astream(id, question)
+            )
+        return self._astream(id, question)
+
+    def _send(self, id: uuid.UUID, question: str) -> str:
         config = {"configurable": {"thread_id": str(id)}}
         answer = self.rag.invoke({"raw_input": question}, config=config)
 
         return answer["answer"]
 
+    async def _asend(self, id: uuid.UUID, question: str) -> str:
+        config = {"configurable": {"thread_id": str(id)}}
+        answer = await self.rag.ainvoke({"raw_input": question}, config=config)
+
+        return answer["answer"]
+
+    async def _astream(self, id: uuid.UUID, question: str) -> AsyncIterator[str]:
+        config = {"configurable": {"thread_id": str(id)}}
+        async for token in astream_node_tokens(
+            self.rag, {"raw_input": question}, config, node="answer_based_on_context"
+        ):
+            yield token
+
     def update(self, new_cfg: dict[str, str]):
         logger.debug("QnaStaticFileService::update()")
 
@@ -61,8 +113,18 @@ def get_question_store(
 ) -> QuestionVectorStore:
     global _store
     if _store is None:
-        parser = QnAFileParser(**config)
-        qna = parser.parse_qna()
+        parser = QnAFileParser(
+            config["qna_path"],
+            delimiter=config.get("qna_delimiter", ";"),
+            chunk_rows=config.get("qna_chunk_rows", DEFAULT_CHUNK_ROWS),
+        )
+        if config.get("qna_db_path"):
+            # answers stay on disk, only recently used ones are kept in memory
+            qna = parser.parse_qna_to_sqlite(
+                config["qna_db_path"], config.get("qna_hot_set_size", 1024)
+            )
+        else:
+            qna = parser.parse_qna()
         _store = QuestionVectorStore(embeddings, qna)
     return _store
 
@@ -72,4 +134,6 @@ def build_static_file_model(
     llm: BaseChatModel, embeddings: Embeddings, config: QnAServiceConfig
 ) -> QnaStaticFileQuestionVectoredModel:
     store = get_question_store(embeddings, config)
-    return QnaStaticFileQuestionVectoredModel(store=store, llm=llm)
+    return QnaStaticFileQuestionVectoredModel(
+        store=store, llm=llm, semantic_cache=get_semantic_cache(embeddings, config)
+    )
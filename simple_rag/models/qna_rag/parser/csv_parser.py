@@ -1,23 +1,48 @@
+import os
+from typing import Iterator, Optional
+
+import numpy as np
 import pandas as pd
+from loguru import logger
+
+from simple_rag.models.qna_rag.qna import SimpleQna, SqliteQnA
+
+DEFAULT_CHUNK_ROWS = 100_000
 
-from simple_rag.models.qna_rag.qna import AbstractQnA, SimpleQna
+# a batch of questions with all their answers, in the order of the file
+QnABatch = list[tuple[str, list[str]]]
 
 
 class QnAFileParser:
+    """
+    Reads a QnA file: CSV (any other extension), Parquet (`.parquet`) or Arrow IPC
+    (`.arrow`, `.feather`), with a question and an answer column. A question can
+    have many rows, one per answer.
+
+    The file is read in chunks of `chunk_rows` rows, so memory use is bounded by the
+    chunk size, not by the file size. Rows without a question are skipped, their number
+    is logged and kept in `skipped_rows`.
+    """
+
+    skipped_rows: int
+
     def __init__(
         self,
         qna_path: str,
         delimiter: str = ";",
         tag_question: str = "Вопрос",
         tag_answer: str = "Ответ",
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
         **kwargs,
     ):
         self.qna_path = qna_path
         self.delimiter = delimiter
         self.tag_question = tag_question
         self.tag_answer = tag_answer
+        self.chunk_rows = chunk_rows
         self.qna_df = None
         self.qna_db = None
+        self.skipped_rows = 0
 
     def load_data(self) -> None:
         """Загружает данные из CSV файла."""
@@ -25,13 +50,125 @@ class QnAFileParser:
 
     def parse_qna(self) -> SimpleQna:
         """Создает словарь соответствий вопрос-ответы из DataFrame."""
-        if self.qna_df is None:
-            self.load_data()
-
         self.qna_db = {}
-        for _, row in self.qna_df.iterrows():
-            question = row[self.tag_question]
-            answer = row[self.tag_answer]
-            self.qna_db.setdefault(question, []).append(answer)
+        for batch in self.iter_qna_batches():
+            for question, answers in batch:
+                known = self.qna_db.get(question)
+                if known is None:
+                    self.qna_db[question] = answers
+                else:
+                    known.extend(answers)
+        # everything is in the dict now, don't keep a second copy alive
+        self.qna_df = None
 
         return SimpleQna(self.qna_db)
+
+    def parse_qna_to_sqlite(self, db_path: str, hot_set_size: int = 1024) -> SqliteQnA:
+        """
+        Loads the file into an SQLite Q&A database at `db_path`, reading it in chunks,
+        so memory use doesn't grow with the file size. The database is reused as is
+        if it was built from the same, unchanged file.
+        """
+        qna = SqliteQnA(db_path, hot_set_size=hot_set_size)
+        source = self._source_fingerprint()
+        if qna.source == source:
+            logger.debug(f"QnA database {db_path} is up to date with {self.qna_path}")
+            return qna
+
+        logger.info(f"Loading {self.qna_path} into QnA database {db_path}...")
+        qna.clear()
+        qna.add(
+            (question, answer)
+            for batch in self.iter_qna_batches()
+            for question, answers in batch
+            for answer in answers
+        )
+        # set last: an interrupted load is redone on the next start
+        qna.source = source
+        logger.info(f"Loaded {len(qna)} questions into QnA database")
+
+        return qna
+
+    def iter_qna_batches(self) -> Iterator[QnABatch]:
+        """
+        Yields the questions of the file with their answers, a chunk of rows at a time.
+        Answers are grouped per chunk with pandas, and answers on consecutive rows are
+        never split between batches. A question repeated far apart in the file can
+        come in several batches, consumers merge them. Rows without a question can't
+        be looked up, they are skipped and counted in `skipped_rows`.
+        """
+        self.skipped_rows = 0
+        # rows of the last question of a chunk, its answers may continue in the next one
+        tail: Optional[pd.DataFrame] = None
+        for chunk in self._read_chunks():
+            rows = len(chunk)
+            chunk = chunk.dropna(subset=[self.tag_question])
+            self.skipped_rows += rows - len(chunk)
+            if tail is not None:
+                chunk = pd.concat([tail, chunk], ignore_index=True)
+            if chunk.empty:
+                continue
+
+            questions = chunk[self.tag_question]
+            is_tail = (questions == questions.iat[-1]).to_numpy()
+            tail = chunk[is_tail]
+            if not is_tail.all():
+                yield self._group(chunk[~is_tail])
+
+        if tail is not None and not tail.empty:
+            yield self._group(tail)
+        if self.skipped_rows:
+            logger.warning(
+                f"{self.qna_path}: skipped {self.skipped_rows} rows without a question"
+            )
+
+    def _group(self, chunk: pd.DataFrame) -> QnABatch:
+        # codes are numbered in the order questions first appear, a stable sort keeps
+        # the order of answers; several times faster than groupby(...).agg(list)
+        codes, questions = pd.factorize(chunk[self.tag_question])
+        order = np.argsort(codes, kind="stable")
+        answers = chunk[self.tag_answer].to_numpy(dtype=object)[order].tolist()
+        bounds = [0, *(np.flatnonzero(np.diff(codes[order])) + 1).tolist(), len(answers)]
+        return [
+            (question, answers[start:end])
+            for question, start, end in zip(questions.tolist(), bounds, bounds[1:])
+        ]
+
+    def _read_chunks(self) -> Iterator[pd.DataFrame]:
+        columns = [self.tag_question, self.tag_answer]
+        if self.qna_df is not None:
+            # data loaded with `load_data`
+            yield self.qna_df[columns]
+            return
+
+        extension = os.path.splitext(self.qna_path)[1].lower()
+        if extension == ".parquet":
+            import pyarrow.parquet as pq
+
+            with pq.ParquetFile(self.qna_path) as parquet:
+                for batch in parquet.iter_batches(self.chunk_rows, columns=columns):
+                    yield batch.to_pandas()
+        elif extension in (".arrow", ".feather"):
+            import pyarrow as pa
+
+            with pa.memory_map(self.qna_path) as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    batch = reader.get_batch(i).select(columns)
+                    # batches are as large as the writer made them
+                    for start in range(0, batch.num_rows, self.chunk_rows):
+                        yield batch.slice(start, self.chunk_rows).to_pandas()
+        else:
+            yield from pd.read_csv(
+                self.qna_path,
+                delimiter=self.delimiter,
+                usecols=columns,
+                chunksize=self.chunk_rows,
+            )
+
+    def _source_fingerprint(self) -> str:
+        stat = os.stat(self.qna_path)
+        return (
+            f"{os.path.abspath(self.qna_path)}:{stat.st_size}:{stat.st_mtime_ns}:"
+            f"{self.delimiter}:{self.tag_question}:{self.tag_answer}"
+        )
@@ -1,5 +1,14 @@
-from typing import Iterable, Optional
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
 import abc
+import sqlite3
+import threading
+
+from simple_rag.cache.lru import LRUCache
+
+# rows per INSERT batch, and max number of SQL parameters per query
+_CHUNK = 500
 
 
 class AbstractQnA(abc.ABC):
@@ -25,6 +34,18 @@ class AbstractQnA(abc.ABC):
         """
         pass
 
+    def lookup_answers(self, questions: Iterable[str]) -> dict[str, list[str]]:
+        """
+        Answers for many questions at once, {question: answers}. Questions that are
+        not in the database are left out.
+        """
+        found = {}
+        for question in questions:
+            answers = self.lookup_answer(question)
+            if answers is not None:
+                found[question] = answers
+        return found
+
 
 class SimpleQna(AbstractQnA):
     """
@@ -46,3 +67,151 @@ class SimpleQna(AbstractQnA):
 
     def lookup_answer(self, question: str) -> Optional[list[str]]:
         return self.db.get(question, None)
+
+
+class SqliteQnA(AbstractQnA):
+    """
+    Q&A database in an SQLite file, for QnA files too large to keep in memory.
+
+    Questions and answers stay on disk, only the answers of the `hot_set_size` most
+    recently looked up questions are kept in memory. Answers are returned in the order
+    they were added. `lookup_answers` fetches answers of many questions with one query.
+    """
+
+    path: str
+    hot_set: LRUCache
+
+    def __init__(self, path: str | Path, hot_set_size: int = 1024):
+        self.path = str(path)
+        self.hot_set = LRUCache(max_entries=hot_set_size)
+
+        # lookups come from the event loop and from executor threads
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY, question TEXT NOT NULL UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY, question_id INTEGER NOT NULL, answer TEXT
+            );
+            CREATE INDEX IF NOT EXISTS answers_question_id ON answers (question_id);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+
+    @property
+    def source(self) -> Optional[str]:
+        """Identifies what the database was built from, e.g. a file and its mtime."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM meta WHERE key = 'source'"
+            ).fetchone()
+        return row[0] if row else None
+
+    @source.setter
+    def source(self, value: str):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)", (value,)
+            )
+
+    def add(self, pairs: Iterable[tuple[str, str]]):
+        """Adds (question, answer) pairs, a question can have many answers."""
+        pairs = iter(pairs)
+        with self._lock, self._connection:
+            while chunk := list(islice(pairs, _CHUNK)):
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO questions (question) VALUES (?)",
+                    ((question,) for question, _ in chunk),
+                )
+                self._connection.executemany(
+                    "INSERT INTO answers (question_id, answer) "
+                    "SELECT id, ? FROM questions WHERE question = ?",
+                    ((answer, question) for question, answer in chunk),
+                )
+        self.hot_set.clear()
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM answers")
+            self._connection.execute("DELETE FROM questions")
+            self._connection.execute("DELETE FROM meta")
+        self.hot_set.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT count(*) FROM questions").fetchone()[0]
+
+    def get_questions(self) -> Iterator[str]:
+        for chunk in self._question_chunks():
+            yield from (question for _, question in chunk)
+
+    def get_questions_with_answers(self) -> Iterator[tuple[str, list[str]]]:
+        for chunk in self._question_chunks():
+            answers = self._answers_by_id([question_id for question_id, _ in chunk])
+            for question_id, question in chunk:
+                yield question, answers.get(question_id, [])
+
+    def _question_chunks(self) -> Iterator[list[tuple[int, str]]]:
+        # keyset pagination: the lock isn't held while the caller iterates
+        last_id = 0
+        while True:
+            with self._lock:
+                chunk = self._connection.execute(
+                    "SELECT id, question FROM questions WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, _CHUNK),
+                ).fetchall()
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1][0]
+
+    def _answers_by_id(self, question_ids: list[int]) -> dict[int, list[str]]:
+        placeholders = ", ".join("?" * len(question_ids))
+        answers = {}
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT question_id, answer FROM answers "
+                f"WHERE question_id IN ({placeholders}) ORDER BY id",
+                question_ids,
+            ).fetchall()
+        for question_id, answer in rows:
+            answers.setdefault(question_id, []).append(answer)
+        return answers
+
+    def lookup_answer(self, question: str) -> Optional[list[str]]:
+        return self.lookup_answers([question]).get(question)
+
+    def lookup_answers(self, questions: Iterable[str]) -> dict[str, list[str]]:
+        found, missing = {}, []
+        for question in dict.fromkeys(questions):
+            answers = self.hot_set.get(question)
+            if answers is None:
+                missing.append(question)
+            else:
+                found[question] = answers
+
+        for start in range(0, len(missing), _CHUNK):
+            chunk = missing[start : start + _CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT q.question, a.answer FROM questions q "
+                    "JOIN answers a ON a.question_id = q.id "
+                    f"WHERE q.question IN ({placeholders}) ORDER BY a.id",
+                    chunk,
+                ).fetchall()
+            fetched = {}
+            for question, answer in rows:
+                fetched.setdefault(question, []).append(answer)
+            for question, answers in fetched.items():
+                self.hot_set.put(question, answers)
+            found.update(fetched)
+
+        return found
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -1,6 +1,6 @@
+from itertools import islice
 from typing import Optional
 
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.embeddings.base import Embeddings
 from langchain.docstore.document import Document
 
@@ -9,6 +9,9 @@ from loguru import logger
 
 from .qna import AbstractQnA
 
+# questions embedded and added to the vector store at once
+_ADD_CHUNK = 1000
+
 
 class QuestionVectorStore:
     vector_store: Chroma
@@ -33,33 +36,44 @@ class QuestionVectorStore:
     def store_qna(self, qna: AbstractQnA):
         logger.debug(f"Storing qna entries...")
         self.qna = qna
-        docs = self.__build_docs__()
 
         if self.check_empty():
             logger.debug("Empty store, populating...")
-            self.doc_ids = self.vector_store.add_documents(docs)
+            # documents are built chunk by chunk, not for the whole QnA at once
+            self.doc_ids = []
+            questions = iter(self.qna.get_questions())
+            while chunk := list(islice(questions, _ADD_CHUNK)):
+                self.doc_ids.extend(self.add_questions(chunk))
         else:
             logger.debug("Store's not empty, skipping...")
         logger.debug("Storing done")
 
-    def __build_docs__(self):
-        docs = [
-            Document(page_content=s, metadata={"source": "local_qna"})
-            for s in self.qna.get_questions()
-        ]
+    def add_questions(self, questions: list[str]) -> list[str]:
+        """Embeds and adds questions, e.g. a batch of `QnAFileParser.iter_qna_batches`."""
+        return self.vector_store.add_documents(self.__build_docs__(questions))
 
-        return docs
+    def __build_docs__(self, questions: list[str]):
+        return [
+            Document(page_content=s, metadata={"source": "local_qna"}) for s in questions
+        ]
 
     def check_empty(self):
-        query = self.vector_store.get(include=[])
+        # one id is enough to tell, don't fetch all of them
+        query = self.vector_store.get(include=[], limit=1)
         logger.debug(f"Ids in store: {query['ids']}")
         return len(query["ids"]) == 0
 
     def similarity_search(self, question: str):
         return self.vector_store.similarity_search(question)
 
+    async def asimilarity_search(self, question: str):
+        return await self.vector_store.asimilarity_search(question)
+
     def lookup_answers(self, question: str):
         return self.qna.lookup_answer(question)
 
+    def batch_lookup_answers(self, questions: list[str]) -> dict[str, list[str]]:
+        return self.qna.lookup_answers(questions)
+
     def as_retriever(self):
         return self.vector_store.as_retriever()
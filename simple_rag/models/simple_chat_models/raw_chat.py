@@ -44,6 +44,23 @@ class RawChat(ChatModel):
 
         return res.content
 
+    async def asend(self, id, message):
+        logger.info("RawChat.asend()")
+        res = await self.chain.ainvoke(
+            {"question": message}, config={"configurable": {"session_id": id}}
+        )
+
+        return res.content
+
+    async def astream(self, id, message):
+        logger.info("RawChat.astream()")
+        # the history is saved by the chain when the stream is completed
+        async for chunk in self.chain.astream(
+            {"question": message}, config={"configurable": {"session_id": id}}
+        ):
+            if chunk.content:
+                yield chunk.content
+
     def update(self, new_cfg):
         raise NotImplementedError
 
@@ -0,0 +1,16 @@
+from typing import AsyncIterator
+
+from langgraph.graph.state import CompiledStateGraph
+
+
+async def astream_node_tokens(
+    graph: CompiledStateGraph, input: dict, config: dict, node: str
+) -> AsyncIterator[str]:
+    """
+    Runs the graph and yields LLM tokens generated inside `node`, as soon as they arrive.
+    Tokens of the other nodes (if any) are skipped. The graph state and the checkpoints
+    are updated just like with `ainvoke`.
+    """
+    async for chunk, metadata in graph.astream(input, config=config, stream_mode="messages"):
+        if metadata.get("langgraph_node") == node and chunk.content:
+            yield chunk.content
@@ -1,6 +1,7 @@
-from typing import Optional
-from langchain.chat_models.base import BaseChatModel
-from langchain_core.messages import SystemMessage, HumanMessage
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from langchain.chat_models.base import BaseChatModel
 
 prompts = {"default": "Make summary of a given text in a few short sentences."}
 
@@ -10,7 +11,7 @@ class UnknownPromptError(ValueError):
 
 
 def summary(
-    llm: BaseChatModel,
+    llm: "BaseChatModel",
     content: str,
     prompt_id: Optional[str] = None,
     custom_prompt: Optional[str] = None,
@@ -23,6 +24,8 @@ def summary(
 
     prompt = prompts[prompt_id] if prompt_id else custom_prompt
 
+    from langchain_core.messages import SystemMessage, HumanMessage
+
     response = llm.invoke(
         [SystemMessage(content=prompt), HumanMessage(content=content)]
     )
@@ -0,0 +1,240 @@
+"""
+profiling.py - On-demand profiling of the running server.
+
+Two ways to see where time goes without restarting under a profiler:
+
+- `sample_stacks`: a statistical sampler. For a given time it takes the stacks of all
+  threads (event loop and executor pools) every few milliseconds. The result is in the
+  collapsed format (`frame;frame;frame count` per line), which flamegraph.pl,
+  speedscope and inferno render as flame graphs.
+- `Profiler.profile_requests`: profiles the next N requests to one path. The result
+  is either collapsed stacks of all threads sampled while the requests are in flight,
+  or a pstats dump of `cProfile` run on the event loop thread (`pstats.Stats(path)`,
+  snakeviz, flameprof). cProfile sees async code only, work of sync routes and of
+  `Executors` pools shows up in the collapsed stacks.
+
+Only one profiling session runs at a time. The server installs `ProfilingMiddleware`
+only when profiling is enabled. Without a session the middleware does one attribute
+check per request.
+"""
+
+import asyncio
+import cProfile
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Literal, Optional
+
+ProfileFormat = Literal["collapsed", "pstats"]
+
+DEFAULT_INTERVAL_S = 0.005
+
+# pool threads are named like "llm-worker_3", their stacks are merged per pool
+_THREAD_NUMBER = re.compile(r"_\d+$")
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame, thread_name: str) -> str:
+    """`thread;outermost frame;...;innermost frame`."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.append(_THREAD_NUMBER.sub("", thread_name))
+    return ";".join(reversed(names))
+
+
+def render_collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class StackSampler:
+    """Samples the stacks of all other threads from a daemon thread until stopped."""
+
+    interval_s: float
+    stacks: Counter
+    samples: int
+
+    def __init__(self, interval_s: float = DEFAULT_INTERVAL_S):
+        self.interval_s = interval_s
+        self.stacks = Counter()
+        self.samples = 0
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.stacks[collapse_stack(frame, names.get(ident, str(ident)))] += 1
+            self.samples += 1
+
+
+def sample_stacks(seconds: float, interval_s: float = DEFAULT_INTERVAL_S) -> Counter:
+    """Collapsed stacks of all threads, sampled every `interval_s` for `seconds`."""
+    sampler = StackSampler(interval_s)
+    sampler.start()
+    time.sleep(seconds)
+    return sampler.stop()
+
+
+class RequestProfile:
+    """Profiling session of the next `count` requests to `path`."""
+
+    def __init__(self, path: str, count: int, format: ProfileFormat, interval_s: float):
+        self.path = path
+        self.format = format
+        self.interval_s = interval_s
+        self.remaining = count
+        self.profiled = 0
+        self.done = asyncio.Event()
+
+        self.stacks = Counter()
+        self._in_flight = 0
+        self._sampler: Optional[StackSampler] = None
+        self._profile = cProfile.Profile() if format == "pstats" else None
+
+    def claim(self) -> bool:
+        """Whether the starting request is profiled. Called on the event loop thread."""
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        self._in_flight += 1
+        if self._in_flight == 1:
+            # concurrent profiled requests share one running profiler
+            self._start()
+        return True
+
+    def release(self):
+        self._in_flight -= 1
+        self.profiled += 1
+        if self._in_flight == 0:
+            self._stop()
+            if self.remaining == 0:
+                self.done.set()
+
+    def _start(self):
+        if self._profile is not None:
+            self._profile.enable()
+        else:
+            self._sampler = StackSampler(self.interval_s)
+            self._sampler.start()
+
+    def _stop(self):
+        if self._profile is not None:
+            self._profile.disable()
+        elif self._sampler is not None:
+            self.stacks.update(self._sampler.stop())
+            self._sampler = None
+
+    def result(self) -> bytes:
+        """The profile of the requests finished so far."""
+        if self._in_flight:
+            # the session timed out with requests in flight
+            self._stop()
+            self._in_flight = 0
+        if self._profile is not None:
+            self._profile.create_stats()
+            return marshal.dumps(self._profile.stats)
+        return render_collapsed(self.stacks).encode()
+
+
+class Profiler:
+    """Runs one profiling session at a time."""
+
+    max_seconds: float
+    session: Optional[RequestProfile]
+
+    def __init__(self, max_seconds: float = 60):
+        self.max_seconds = max_seconds
+        self.session = None
+        self._busy = False
+
+    async def sample(self, seconds: float, interval_s: float = DEFAULT_INTERVAL_S) -> str:
+        """Collapsed stacks of all threads, sampled for `seconds`."""
+        with self._exclusive():
+            stacks = await asyncio.to_thread(
+                sample_stacks, min(seconds, self.max_seconds), interval_s
+            )
+        return render_collapsed(stacks)
+
+    async def profile_requests(
+        self,
+        path: str,
+        count: int,
+        format: ProfileFormat = "collapsed",
+        timeout_s: Optional[float] = None,
+        interval_s: float = DEFAULT_INTERVAL_S,
+    ) -> tuple[bytes, int]:
+        """
+        Profile of the next `count` requests to `path` and the number of requests in it,
+        fewer than `count` if `timeout_s` passes first.
+        """
+        with self._exclusive():
+            session = RequestProfile(path, count, format, interval_s)
+            self.session = session
+            try:
+                await asyncio.wait_for(
+                    session.done.wait(), min(timeout_s or self.max_seconds, self.max_seconds)
+                )
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self.session = None
+            return session.result(), session.profiled
+
+    @contextmanager
+    def _exclusive(self):
+        # sessions are started on the event loop thread, no lock is needed
+        if self._busy:
+            raise ProfilerBusyError("Another profiling session is running")
+        self._busy = True
+        try:
+            yield
+        finally:
+            self._busy = False
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling the requests claimed by the running `Profiler` session."""
+
+    def __init__(self, app, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        session = self.profiler.session
+        if session is None or scope["type"] != "http" or scope["path"] != session.path:
+            return await self.app(scope, receive, send)
+        if not session.claim():
+            return await self.app(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.release()
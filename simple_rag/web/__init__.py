@@ -1,21 +1,58 @@
-import uvicorn
+from typing import Optional
+
 from fastapi import FastAPI
 
+from simple_rag.metrics.latency import LatencyMiddleware
+from simple_rag.profiling import ProfilingMiddleware
+
 from .contextmanager import startup_and_shutdown
-from .routes import rag_assistant_router, summarizer_router, models_router, kb_router
-from .config import APP_SETTINGS
+from .context import AppContext
+from .routes import (
+    rag_assistant_router,
+    summarizer_router,
+    models_router,
+    kb_router,
+    cache_router,
+    metrics_router,
+    profiler_router,
+)
+from .config import AppSettings, load_settings
 
 
-app = FastAPI(
-    lifespan=startup_and_shutdown,
-)
+def create_app(settings: Optional[AppSettings] = None) -> FastAPI:
+    """
+    Application factory.
+    Importing this package has no side effects: settings are read, and the LLM,
+    embeddings and models are built only here and on application startup.
 
+    Can be used with uvicorn directly: `uvicorn simple_rag.web:create_app --factory`
+    """
+    if settings is None:
+        settings = load_settings()
 
-app.include_router(rag_assistant_router, tags=["rag", "assistant"])
-app.include_router(summarizer_router, tags=["summarizer"])
-app.include_router(models_router, tags=["models"])
-app.include_router(kb_router, tags=["rag", "knowledge_base"])
+    app = FastAPI(
+        lifespan=startup_and_shutdown,
+    )
+    app.state.ctx = AppContext(settings)
+    app.add_middleware(LatencyMiddleware)
+
+    app.include_router(rag_assistant_router, tags=["rag", "assistant"])
+    app.include_router(summarizer_router, tags=["summarizer"])
+    app.include_router(models_router, tags=["models"])
+    app.include_router(kb_router, tags=["rag", "knowledge_base"])
+    app.include_router(cache_router, tags=["cache"])
+    app.include_router(metrics_router, tags=["metrics"])
+
+    # nothing is installed unless profiling is enabled, so it costs nothing when off
+    if app.state.ctx.profiler is not None:
+        app.add_middleware(ProfilingMiddleware, profiler=app.state.ctx.profiler)
+        app.include_router(profiler_router, tags=["admin"])
+
+    return app
 
 
 def run():
-    uvicorn.run(app, host=APP_SETTINGS.host, port=APP_SETTINGS.port)
+    import uvicorn
+
+    settings = load_settings()
+    uvicorn.run(create_app(settings), host=settings.host, port=settings.port)
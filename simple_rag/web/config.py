@@ -1,3 +1,4 @@
+import os
 from typing import Literal, Optional, Union
 from pydantic import Field
 from pydantic_settings import BaseSettings
@@ -5,9 +6,6 @@ from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
 
-load_dotenv(override=True)
-
-
 class GroqSettings(BaseSettings):
     model_name: str = Field(validation_alias="GROQ_MODEL_NAME")
 
@@ -20,6 +18,9 @@ class HttpSettings(BaseSettings):
 class QnaFileSettings(BaseSettings):
     qna_path: str = Field(validation_alias="QNA_FILE_PATH")
     qna_delimiter: str = Field(validation_alias="QNA_DELIMITER", default=";")
+    qna_db_path: Optional[str] = Field(validation_alias="QNA_DB_PATH", default=None)
+    qna_hot_set_size: int = Field(validation_alias="QNA_HOT_SET_SIZE", default=1024)
+    qna_chunk_rows: int = Field(validation_alias="QNA_CHUNK_ROWS", default=100_000)
 
 
 class LoggerSettings(BaseSettings):
@@ -30,9 +31,77 @@ class LoggerSettings(BaseSettings):
     )
 
 
+class EmbeddingsSettings(BaseSettings):
+    embeddings_model_name: str = Field(
+        validation_alias="EMBEDDINGS_MODEL_NAME",
+        default="sentence-transformers/all-mpnet-base-v2",
+    )
+    embeddings_model_dir: Optional[str] = Field(
+        validation_alias="EMBEDDINGS_MODEL_DIR", default=None
+    )
+    embeddings_offline: bool = Field(validation_alias="EMBEDDINGS_OFFLINE", default=False)
+    embeddings_cache_path: Optional[str] = Field(
+        validation_alias="EMBEDDINGS_CACHE_PATH", default="embeddings_cache.db"
+    )
+    embeddings_cache_size: int = Field(
+        validation_alias="EMBEDDINGS_CACHE_SIZE", default=500_000
+    )
+    embeddings_query_cache_size: int = Field(
+        validation_alias="EMBEDDINGS_QUERY_CACHE_SIZE", default=4096
+    )
+    embeddings_warmup: bool = Field(validation_alias="EMBEDDINGS_WARMUP", default=True)
+
+
+class SemanticCacheSettings(BaseSettings):
+    semantic_cache_enabled: bool = Field(
+        validation_alias="SEMANTIC_CACHE_ENABLED", default=False
+    )
+    semantic_cache_threshold: float = Field(
+        validation_alias="SEMANTIC_CACHE_THRESHOLD", default=0.95
+    )
+    semantic_cache_ttl_s: float = Field(validation_alias="SEMANTIC_CACHE_TTL", default=3600)
+    semantic_cache_size: int = Field(validation_alias="SEMANTIC_CACHE_SIZE", default=1000)
+
+
+class ExecutorSettings(BaseSettings):
+    llm_executor_workers: int = Field(validation_alias="LLM_EXECUTOR_WORKERS", default=32)
+    retrieval_executor_workers: int = Field(
+        validation_alias="RETRIEVAL_EXECUTOR_WORKERS", default=8
+    )
+    db_executor_workers: int = Field(validation_alias="DB_EXECUTOR_WORKERS", default=8)
+    llm_async_concurrency: int = Field(validation_alias="LLM_ASYNC_CONCURRENCY", default=256)
+
+
+class KBaseBatchSettings(BaseSettings):
+    kbase_batch_max_size: int = Field(validation_alias="KBASE_BATCH_MAX_SIZE", default=256)
+    kbase_batch_concurrency: int = Field(
+        validation_alias="KBASE_BATCH_CONCURRENCY", default=8
+    )
+
+
+class ProfilerSettings(BaseSettings):
+    profiler_enabled: bool = Field(validation_alias="PROFILER_ENABLED", default=False)
+    profiler_token: Optional[str] = Field(validation_alias="PROFILER_TOKEN", default=None)
+    profiler_max_seconds: float = Field(
+        validation_alias="PROFILER_MAX_SECONDS", default=60
+    )
+
+
+class MetricsSettings(BaseSettings):
+    metrics_db_url: str = Field(
+        validation_alias="METRICS_DB_URL", default="sqlite:///metrics.db"
+    )
+    metrics_flush_interval_s: float = Field(
+        validation_alias="METRICS_FLUSH_INTERVAL", default=5.0
+    )
+
+
 class DbConfig(BaseSettings):
     db_link: Optional[str] = None
     model_name: Optional[str] = None
+    bulk_insert: bool = True
+    bulk_chunk_size: int = 1000
+    keyword_index: bool = True
 
     class Config:
         env_prefix = "DB_"  # Префикс для переменных окружения
@@ -46,18 +115,95 @@ class ChromaVectorStoreConfig(BaseSettings):
     class Config:
         env_prefix = "VECTORSTORE_CHROMA_"
 
-VectorStoreConfig = Union[ChromaVectorStoreConfig]
 
-class StoreConfig(BaseSettings):
-    db_cfg: DbConfig = Field(default_factory=DbConfig)
-    vectorstore_cfg: VectorStoreConfig = Field(default_factory=VectorStoreConfig, discriminator='type')
-    csv_fallback_path: str = Field(validation_alias='STORE_CSV_FALLBACK', default=None)
+class NumpyVectorStoreConfig(BaseSettings):
+    """Exact in-memory index, see `simple_rag.knowledge_base.store.numpy_index`."""
+
+    type: Literal['numpy'] = 'numpy'
+    initial_capacity: int = 1024
+    quantization: Literal['float32', 'float16', 'int8'] = 'float32'
+    binary_prefilter: bool = False
+    rescore_factor: int = 10
 
+    class Config:
+        env_prefix = "VECTORSTORE_NUMPY_"
+
+
+class FaissVectorStoreConfig(BaseSettings):
+    """Persistent HNSW index, see `simple_rag.knowledge_base.store.faiss_index`."""
+
+    type: Literal['faiss'] = 'faiss'
+    persist_directory: Optional[str] = None
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    max_deleted_ratio: float = 0.5
+
+    class Config:
+        env_prefix = "VECTORSTORE_FAISS_"
 
-class AppSettings(HttpSettings, GroqSettings, QnaFileSettings, LoggerSettings, StoreConfig):
+VectorStoreConfig = Union[
+    ChromaVectorStoreConfig, NumpyVectorStoreConfig, FaissVectorStoreConfig
+]
+
+
+def default_vectorstore_cfg() -> VectorStoreConfig:
+    """Backend is picked by VECTORSTORE_TYPE, its options by the backend's env prefix."""
+    vectorstore_type = os.environ.get("VECTORSTORE_TYPE", "chroma")
+    if vectorstore_type == "numpy":
+        return NumpyVectorStoreConfig()
+    if vectorstore_type == "faiss":
+        return FaissVectorStoreConfig()
+    return ChromaVectorStoreConfig()
+
+class ProjectionConfig(BaseSettings):
+    """Dimensionality reduction of vectors, see `simple_rag.knowledge_base.store.projection`."""
+
+    # None keeps full-size vectors
+    type: Optional[Literal['pca', 'truncate']] = None
+    dim: int = 256
+    path: Optional[str] = None
+
+    class Config:
+        env_prefix = "STORE_PROJECTION_"
+
+
+class StoreConfig(BaseSettings):
+    db_cfg: DbConfig = Field(default_factory=DbConfig)
+    vectorstore_cfg: VectorStoreConfig = Field(default_factory=default_vectorstore_cfg, discriminator='type')
+    csv_fallback_path: Optional[str] = Field(validation_alias='STORE_CSV_FALLBACK', default=None)
+    vectorize_batch_size: int = Field(validation_alias='STORE_VECTORIZE_BATCH_SIZE', default=256)
+    vectorize_in_background: bool = Field(validation_alias='STORE_VECTORIZE_IN_BACKGROUND', default=False)
+    incremental_ingest: bool = Field(validation_alias='STORE_INCREMENTAL_INGEST', default=True)
+    results_cache_size: int = Field(validation_alias='STORE_RESULTS_CACHE_SIZE', default=1024)
+    results_cache_ttl_s: Optional[float] = Field(validation_alias='STORE_RESULTS_CACHE_TTL', default=300)
+    snapshot_path: Optional[str] = Field(validation_alias='STORE_SNAPSHOT_PATH', default=None)
+    projection_cfg: ProjectionConfig = Field(default_factory=ProjectionConfig)
+    retrieval_mode: Literal['vector', 'hybrid', 'keyword'] = Field(validation_alias='STORE_RETRIEVAL_MODE', default='vector')
+    rrf_k: int = Field(validation_alias='STORE_RRF_K', default=60)
+    keyword_search_workers: int = Field(validation_alias='STORE_KEYWORD_SEARCH_WORKERS', default=4)
+
+
+class AppSettings(
+    HttpSettings,
+    GroqSettings,
+    QnaFileSettings,
+    LoggerSettings,
+    StoreConfig,
+    EmbeddingsSettings,
+    ExecutorSettings,
+    SemanticCacheSettings,
+    KBaseBatchSettings,
+    MetricsSettings,
+    ProfilerSettings,
+):
     pass
 
 
-APP_SETTINGS = AppSettings()
+def load_settings() -> AppSettings:
+    """Reads .env and the environment. Nothing is read at import time."""
+    load_dotenv(override=True)
+    return AppSettings()
+
 
-__all__ = ["AppSettings", "APP_SETTINGS"]
+__all__ = ["AppSettings", "load_settings"]
@@ -1,23 +1,38 @@
+import asyncio
 from logging import Logger
-from langchain.chat_models.base import BaseChatModel
-from langchain_core.embeddings import Embeddings
+import time
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import Request
 
 from simple_rag.knowledge_base.manager import KnowledgeBaseManager
-from simple_rag.web.config import APP_SETTINGS, AppSettings
+from simple_rag.web.config import AppSettings
+from simple_rag.web.executors import Executors
 from simple_rag.chats import ChatManager
 from simple_rag.logger import setup_logger
-from simple_rag.llm import llm
-from simple_rag.embeddings import embeddings
+from simple_rag.llm import make_llm
+from simple_rag.metrics.counters import MetricCounters
+from simple_rag.metrics.kbase_metric import configure_db as configure_metrics_db
+from simple_rag.embeddings import embeddings, provider as embeddings_provider
 from simple_rag.models import ModelCreator
+from simple_rag.profiling import Profiler
+
+if TYPE_CHECKING:
+    from langchain.chat_models.base import BaseChatModel
+    from langchain_core.embeddings import Embeddings
 
 
 class AppContext:
     logger: Logger
     chatManager: ChatManager
     modelCreator: ModelCreator
-    llm: BaseChatModel
+    llm: "BaseChatModel"
     knowledge_base_mgr: KnowledgeBaseManager
-    embeddings: Embeddings
+    embeddings: "Embeddings"
+    executors: Executors
+    metric_counters: MetricCounters
+    # None unless profiling is enabled
+    profiler: Optional[Profiler]
 
     settings: AppSettings
 
@@ -25,42 +40,101 @@ class AppContext:
         self.logger = setup_logger(settings.model_dump())
         self.chatManager = ChatManager()
         self.settings = settings
+
+        embeddings_provider.configure(
+            model_name=settings.embeddings_model_name,
+            model_dir=settings.embeddings_model_dir,
+            offline=settings.embeddings_offline,
+            cache_path=settings.embeddings_cache_path,
+            cache_size=settings.embeddings_cache_size,
+            query_cache_size=settings.embeddings_query_cache_size,
+        )
         self.embeddings = embeddings
 
+        self.executors = Executors(
+            llm_workers=settings.llm_executor_workers,
+            retrieval_workers=settings.retrieval_executor_workers,
+            db_workers=settings.db_executor_workers,
+            llm_async_concurrency=settings.llm_async_concurrency,
+        )
+
+        configure_metrics_db(settings.metrics_db_url)
+        self.metric_counters = MetricCounters(settings.metrics_flush_interval_s)
+
+        self.profiler = None
+        if settings.profiler_enabled:
+            if settings.profiler_token:
+                self.profiler = Profiler(settings.profiler_max_seconds)
+            else:
+                self.logger.warning(
+                    "PROFILER_ENABLED is set without PROFILER_TOKEN, profiling is off"
+                )
+
         # XXX: NOTE THAT LLM, KB_MANAGER AND MODEL_CREATOR ARE NOT INITIALIZED HERE!
 
     async def on_startup(self):
         self.logger.debug("AppContext STARTUP")
-        # FIXME: init llm here based on config
-        self.llm = llm
+        started = time.perf_counter()
+        self.metric_counters.start()
+
+        if self.settings.embeddings_warmup:
+            # loads the model, so the first request doesn't
+            await asyncio.to_thread(embeddings_provider.warmup)
+
+        self.llm = make_llm(self.settings.model_name)
         self.modelCreator = ModelCreator(
-            llm=llm, embeddings=self.embeddings, config=self.settings.model_dump()
+            llm=self.llm, embeddings=self.embeddings, config=self.settings.model_dump()
         )
         self.knowledge_base_mgr = KnowledgeBaseManager(
-            llm=llm, embeddings=self.embeddings, app_config=self.settings.model_dump()
+            llm=self.llm,
+            embeddings=self.embeddings,
+            app_config=self.settings.model_dump(),
+        )
+
+        self.logger.info(
+            f"Startup done in {time.perf_counter() - started:.2f}s, "
+            f"embeddings: {embeddings_provider.startup_report()}"
         )
 
     async def on_shutdown(self):
         self.logger.debug("AppContext SHUTDOWN")
+        try:
+            await asyncio.to_thread(self.metric_counters.close)
+        except Exception as e:
+            self.logger.exception(f"Failed to flush metrics on shutdown: {e}")
+        self.executors.shutdown(wait=False)
+
+
+def get_app_context(request: Request) -> AppContext:
+    return request.app.state.ctx
+
+
+def get_chat_manager(request: Request):
+    return get_app_context(request).chatManager
+
+
+def get_model_creator(request: Request):
+    return get_app_context(request).modelCreator
 
 
-APP_CTX = AppContext(APP_SETTINGS)
+def get_default_llm(request: Request):
+    return get_app_context(request).llm
 
 
-def get_chat_manager():
-    return APP_CTX.chatManager
+def get_knowledge_base_manager(request: Request):
+    return get_app_context(request).knowledge_base_mgr
 
 
-def get_model_creator():
-    return APP_CTX.modelCreator
+def get_executors(request: Request) -> Executors:
+    return get_app_context(request).executors
 
 
-def get_default_llm():
-    return APP_CTX.llm
+def get_metric_counters(request: Request) -> MetricCounters:
+    return get_app_context(request).metric_counters
 
 
-def get_knowledge_base_manager():
-    return APP_CTX.knowledge_base_mgr
+def get_settings(request: Request) -> AppSettings:
+    return get_app_context(request).settings
 
 
-__all__ = ["AppContext", "APP_CTX"]
+__all__ = ["AppContext", "get_app_context"]
@@ -1,4 +1,3 @@
-import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -17,13 +16,13 @@ async def startup_and_shutdown(app: FastAPI):
     Здесь инициализируем подключения до начала работы приложения
     и закрываем ресурсы после окончания работы приложения.
     """
-    from .context import APP_CTX
+    ctx = app.state.ctx
 
     # Making initialization (e.g., connecting to the database)
-    await APP_CTX.on_startup()
+    await ctx.on_startup()
 
     # Pass control to the main code
     yield
 
     # Making shutdown (e.g., closing connections)
-    await APP_CTX.on_shutdown()
+    await ctx.on_shutdown()
@@ -0,0 +1,88 @@
+"""
+executors.py - Bounded thread pools for blocking work done by async routes.
+
+LLM calls, retrieval (embeddings, vector search) and DB access are synchronous.
+Calling them from an `async def` handler blocks the event loop, so the whole server
+stops serving until the call returns. Routes run such work with `Executors.run`:
+
+    response = await executors.run("llm", chat_manager.send_message, chat_id, message)
+
+Each kind of work has its own pool, so slow LLM calls can't starve DB access.
+A semaphore of the pool size guards every pool: requests beyond the capacity wait
+on the event loop (without occupying a thread or a slot in the pool queue),
+so the number of requests served in parallel is exactly the configured capacity.
+
+Native async work (`aquery`, `asend` of async-native models) doesn't need a thread, but
+takes a slot with `Executors.run_async`. Retrieval and DB work share the semaphore of
+the pool, so their capacity caps sync and async work together. An async LLM call only
+waits on the provider, so async LLM calls have their own, larger limit
+(`llm_async_concurrency`), and the LLM pool size caps the sync fallbacks only.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Literal, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+ExecutorKind = Literal["llm", "retrieval", "db"]
+
+
+class Executors:
+    _pools: dict[str, ThreadPoolExecutor]
+    _limits: dict[str, asyncio.Semaphore]
+    _async_limits: dict[str, asyncio.Semaphore]
+    sizes: dict[str, int]
+    async_sizes: dict[str, int]
+
+    def __init__(
+        self,
+        llm_workers: int = 32,
+        retrieval_workers: int = 8,
+        db_workers: int = 8,
+        llm_async_concurrency: int = 256,
+    ):
+        sizes = {"llm": llm_workers, "retrieval": retrieval_workers, "db": db_workers}
+
+        # threads are started on first use, creating pools is cheap
+        self._pools = {
+            kind: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"{kind}-worker")
+            for kind, size in sizes.items()
+        }
+        self._limits = {kind: asyncio.Semaphore(size) for kind, size in sizes.items()}
+        self._async_limits = {**self._limits, "llm": asyncio.Semaphore(llm_async_concurrency)}
+        self.sizes = sizes
+        self.async_sizes = {**sizes, "llm": llm_async_concurrency}
+
+        logger.debug(f"Executors: {sizes}, async: {self.async_sizes}")
+
+    async def run(self, kind: ExecutorKind, func: Callable[..., T], *args, **kwargs) -> T:
+        """Runs blocking `func` in the pool for `kind` and waits for the result."""
+        loop = asyncio.get_running_loop()
+        # as in `asyncio.to_thread`, context variables (e.g. the latency labels) are kept
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+
+        async with self._limits[kind]:
+            return await loop.run_in_executor(self._pools[kind], call)
+
+    async def run_async(
+        self, kind: ExecutorKind, func: Callable[..., Awaitable[T]], *args, **kwargs
+    ) -> T:
+        """Awaits async `func` holding a slot of the async limit for `kind`."""
+        async with self._async_limits[kind]:
+            return await func(*args, **kwargs)
+
+    def limit(self, kind: ExecutorKind) -> asyncio.Semaphore:
+        """
+        The semaphore capping async work of `kind`, for code running several async calls
+        (e.g. the answers of a batch, a token stream) that must count one by one.
+        """
+        return self._async_limits[kind]
+
+    def shutdown(self, wait: bool = True):
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait, cancel_futures=True)
@@ -2,3 +2,6 @@ from .common_chat import router as rag_assistant_router
 from .summarizer import router as summarizer_router
 from .models import router as models_router
 from .knowledge_base import router as kb_router
+from .cache import router as cache_router
+from .metrics import router as metrics_router
+from .profiler import router as profiler_router
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+from starlette.responses import JSONResponse
+
+from simple_rag.cache.semantic import semantic_cache_stats
+from simple_rag.embeddings import provider as embeddings_provider
+from simple_rag.knowledge_base.manager import KnowledgeBaseManager
+from simple_rag.web.context import get_knowledge_base_manager
+
+router = APIRouter(prefix="/cache")
+
+
+@router.get("/")
+def cache_stats(
+    knowledge_base_manager: KnowledgeBaseManager = Depends(get_knowledge_base_manager),
+):
+    """Hit rates and sizes of the in-process caches, `null` for disabled ones."""
+    return JSONResponse(
+        content={
+            "semantic": semantic_cache_stats(),
+            "query_embeddings": embeddings_provider.query_cache_stats(),
+            "knowledge_base": {
+                name: model.cache_stats()
+                for name, model in knowledge_base_manager.models.items()
+            },
+        }
+    )
@@ -1,23 +1,23 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from simple_rag import embeddings
 from simple_rag.chats import ChatManager
+from simple_rag.metrics.latency import set_model_label
 from simple_rag.models import ModelCreator
-from simple_rag.models.qna_rag.model import QnAServiceConfig, build_static_file_model
-from simple_rag.web.context import get_chat_manager, get_model_creator
+from simple_rag.web.context import get_chat_manager, get_executors, get_model_creator
+from simple_rag.web.executors import Executors
 from loguru import logger
 
 router = APIRouter(prefix="/chat")
 
 
-def get_qna_service(cfg: QnAServiceConfig, llm):
-    return build_static_file_model(llm=llm, config=cfg, embeddings=embeddings)
-
-
 # Модели данных для API
 class ChatCreateRequest(BaseModel):
     model: str
@@ -46,11 +46,15 @@ async def create_chat(
     chat_create_request: ChatCreateRequest,
     chat_manager: ChatManager = Depends(get_chat_manager),
     model_creator: ModelCreator = Depends(get_model_creator),
+    executors: Executors = Depends(get_executors),
 ):
     """Создание нового чата"""
     try:
-        model = model_creator.build(chat_create_request.model)
-        chat = chat_manager.create_chat(model)
+        # building a model may load files and vectorize them
+        model = await executors.run(
+            "retrieval", model_creator.build, chat_create_request.model
+        )
+        chat = chat_manager.create_chat(model, chat_create_request.model)
         logger.info("Chat created with id: %s" % chat.id)
 
         return ChatResponse(chat_id=chat.id)
@@ -61,12 +65,27 @@ async def create_chat(
 
 @router.post("/message", response_model=MessageResponse)
 async def send_message(
-    request: MessageRequest, chat_manager: ChatManager = Depends(get_chat_manager)
+    request: MessageRequest,
+    chat_manager: ChatManager = Depends(get_chat_manager),
+    executors: Executors = Depends(get_executors),
 ):
     """Отправка сообщения в существующий чат"""
+    _label_with_chat_model(chat_manager, request.chat_id)
     try:
         logger.info("Sending message to chat %s" % request.chat_id)
-        response = chat_manager.send_message(request.chat_id, request.message)
+        chat = chat_manager.get_chat(request.chat_id)
+        if chat is None:
+            raise KeyError(request.chat_id)
+
+        # async models are capped by the async LLM limit, sync models run in the pool
+        if chat.model.has_async_send:
+            response = await executors.run_async(
+                "llm", chat_manager.asend_message, request.chat_id, request.message
+            )
+        else:
+            response = await executors.run(
+                "llm", chat_manager.send_message, request.chat_id, request.message
+            )
         return MessageResponse(response=response)
     except KeyError:
         logger.error("Error while sending message! Chat not found!")
@@ -76,6 +95,83 @@ async def send_message(
         raise HTTPException(status_code=502, detail="Internal server error")
 
 
+def _label_with_chat_model(chat_manager: ChatManager, chat_id: UUID):
+    chat = chat_manager.get_chat(chat_id)
+    if chat is not None:
+        set_model_label(chat.model_name)
+
+
+def _sse(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream_events(chat_id: UUID, tokens: AsyncIterator[str]):
+    started = time.perf_counter()
+    first_token_s = None
+    try:
+        async for token in tokens:
+            if first_token_s is None:
+                first_token_s = time.perf_counter() - started
+                logger.info(f"Chat {chat_id}: first token in {first_token_s:.3f}s")
+            yield _sse({"token": token})
+
+        yield _sse({"ttft_s": first_token_s}, event="end")
+    except Exception as ex:
+        # the status code is already sent, report the error in the stream
+        logger.error("Error while streaming message: %s" % ex)
+        yield _sse({"detail": "Internal server error"}, event="error")
+
+
+async def _limited(limit: asyncio.Semaphore, tokens: AsyncIterator[str]):
+    # the slot is held until the stream is completed
+    async with limit:
+        async for token in tokens:
+            yield token
+
+
+async def _sent_in_pool(
+    executors: Executors, chat_manager: ChatManager, chat_id: UUID, message: str
+):
+    # a model that can't stream is answered in the LLM pool, as one chunk
+    yield await executors.run("llm", chat_manager.send_message, chat_id, message)
+
+
+@router.post("/message/stream")
+async def stream_message(
+    request: MessageRequest,
+    chat_manager: ChatManager = Depends(get_chat_manager),
+    executors: Executors = Depends(get_executors),
+):
+    """
+    Отправка сообщения в существующий чат, ответ передается по токенам (Server-Sent Events).
+
+    Every token comes as `data: {"token": "..."}`, the stream ends with an `end` event
+    (or an `error` event). The answer is saved to the chat history when the stream ends.
+    """
+    _label_with_chat_model(chat_manager, request.chat_id)
+    logger.info("Streaming message to chat %s" % request.chat_id)
+    chat = chat_manager.get_chat(request.chat_id)
+    if chat is None:
+        logger.error("Error while sending message! Chat not found!")
+        raise HTTPException(status_code=404, detail="Chat not found")
+    model = chat.model
+
+    if model.has_async_stream or model.has_async_send:
+        tokens = _limited(
+            executors.limit("llm"),
+            chat_manager.astream_message(request.chat_id, request.message),
+        )
+    else:
+        tokens = _sent_in_pool(executors, chat_manager, request.chat_id, request.message)
+
+    return StreamingResponse(
+        _stream_events(request.chat_id, tokens),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/update_model")
 async def update_model(
     request: UpdateModelRequest,
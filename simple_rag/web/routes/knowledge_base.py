@@ -1,12 +1,25 @@
+import asyncio
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from loguru import logger
 from pydantic import BaseModel
 
+from simple_rag.knowledge_base.base import KnowledgeBaseModel
 from simple_rag.knowledge_base.manager import KnowledgeBaseManager, NoSuchModelError
-from simple_rag.metrics import get_metrics, increment_metric
+from simple_rag.metrics import get_metrics
+from simple_rag.metrics.counters import MetricCounters
 from simple_rag.metrics.kbase_metric import get_db
-from simple_rag.web.context import get_knowledge_base_manager
+from simple_rag.metrics.latency import set_model_label
+from simple_rag.web.config import AppSettings
+from simple_rag.web.context import (
+    get_executors,
+    get_knowledge_base_manager,
+    get_metric_counters,
+    get_settings,
+)
+from simple_rag.web.executors import Executors
 
 from sqlalchemy.orm import Session
 
@@ -21,25 +34,48 @@ class QuestionRequest(BaseModel):
 class MessageResponse(BaseModel):
     response: list[str]
 
+
+class BatchQuestionRequest(BaseModel):
+    questions: list[str]
+    model: str
+
+
+class BatchItemResponse(BaseModel):
+    response: Optional[list[str]] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    results: list[BatchItemResponse]
+
 class MetricsReport(BaseModel):
     metrics: dict[str, dict[str, int]]
     totals: int
 
 
 @router.post("/")
-def ask_question(
+async def ask_question(
     request: QuestionRequest,
     knowledge_base_manager: KnowledgeBaseManager = Depends(get_knowledge_base_manager),
-    # it breaks the layers isolation but for simple case we follow the fastapi docs
-    db: Session = Depends(get_db),
+    counters: MetricCounters = Depends(get_metric_counters),
+    executors: Executors = Depends(get_executors),
 ) -> MessageResponse:
     try:
         logger.info(f"Got request to knowledge base model={request.model}")
-        model = knowledge_base_manager.get_model(request.model)
-        increment_metric(db, endpoint='/kbase/', model_name=request.model)
+        # the model is built on the first request, which is slow
+        model = await executors.run(
+            "retrieval", knowledge_base_manager.get_model, request.model
+        )
+        # only known models become label values, unknown names would add series
+        set_model_label(request.model)
+        counters.increment(endpoint='/kbase/', model_name=request.model)
         logger.info(f"Found model={request.model}")
 
-        response = model.query(request.question)
+        # both count against the retrieval pool capacity, sync models run in the pool
+        if model.has_async_query:
+            response = await executors.run_async("retrieval", model.aquery, request.question)
+        else:
+            response = await executors.run("retrieval", model.query, request.question)
         return MessageResponse(response=response)
     except NoSuchModelError as e:
         logger.exception(f"No such model, details={e}")
@@ -51,6 +87,83 @@ def ask_question(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _query_batch_in_pool(
+    executors: Executors, model: KnowledgeBaseModel, questions: list[str], concurrency: int
+) -> list[list[str] | Exception]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def answer(question: str) -> list[str]:
+        async with semaphore:
+            return await executors.run("retrieval", model.query, question)
+
+    return await asyncio.gather(*(answer(q) for q in questions), return_exceptions=True)
+
+
+@router.post("/batch")
+async def ask_questions(
+    request: BatchQuestionRequest,
+    knowledge_base_manager: KnowledgeBaseManager = Depends(get_knowledge_base_manager),
+    counters: MetricCounters = Depends(get_metric_counters),
+    executors: Executors = Depends(get_executors),
+    settings: AppSettings = Depends(get_settings),
+) -> BatchResponse:
+    """
+    Answers all `questions` with one model. Results are in the order of questions,
+    a failed question gets an `error` instead of failing the whole batch.
+    """
+    if len(request.questions) > settings.kbase_batch_max_size:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.kbase_batch_max_size} questions per batch",
+        )
+
+    try:
+        logger.info(
+            f"Got batch of {len(request.questions)} questions to knowledge base "
+            f"model={request.model}"
+        )
+        model = await executors.run(
+            "retrieval", knowledge_base_manager.get_model, request.model
+        )
+        set_model_label(request.model)
+        counters.increment(
+            endpoint="/kbase/batch",
+            model_name=request.model,
+            count=len(request.questions),
+        )
+
+        # every answer in flight takes a slot of the retrieval pool, as single queries do
+        if model.has_async_query or model.has_async_batch:
+            answers = await model.aquery_batch(
+                request.questions,
+                max_concurrency=settings.kbase_batch_concurrency,
+                limit=executors.limit("retrieval"),
+            )
+        else:
+            answers = await _query_batch_in_pool(
+                executors, model, request.questions, settings.kbase_batch_concurrency
+            )
+    except NoSuchModelError as e:
+        logger.exception(f"No such model, details={e}")
+        raise HTTPException(status_code=404, detail="No such model")
+    except Exception as e:
+        logger.exception(
+            f"Got exception while using knowledge base (model={request.model}, details={e})"
+        )
+        raise HTTPException(status_code=500, detail=str(e))
+
+    results = []
+    for answer in answers:
+        if isinstance(answer, Exception):
+            logger.opt(exception=answer).warning(
+                f"Failed to answer batch question (model={request.model}): {answer}"
+            )
+            results.append(BatchItemResponse(error=str(answer)))
+        else:
+            results.append(BatchItemResponse(response=answer))
+    return BatchResponse(results=results)
+
+
 @router.get("/models/")
 def available_models(
     knowledge_base_manager: KnowledgeBaseManager = Depends(get_knowledge_base_manager),
@@ -66,8 +179,13 @@ def available_models(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get('/metrics/')
-def metrics(db: Session = Depends(get_db)) -> MetricsReport:
+async def metrics(
+    # it breaks the layers isolation but for simple case we follow the fastapi docs
+    db: Session = Depends(get_db),
+    counters: MetricCounters = Depends(get_metric_counters),
+    executors: Executors = Depends(get_executors),
+) -> MetricsReport:
     logger.info(f"Got request to knowledge base metrics")
-    metrics, totals = get_metrics(db)
+    metrics, totals = await executors.run("db", get_metrics, db, counters)
 
     return MetricsReport(metrics=metrics, totals=totals)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from starlette.responses import Response
+
+from simple_rag.metrics.latency import render_prometheus
+
+router = APIRouter(prefix="/metrics")
+
+
+@router.get("")
+def prometheus_metrics():
+    """Latency histograms of HTTP routes and request stages, in the Prometheus text format."""
+    return Response(
+        content=render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
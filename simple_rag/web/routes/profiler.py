@@ -0,0 +1,83 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from simple_rag.profiling import ProfileFormat, Profiler, ProfilerBusyError
+from simple_rag.web.context import get_app_context
+
+# mounted only when PROFILER_ENABLED and PROFILER_TOKEN are set
+router = APIRouter(prefix="/admin/profile")
+
+
+class SampleRequest(BaseModel):
+    seconds: float = Field(default=10, gt=0)
+    interval_ms: float = Field(default=5, ge=1)
+
+
+class RequestsProfileRequest(BaseModel):
+    path: str
+    count: int = Field(default=10, ge=1, le=1000)
+    format: ProfileFormat = "collapsed"
+    timeout_s: Optional[float] = Field(default=None, gt=0)
+    interval_ms: float = Field(default=5, ge=1)
+
+
+def get_admin_profiler(
+    request: Request, authorization: Optional[str] = Header(default=None)
+) -> Profiler:
+    ctx = get_app_context(request)
+    expected = f"Bearer {ctx.settings.profiler_token}"
+    if authorization is None or not hmac.compare_digest(
+        authorization.encode(), expected.encode()
+    ):
+        raise HTTPException(status_code=401, detail="Admin token required")
+    return ctx.profiler
+
+
+@router.post("/sample")
+async def sample(
+    request: SampleRequest, profiler: Profiler = Depends(get_admin_profiler)
+) -> PlainTextResponse:
+    """
+    Stacks of all threads sampled for `seconds`, in the collapsed format
+    (`frame;frame;frame count` per line) for flamegraph.pl or speedscope.
+    """
+    logger.info(f"Sampling stacks for {request.seconds}s")
+    try:
+        stacks = await profiler.sample(request.seconds, request.interval_ms / 1000)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(stacks)
+
+
+@router.post("/requests")
+async def profile_requests(
+    request: RequestsProfileRequest, profiler: Profiler = Depends(get_admin_profiler)
+) -> Response:
+    """
+    Profiles the next `count` requests to `path` and returns when they are done (or on
+    timeout, with the requests done so far, see the `X-Profiled-Requests` header).
+    `collapsed` samples all threads while the requests run, `pstats` is a `cProfile`
+    dump of the event loop thread, to be read with `pstats.Stats` or snakeviz.
+    """
+    logger.info(f"Profiling next {request.count} requests to {request.path} ({request.format})")
+    try:
+        result, profiled = await profiler.profile_requests(
+            request.path,
+            request.count,
+            request.format,
+            timeout_s=request.timeout_s,
+            interval_s=request.interval_ms / 1000,
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    headers = {"X-Profiled-Requests": str(profiled)}
+    if request.format == "pstats":
+        headers["Content-Disposition"] = 'attachment; filename="requests.pstats"'
+        return Response(result, media_type="application/octet-stream", headers=headers)
+    return Response(result, media_type="text/plain; charset=utf-8", headers=headers)
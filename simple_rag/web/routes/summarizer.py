@@ -2,7 +2,8 @@ from typing import Optional
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 
-from simple_rag.web.context import get_default_llm
+from simple_rag.web.context import get_default_llm, get_executors
+from simple_rag.web.executors import Executors
 import simple_rag.models.summarizer as summarizer
 
 router = APIRouter(prefix="/summary")
@@ -15,8 +16,14 @@ class BaseRequest(BaseModel):
 
 
 @router.post("/")
-async def summary(request: BaseRequest, llm=Depends(get_default_llm)):
-    return summarizer.summary(
+async def summary(
+    request: BaseRequest,
+    llm=Depends(get_default_llm),
+    executors: Executors = Depends(get_executors),
+):
+    return await executors.run(
+        "llm",
+        summarizer.summary,
         llm=llm,
         content=request.content,
         prompt_id=request.prompt_id,
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from simple_rag.web import create_app
+from simple_rag.web.config import AppSettings
+
+
+def make_settings(tmp_path) -> AppSettings:
+    return AppSettings(
+        GROQ_MODEL_NAME="llama3-8b-8192",
+        QNA_FILE_PATH="assets/sample_qna.csv",
+        EMBEDDINGS_WARMUP=False,
+        vectorstore_cfg={
+            "type": "chroma",
+            "collection_name": "test_app_factory",
+            "persist_directory": str(tmp_path / "chroma"),
+        },
+    )
+
+
+def test_import_has_no_side_effects(tmp_path):
+    code = (
+        "import sys, simple_rag.web\n"
+        "heavy = ['torch', 'langchain', 'langgraph', 'chromadb', 'pandas']\n"
+        "print(','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    env = {**os.environ, "PYTHONPATH": str(Path(__file__).parent.parent)}
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert proc.stdout.strip() == ""
+    # no settings are read and no metrics db is created on import
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_create_app_uses_given_settings(tmp_path):
+    settings = make_settings(tmp_path)
+
+    app = create_app(settings)
+
+    assert app.state.ctx.settings is settings
+
+
+def test_app_serves_models(tmp_path, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    app = create_app(make_settings(tmp_path))
+
+    with TestClient(app) as client:
+        response = client.get("/models/")
+
+    assert response.status_code == 200
+    assert "stub_model" in response.json()["models"]
+
+
+def test_app_serves_cache_stats(tmp_path, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    app = create_app(make_settings(tmp_path))
+
+    with TestClient(app) as client:
+        response = client.get("/cache/")
+
+    assert response.status_code == 200
+    assert "semantic" in response.json()
@@ -0,0 +1,89 @@
+import uuid
+
+import pandas as pd
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from simple_rag.chats import ChatManager
+from simple_rag.knowledge_base.store.default_store import Store
+from simple_rag.models.classic_static_file_rag.chat_model import ClassicRagModel
+from simple_rag.models.classic_static_file_rag.kb_model import ClassicRagKnowledgeBase
+from simple_rag.models.classic_static_file_rag.kb_model_v2 import ClassicV2RagKBModel
+from simple_rag.models.simple_chat_models.raw_chat import RawChat
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def vector_store(embeddings):
+    store = InMemoryVectorStore(embeddings)
+    store.add_documents(
+        [Document(page_content=text) for text in ["vm", "network", "storage"]]
+    )
+    return store
+
+
+def llm(*responses: str):
+    return FakeListChatModel(responses=list(responses))
+
+
+async def test_classic_rag_model_asend(vector_store):
+    model = ClassicRagModel(llm("async answer"), vector_store)
+
+    answer = await model.asend(uuid.uuid4(), "how to connect to vm?")
+
+    assert answer == "async answer"
+
+
+async def test_classic_rag_knowledge_base_aquery(vector_store):
+    model = ClassicRagKnowledgeBase(llm("async answer"), vector_store)
+
+    assert await model.aquery("how to connect to vm?") == ["async answer"]
+
+
+async def test_raw_chat_asend(embeddings):
+    model = RawChat(llm("first", "second"), embeddings)
+    session_id = str(uuid.uuid4())
+
+    assert await model.asend(session_id, "hi") == "first"
+    assert await model.asend(session_id, "hi again") == "second"
+
+
+async def test_classic_v2_kb_model_aquery_matches_query(embeddings, tmp_path):
+    store = Store(
+        vectorstore_cfg={
+            "type": "chroma",
+            "collection_name": "test_async_models",
+            "persist_directory": str(tmp_path),
+        },
+        embeddings=embeddings,
+    )
+    store.store_dataframe(pd.read_csv("assets/support_kbase.csv"))
+    model = ClassicV2RagKBModel(store=store)
+
+    question = "what is the proper way to connect to VM?"
+
+    assert await model.aquery(question) == model.query(question)
+
+
+async def test_chat_manager_asend_message(vector_store):
+    manager = ChatManager()
+    chat = manager.create_chat(ClassicRagModel(llm("async answer"), vector_store))
+
+    response = await manager.asend_message(chat.id, "how to connect to vm?")
+
+    assert response == "async answer"
+    assert chat.history[-1] == {"role": "model", "msg": "async answer"}
+
+
+async def test_chat_manager_asend_message_unknown_chat():
+    manager = ChatManager()
+
+    with pytest.raises(KeyError):
+        await manager.asend_message(uuid.uuid4(), "hi")
@@ -0,0 +1,106 @@
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from simple_rag.chats.chat import Chat, ChatModel
+from simple_rag.models.classic_static_file_rag.chat_model import ClassicRagModel
+from simple_rag.models.simple_chat_models.raw_chat import RawChat
+from simple_rag.web import create_app
+from simple_rag.web.config import AppSettings
+
+
+class ParrotModel(ChatModel):
+    def send(self, id, message: str):
+        return message
+
+    def update(self, new_cfg: dict[str, str]):
+        pass
+
+
+@pytest.fixture
+def vector_store():
+    store = InMemoryVectorStore(DeterministicFakeEmbedding(size=16))
+    store.add_documents([Document(page_content="vm"), Document(page_content="network")])
+    return store
+
+
+async def collect(tokens) -> list[str]:
+    return [token async for token in tokens]
+
+
+async def test_model_without_streaming_yields_whole_answer():
+    tokens = await collect(ParrotModel().astream(uuid.uuid4(), "hello"))
+
+    assert tokens == ["hello"]
+
+
+async def test_classic_rag_model_streams_tokens(vector_store):
+    model = ClassicRagModel(FakeListChatModel(responses=["an answer"]), vector_store)
+
+    tokens = await collect(model.astream(uuid.uuid4(), "question"))
+
+    assert len(tokens) > 1
+    assert "".join(tokens) == "an answer"
+
+
+async def test_raw_chat_streams_tokens():
+    model = RawChat(FakeListChatModel(responses=["an answer"]), embeddings=None)
+
+    tokens = await collect(model.astream(str(uuid.uuid4()), "question"))
+
+    assert "".join(tokens) == "an answer"
+
+
+async def test_chat_records_history_when_stream_completes(vector_store):
+    chat = Chat(ClassicRagModel(FakeListChatModel(responses=["an answer"]), vector_store))
+
+    stream = chat.astream("question")
+    await anext(stream)
+    assert chat.history == [{"role": "user", "msg": "question"}]
+
+    async for _ in stream:
+        pass
+    assert chat.history[-1] == {"role": "model", "msg": "an answer"}
+
+
+def test_stream_endpoint(tmp_path, monkeypatch, vector_store):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    settings = AppSettings(
+        GROQ_MODEL_NAME="llama3-8b-8192",
+        QNA_FILE_PATH="assets/sample_qna.csv",
+        EMBEDDINGS_WARMUP=False,
+        vectorstore_cfg={
+            "type": "chroma",
+            "collection_name": "test_chat_stream",
+            "persist_directory": str(tmp_path / "chroma"),
+        },
+    )
+    app = create_app(settings)
+
+    with TestClient(app) as client:
+        model = ClassicRagModel(FakeListChatModel(responses=["an answer"]), vector_store)
+        chat = app.state.ctx.chatManager.create_chat(model)
+
+        response = client.post(
+            "/chat/message/stream", json={"chat_id": str(chat.id), "message": "question"}
+        )
+        missing = client.post(
+            "/chat/message/stream", json={"chat_id": str(uuid.uuid4()), "message": "q"}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = [e for e in response.text.split("\n\n") if e]
+    tokens = [json.loads(e.removeprefix("data: "))["token"] for e in events[:-1]]
+    assert "".join(tokens) == "an answer"
+    assert events[-1].startswith("event: end")
+
+    assert chat.history[-1] == {"role": "model", "msg": "an answer"}
+    assert missing.status_code == 404
@@ -4,6 +4,7 @@ import pytest
 from langchain_chroma import Chroma
 import pandas as pd
 import tempfile
+from langchain_core.embeddings import DeterministicFakeEmbedding
 from loguru import logger
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -287,6 +288,7 @@ def test_similar_search_returns_original_kbase_row(df):
         'connect to my VM' in entry['Question'] for entry in matches
     ))
 
+
 def test_unvectored_rows_are_processed_at_startup(df):
     _, db_fname = tempfile.mkstemp()
     db_link = f"sqlite:///{db_fname}"
@@ -327,6 +329,7 @@ def test_unvectored_rows_are_processed_at_startup(df):
 
     assert len(matches) > 0
 
+
 def test_db_keeps_only_latest_version(sample_dataframe):
     _, db_fname = tempfile.mkstemp()
     db_link = f"sqlite:///{db_fname}"
@@ -379,6 +382,125 @@ def test_db_keeps_only_latest_version(sample_dataframe):
     versions = set(m['_version'] for m in metadatas)
     assert len(versions) == 1
 
+
 def test_embeddings_can_be_passed_explicitly():
     store = Store(embeddings=embeddings)
-    assert store.is_empty
\ No newline at end of file
+    assert store.is_empty
+
+
+def test_unvectored_rows_can_be_processed_in_background(df):
+    _, db_fname = tempfile.mkstemp()
+    db_link = f"sqlite:///{db_fname}"
+    tbl_name = "sample_kbase"
+
+    engine = DBEngine({"db_link": db_link, "model_name": tbl_name})
+    engine.store_dataframe(df)
+
+    store = Store(
+        db_cfg={
+            "db_link": db_link,
+            "model_name": tbl_name,
+        },
+        vectorstore_cfg={
+            "type": "chroma",
+            "collection_name": "support_knowledge_base",
+            "persist_directory": tempfile.mkdtemp(),
+        },
+        vectorize_batch_size=10,
+        vectorize_in_background=True,
+    )
+
+    assert store.wait_for_vectorization(timeout=60)
+
+    ids = store.vectorizer.vector_store.get(include=[])["ids"]
+    assert len(df) == len(ids)
+    assert list(engine.iter_unvectorized_batches(batch_size=10)) == []
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def test_incremental_version_embeds_only_changed_rows(df):
+    _, db_fname = tempfile.mkstemp()
+    embeddings = CountingEmbeddings(size=16)
+
+    store = Store(
+        db_cfg={
+            "db_link": f"sqlite:///{db_fname}",
+            "model_name": "sample_kbase",
+        },
+        vectorstore_cfg={
+            "type": "chroma",
+            "collection_name": "support_knowledge_base",
+            "persist_directory": tempfile.mkdtemp(),
+        },
+        embeddings=embeddings,
+    )
+    store.store_dataframe(df)
+
+    changed = df.copy()
+    changed.loc[0, "Solution"] = "a new solution"
+    embeddings.embedded = 0
+    store.store_dataframe(changed)
+
+    assert embeddings.embedded == 1
+
+    # the new version still has a vector for every row
+    metadatas = store.vectorizer.vector_store.get(where={"_version": 2})["metadatas"]
+    assert sorted(m["_db_id"] for m in metadatas) == sorted(store.df["_id"])
+
+
+def test_full_version_embeds_every_row(df):
+    embeddings = CountingEmbeddings(size=16)
+    store = Store(embeddings=embeddings, incremental=False)
+    store.store_dataframe(df)
+
+    embeddings.embedded = 0
+    store.store_dataframe(df)
+
+    assert embeddings.embedded == len(df)
+
+
+def test_incremental_version_moves_unchanged_rows(df, monkeypatch):
+    _, db_fname = tempfile.mkstemp()
+    db_link = f"sqlite:///{db_fname}"
+    embeddings = CountingEmbeddings(size=16)
+    store = Store(
+        db_cfg={"db_link": db_link, "model_name": "sample_kbase"},
+        vectorstore_cfg={"type": "numpy"},
+        embeddings=embeddings,
+    )
+    store.store_dataframe(df)
+    first_ids = store.df["_id"].tolist()
+
+    changed = df.copy()
+    changed.loc[0, "Solution"] = "a new solution"
+    store.store_dataframe(changed)
+
+    # one row inserted and vectorized, the others keep their rows and vectors
+    assert store.df["_id"].tolist()[1:] == first_ids[1:]
+    assert store.df["_id"].iloc[0] not in first_ids
+    assert len(pd.read_sql_table("sample_kbase", create_engine(db_link))) == len(df) + 1
+    assert len(store.vectorizer.vector_store) == len(df) + 1
+    db_ids, _ = store.vectorizer.get_vectors(store.version)
+    assert sorted(db_ids) == sorted(store.df["_id"])
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("embeddings are down")
+
+    monkeypatch.setattr(store.vectorizer, "vectorize_documents", broken)
+    with pytest.raises(RuntimeError):
+        store.store_dataframe(df)
+
+    # the live version is whole again
+    assert store.engine.version == 2
+    rows = pd.read_sql_table("sample_kbase", create_engine(db_link))
+    assert sorted(rows.loc[rows["version"] == 2, "id"]) == sorted(store.df["_id"])
+    db_ids, _ = store.vectorizer.get_vectors(2)
+    assert sorted(db_ids) == sorted(store.df["_id"])
+    assert len(store.get_entries_similar_to_problem("vpn", {"k": 3})) == 3
@@ -0,0 +1,83 @@
+import tempfile
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from simple_rag.knowledge_base.store.db_engine import DBEngine
+
+
+@pytest.fixture
+def sample_dataframe():
+    return pd.DataFrame(
+        {
+            "Question": ["q1", "q2", "q3", "q4", "q5"],
+            "Description": ["d1", "d2", None, "d4", "d5"],
+            "Solution": ["s1", "s2", "s3", "s4", "s5"],
+        }
+    )
+
+
+def make_engine(**kwargs) -> DBEngine:
+    _, db_fname = tempfile.mkstemp()
+    return DBEngine(
+        {"db_link": f"sqlite:///{db_fname}", "model_name": "sample_kbase", **kwargs}
+    )
+
+
+@pytest.mark.parametrize("bulk_insert", [True, False])
+def test_store_dataframe_returns_ids_in_row_order(sample_dataframe, bulk_insert):
+    engine = make_engine(bulk_insert=bulk_insert, bulk_chunk_size=2)
+
+    version, ids = engine.store_dataframe(sample_dataframe)
+
+    assert version == 1
+    assert len(ids) == len(sample_dataframe)
+
+    db_df = pd.read_sql_table("sample_kbase", create_engine(engine.db_link))
+    db_df = db_df.set_index("id").loc[ids]
+    assert db_df["question"].tolist() == sample_dataframe["Question"].tolist()
+    assert (db_df["version"] == 1).all()
+    assert not db_df["vectorized"].any()
+
+
+def test_bulk_and_row_by_row_store_the_same_rows(sample_dataframe):
+    bulk = make_engine(bulk_insert=True)
+    row_by_row = make_engine(bulk_insert=False)
+
+    bulk.store_dataframe(sample_dataframe)
+    row_by_row.store_dataframe(sample_dataframe)
+
+    pd.testing.assert_frame_equal(bulk.load_dataframe(), row_by_row.load_dataframe())
+
+
+def test_bulk_insert_increments_version(sample_dataframe):
+    engine = make_engine(bulk_chunk_size=2)
+
+    engine.store_dataframe(sample_dataframe)
+    version, ids = engine.store_dataframe(sample_dataframe)
+
+    assert version == 2
+    assert len(set(ids)) == len(sample_dataframe)
+
+
+def test_unvectorized_rows_are_streamed_in_batches(sample_dataframe):
+    engine = make_engine()
+    _, ids = engine.store_dataframe(sample_dataframe)
+
+    batches = list(engine.iter_unvectorized_batches(batch_size=2))
+
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert [row.id for b in batches for row in b] == ids
+
+
+def test_marked_rows_are_not_streamed_again(sample_dataframe):
+    engine = make_engine()
+    _, ids = engine.store_dataframe(sample_dataframe)
+
+    # emulate a catch-up that stopped after the first batch
+    first_batch = next(engine.iter_unvectorized_batches(batch_size=2))
+    engine.mark_vectorized([row.id for row in first_batch])
+
+    rest = [row.id for b in engine.iter_unvectorized_batches(batch_size=2) for row in b]
+    assert rest == ids[2:]
@@ -0,0 +1,71 @@
+import subprocess
+import sys
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from simple_rag.embeddings import EmbeddingsProvider, LazyEmbeddings
+
+
+class FakeFactory:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, **settings):
+        self.calls.append(settings)
+        return DeterministicFakeEmbedding(size=8)
+
+
+@pytest.fixture
+def factory():
+    return FakeFactory()
+
+
+def test_importing_embeddings_does_not_load_the_model():
+    code = (
+        "import sys, simple_rag.embeddings as e; "
+        "assert not e.provider.loaded; "
+        "assert 'torch' not in sys.modules; "
+        "assert 'langchain_huggingface' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_model_is_built_once_on_first_use(factory):
+    provider = EmbeddingsProvider(factory=factory)
+    embeddings = LazyEmbeddings(provider)
+    assert not provider.loaded
+
+    embeddings.embed_query("hello")
+    embeddings.embed_documents(["hello", "world"])
+
+    assert provider.loaded
+    assert len(factory.calls) == 1
+
+
+def test_configure_is_passed_to_factory(factory):
+    provider = EmbeddingsProvider(factory=factory)
+    provider.configure(model_name="some-model", model_dir="/tmp/models", offline=True)
+
+    provider.get()
+
+    assert factory.calls[0]["model_name"] == "some-model"
+    assert factory.calls[0]["model_dir"] == "/tmp/models"
+    assert factory.calls[0]["offline"] is True
+
+
+def test_configure_after_load_raises(factory):
+    provider = EmbeddingsProvider(factory=factory)
+    provider.get()
+
+    with pytest.raises(RuntimeError):
+        provider.configure(model_name="another-model")
+
+
+def test_warmup_reports_timings(factory):
+    provider = EmbeddingsProvider(factory=factory)
+
+    report = provider.warmup()
+
+    assert provider.loaded
+    assert set(report) == {"load_s", "warmup_s"}
@@ -0,0 +1,185 @@
+import sqlite3
+import tempfile
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from simple_rag.cache.embeddings import (
+    CachedEmbeddings,
+    QueryMemoEmbeddings,
+    aembed_queries,
+    embed_queries,
+)
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    embedded: int = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.embedded += 1
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def model():
+    return CountingEmbeddings(size=8)
+
+
+def make_cache(model, path=None, **kwargs):
+    path = path or tempfile.mkstemp(suffix=".db")[1]
+    return CachedEmbeddings(model, model_name="fake", path=path, **kwargs)
+
+
+def test_cached_vectors_are_equal_to_computed(model):
+    cache = make_cache(model)
+
+    first = cache.embed_documents(["a", "b"])
+    second = cache.embed_documents(["a", "b"])
+
+    assert first == second
+    assert model.embedded == 2
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_only_missing_texts_are_embedded(model):
+    cache = make_cache(model)
+    cache.embed_documents(["a", "b"])
+
+    cache.embed_documents(["a", "b", "c", "c"])
+
+    assert model.embedded == 3
+
+
+def test_whitespace_is_normalized(model):
+    cache = make_cache(model)
+
+    cache.embed_query("what  is IaaS?")
+    cache.embed_query(" what is IaaS? ")
+
+    assert model.embedded == 1
+
+
+def test_cache_survives_restart(model):
+    _, path = tempfile.mkstemp(suffix=".db")
+    make_cache(model, path).embed_documents(["a", "b"])
+
+    cache = make_cache(model, path)
+    cache.embed_documents(["a", "b"])
+
+    assert model.embedded == 2
+    assert cache.stats()["entries"] == 2
+
+
+def test_cache_is_scoped_by_model_name(model):
+    _, path = tempfile.mkstemp(suffix=".db")
+    make_cache(model, path).embed_documents(["a"])
+
+    other = CachedEmbeddings(model, model_name="other", path=path)
+    other.embed_documents(["a"])
+
+    assert model.embedded == 2
+
+
+def test_cache_is_bounded(model):
+    cache = make_cache(model, max_entries=10)
+
+    cache.embed_documents([str(i) for i in range(25)])
+
+    assert cache.stats()["entries"] <= 10
+
+
+def test_hits_do_not_write(model):
+    _, path = tempfile.mkstemp(suffix=".db")
+    cache = make_cache(model, path)
+    cache.embed_documents(["a", "b"])
+    inserted = dict(cache._db.execute("SELECT key, last_used FROM embeddings"))
+    writes = cache._db.total_changes
+
+    for _ in range(10):
+        cache.embed_documents(["a", "b"])
+
+    assert cache._db.total_changes == writes
+    # buffered times are written on close
+    cache.close()
+    with sqlite3.connect(path) as db:
+        used = dict(db.execute("SELECT key, last_used FROM embeddings"))
+    assert all(used[key] > last_used for key, last_used in inserted.items())
+
+
+def test_buffered_hits_count_for_eviction(model):
+    cache = make_cache(model, max_entries=20)
+    cache.embed_documents([str(i) for i in range(20)])
+    # "0" is the oldest insert, but the most recently used entry
+    cache.embed_documents(["0"])
+
+    cache.embed_documents(["new"])
+    model.embedded = 0
+    cache.embed_documents(["0"])
+
+    assert model.embedded == 0
+    assert cache.stats()["entries"] < 20
+
+
+def test_query_memo_encodes_query_once(model):
+    memo = QueryMemoEmbeddings(model, max_entries=2)
+
+    first = memo.embed_query("how to reset password")
+    second = memo.embed_query("how to  reset password ")
+
+    assert first == second
+    assert model.embedded == 1
+    assert memo.stats()["hits"] == 1
+
+
+def test_query_memo_is_bounded(model):
+    memo = QueryMemoEmbeddings(model, max_entries=2)
+
+    for text in ["a", "b", "c", "a"]:
+        memo.embed_query(text)
+
+    assert model.embedded == 4
+    assert memo.stats()["entries"] == 2
+
+
+def test_query_memo_passes_documents_through(model):
+    memo = QueryMemoEmbeddings(model)
+
+    memo.embed_documents(["a", "b"])
+    memo.embed_documents(["a", "b"])
+
+    assert model.embedded == 4
+
+
+async def test_query_memo_is_shared_by_async_calls(model):
+    memo = QueryMemoEmbeddings(model)
+
+    assert await memo.aembed_query("a") == memo.embed_query("a")
+    assert model.embedded == 1
+
+
+async def test_batched_queries_share_the_query_caches(model):
+    memo = QueryMemoEmbeddings(make_cache(model))
+
+    a, b, again = memo.embed_queries(["a", "b", "a"])
+
+    np.testing.assert_allclose([a, b], [model.embed_query("a"), model.embed_query("b")], rtol=1e-6)
+    model.embedded = 0
+    assert again == a
+    assert await memo.aembed_queries(["b", "a"]) == [b, a]
+    assert memo.embed_query("a") == a
+    # stored as queries in the persistent cache too
+    assert memo.underlying.embed_query("b") == b
+    assert model.embedded == 0
+
+
+async def test_batched_queries_use_embed_query_of_plain_models(model):
+    vectors = await aembed_queries(model, ["a", "b"])
+
+    assert vectors == [model.embed_query("a"), model.embed_query("b")]
+    assert embed_queries(model, ["a", "b"]) == vectors
@@ -0,0 +1,231 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from simple_rag.chats.chat import ChatModel
+from simple_rag.knowledge_base.base import KnowledgeBaseModel
+from simple_rag.knowledge_base.manager import KnowledgeBaseManager
+from simple_rag.web import create_app
+from simple_rag.web.config import AppSettings
+from simple_rag.web.executors import Executors
+
+
+class BlockingModel(ChatModel):
+    def __init__(self, release: threading.Event):
+        self.release = release
+
+    def send(self, id, message: str) -> str:
+        self.release.wait(timeout=5)
+        return message
+
+    def update(self, new_cfg: dict[str, str]):
+        pass
+
+
+async def test_run_does_not_block_event_loop():
+    executors = Executors(llm_workers=1)
+
+    task = asyncio.create_task(executors.run("llm", time.sleep, 0.2))
+    started = time.perf_counter()
+    await asyncio.sleep(0.01)
+
+    assert time.perf_counter() - started < 0.1
+    await task
+    executors.shutdown()
+
+
+async def test_run_is_bounded_by_workers():
+    executors = Executors(llm_workers=2)
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def work():
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+
+    await asyncio.gather(*(executors.run("llm", work) for _ in range(8)))
+
+    assert max_running == 2
+    executors.shutdown()
+
+
+async def test_server_responds_while_message_is_in_flight(tmp_path, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    settings = AppSettings(
+        GROQ_MODEL_NAME="llama3-8b-8192",
+        QNA_FILE_PATH="assets/sample_qna.csv",
+        EMBEDDINGS_WARMUP=False,
+        vectorstore_cfg={
+            "type": "chroma",
+            "collection_name": "test_executors",
+            "persist_directory": str(tmp_path / "chroma"),
+        },
+    )
+    app = create_app(settings)
+    ctx = app.state.ctx
+    await ctx.on_startup()
+
+    release = threading.Event()
+    chat = ctx.chatManager.create_chat(BlockingModel(release))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        message = asyncio.create_task(
+            client.post("/chat/message", json={"chat_id": str(chat.id), "message": "hi"})
+        )
+        await asyncio.sleep(0.05)
+
+        models = await asyncio.wait_for(client.get("/models/"), timeout=2)
+        assert models.status_code == 200
+        assert not message.done()
+
+        release.set()
+        response = await message
+
+    assert response.json() == {"response": "hi"}
+    await ctx.on_shutdown()
+
+
+class ConcurrencyProbe:
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.threads = set()
+        self.lock = threading.Lock()
+
+    def enter(self):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.threads.add(threading.current_thread().name)
+
+    def exit(self):
+        with self.lock:
+            self.running -= 1
+
+
+class SyncProbeChat(ChatModel):
+    def __init__(self, probe: ConcurrencyProbe):
+        self.probe = probe
+
+    def send(self, id, message: str) -> str:
+        self.probe.enter()
+        time.sleep(0.05)
+        self.probe.exit()
+        return message
+
+    def update(self, new_cfg: dict[str, str]):
+        pass
+
+
+class AsyncProbeChat(SyncProbeChat):
+    async def asend(self, id, message: str) -> str:
+        self.probe.enter()
+        await asyncio.sleep(0.05)
+        self.probe.exit()
+        return message
+
+
+class SyncProbeKB(KnowledgeBaseModel):
+    def __init__(self, probe: ConcurrencyProbe):
+        self.probe = probe
+
+    def query(self, query: str) -> list[str]:
+        self.probe.enter()
+        time.sleep(0.05)
+        self.probe.exit()
+        return [query]
+
+
+class AsyncProbeKB(SyncProbeKB):
+    async def aquery(self, query: str) -> list[str]:
+        self.probe.enter()
+        await asyncio.sleep(0.05)
+        self.probe.exit()
+        return [query]
+
+
+async def served_concurrently(tmp_path, monkeypatch, requests):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    settings = AppSettings(
+        GROQ_MODEL_NAME="llama3-8b-8192",
+        QNA_FILE_PATH="assets/sample_qna.csv",
+        EMBEDDINGS_WARMUP=False,
+        LLM_EXECUTOR_WORKERS=2,
+        LLM_ASYNC_CONCURRENCY=4,
+        RETRIEVAL_EXECUTOR_WORKERS=2,
+        METRICS_DB_URL=f"sqlite:///{tmp_path}/metrics.db",
+        vectorstore_cfg={"type": "numpy"},
+    )
+    app = create_app(settings)
+    ctx = app.state.ctx
+    await ctx.on_startup()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = await asyncio.gather(*(request(client, ctx) for request in requests))
+
+    await ctx.on_shutdown()
+    assert all(r.status_code == 200 for r in responses)
+
+
+async def test_sync_chat_model_is_capped_by_llm_pool(tmp_path, monkeypatch):
+    probe = ConcurrencyProbe()
+
+    async def message(client, ctx):
+        chat = ctx.chatManager.create_chat(SyncProbeChat(probe))
+        return await client.post("/chat/message", json={"chat_id": str(chat.id), "message": "hi"})
+
+    await served_concurrently(tmp_path, monkeypatch, [message] * 6)
+
+    assert probe.max_running == 2
+    assert all(name.startswith("llm-worker") for name in probe.threads)
+
+
+async def test_async_chat_model_has_its_own_limit(tmp_path, monkeypatch):
+    probe = ConcurrencyProbe()
+
+    async def message(client, ctx):
+        chat = ctx.chatManager.create_chat(AsyncProbeChat(probe))
+        return await client.post("/chat/message", json={"chat_id": str(chat.id), "message": "hi"})
+
+    await served_concurrently(tmp_path, monkeypatch, [message] * 8)
+
+    # not capped by the two LLM pool threads
+    assert probe.max_running == 4
+    assert not any(name.startswith("llm-worker") for name in probe.threads)
+
+
+@pytest.mark.parametrize("model_class", [SyncProbeKB, AsyncProbeKB])
+async def test_kbase_query_is_capped_by_retrieval_pool(tmp_path, monkeypatch, model_class):
+    probe = ConcurrencyProbe()
+    monkeypatch.setitem(KnowledgeBaseManager.models, "probe", model_class(probe))
+
+    async def query(client, ctx):
+        return await client.post("/kbase/", json={"model": "probe", "question": "q"})
+
+    await served_concurrently(tmp_path, monkeypatch, [query] * 6)
+
+    assert probe.max_running == 2
+
+
+@pytest.mark.parametrize("model_class", [SyncProbeKB, AsyncProbeKB])
+async def test_kbase_batch_is_capped_by_retrieval_pool(tmp_path, monkeypatch, model_class):
+    probe = ConcurrencyProbe()
+    monkeypatch.setitem(KnowledgeBaseManager.models, "probe", model_class(probe))
+
+    async def batch(client, ctx):
+        return await client.post("/kbase/batch", json={"model": "probe", "questions": ["q"] * 6})
+
+    await served_concurrently(tmp_path, monkeypatch, [batch] * 2)
+
+    assert probe.max_running == 2
@@ -0,0 +1,184 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+pytest.importorskip("faiss")
+
+from simple_rag.knowledge_base.store.default_store import Store
+from simple_rag.knowledge_base.store.entity.default import SampleKBase
+from simple_rag.knowledge_base.store import faiss_index
+from simple_rag.knowledge_base.store.faiss_index import FaissVectorStore
+from simple_rag.knowledge_base.store.vectorizer import Vectorizer
+from simple_rag.web.config import FaissVectorStoreConfig, StoreConfig
+
+QUESTION = "what is the proper way to connect to VM?"
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=16)
+
+
+@pytest.fixture
+def store(tmp_path, embeddings):
+    return FaissVectorStore(embeddings, persist_directory=str(tmp_path / "index"))
+
+
+def add(store, texts, version):
+    return store.add_documents(
+        [
+            Document(page_content=text, metadata={"_version": version, "_db_id": i})
+            for i, text in enumerate(texts)
+        ]
+    )
+
+
+def test_search_with_version_filter(store):
+    add(store, ["a", "b", "c"], version=1)
+    add(store, ["a", "d"], version=2)
+
+    docs = store.similarity_search_with_relevance_scores("a", k=10, filter={"_version": 2})
+
+    assert [d.page_content for d, _ in docs][0] == "a"
+    assert {d.metadata["_version"] for d, _ in docs} == {2}
+    assert docs[0][1] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_delete_by_version_hides_rows_until_rebuild(store):
+    store.max_deleted_ratio = 0.9
+    add(store, ["a", "b", "c"], version=1)
+    add(store, ["d"], version=2)
+
+    Vectorizer(store).delete_old_vectors(2)
+
+    assert len(store) == 1
+    assert store._index.ntotal == 4
+    assert [d.page_content for d in store.similarity_search("a", k=10)] == ["d"]
+
+
+def test_rebuild_after_too_many_deletes(store):
+    add(store, ["a", "b", "c"], version=1)
+    add(store, ["d"], version=2)
+
+    Vectorizer(store).delete_old_vectors(2)
+    add(store, ["e"], version=3)
+
+    assert store._index.ntotal == 2
+    assert {d.page_content for d in store.similarity_search("a", k=10)} == {"d", "e"}
+
+
+def test_retag_vectors(store):
+    add(store, ["a", "b"], version=1)
+
+    moved = Vectorizer(store).retag_vectors([1], old_version=1, new_version=2)
+
+    [doc] = store.similarity_search("b", k=10, filter={"_version": 2})
+    assert moved == {1}
+    assert store._index.ntotal == 2
+    assert doc.metadata["_db_id"] == 1
+
+
+def test_save_and_load_memory_mapped(store, embeddings):
+    add(store, ["a", "b", "c"], version=1)
+    store.delete(where={"_version": {"$lt": 1}})
+    store.save()
+
+    loaded = FaissVectorStore(embeddings, persist_directory=store.persist_directory)
+
+    assert loaded._mapped
+    assert len(loaded) == 3
+    assert loaded.similarity_search("b", k=1)[0].page_content == "b"
+
+    # first write loads the index into memory
+    add(loaded, ["d"], version=1)
+    assert not loaded._mapped
+    assert loaded.similarity_search("d", k=1)[0].page_content == "d"
+
+
+def test_interrupted_save_keeps_the_previous_one(store, embeddings, monkeypatch):
+    add(store, ["a", "b"], version=1)
+    store.save()
+    add(store, ["c"], version=1)
+
+    def crash(*args, **kwargs):
+        raise OSError("disk full")
+
+    # the index file of the new generation is written, the metadata is not
+    monkeypatch.setattr(faiss_index, "_savez", crash)
+    with pytest.raises(OSError):
+        store.save()
+    loaded = FaissVectorStore(embeddings, persist_directory=store.persist_directory)
+
+    assert len(loaded) == 2
+    monkeypatch.undo()
+    store.save()
+    assert len(FaissVectorStore(embeddings, persist_directory=store.persist_directory)) == 3
+    assert len(list(Path(store.persist_directory).glob("gen-*"))) == 1
+
+
+def test_save_of_memory_mapped_index_links_it(store, embeddings):
+    add(store, ["a", "b"], version=1)
+    store.save()
+    loaded = FaissVectorStore(embeddings, persist_directory=store.persist_directory)
+
+    loaded.save()
+    # the previous generation is removed, writes load the index from the new one
+    add(loaded, ["c"], version=1)
+
+    assert len(loaded) == 3
+    assert loaded.similarity_search("c", k=1)[0].page_content == "c"
+
+
+def test_store_restart_reuses_persisted_index(tmp_path, embeddings):
+    cfg = {"type": "faiss", "persist_directory": str(tmp_path / "index")}
+    db_cfg = {"db_link": f"sqlite:///{tmp_path / 'kb.db'}", "model_name": "sample_kbase"}
+    df = pd.read_csv("assets/support_kbase.csv")
+
+    store = Store(
+        db_cfg=db_cfg, vectorstore_cfg=cfg, entity=SampleKBase, embeddings=embeddings
+    )
+    store.store_dataframe(df)
+    expected = store.get_entries_similar_to_problem(QUESTION)
+
+    restarted = Store(
+        db_cfg=db_cfg, vectorstore_cfg=cfg, entity=SampleKBase, embeddings=embeddings
+    )
+
+    assert restarted.vectorizer.vector_store._mapped
+    assert len(restarted.vectorizer.vector_store) == len(df)
+    assert restarted.get_entries_similar_to_problem(QUESTION) == expected
+
+
+def test_recall_against_exact_search(tmp_path, embeddings):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((2000, 32)).astype(np.float32)
+    store = FaissVectorStore(embeddings, ef_search=128)
+    store.add_vectors(vectors, [str(i) for i in range(len(vectors))], [{"_version": 1}] * 2000)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    found = 0
+    for query in rng.standard_normal((20, 32)).astype(np.float32):
+        exact = set(np.argsort(-(normalized @ query))[:10].astype(str))
+        approx = {
+            d.page_content for d, _ in store.similarity_search_with_score_by_vector(query, k=10)
+        }
+        found += len(exact & approx)
+
+    assert found / 200 >= 0.9
+
+
+def test_config_selects_faiss_backend(monkeypatch, tmp_path):
+    monkeypatch.setenv("VECTORSTORE_TYPE", "faiss")
+    monkeypatch.setenv("VECTORSTORE_FAISS_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setenv("VECTORSTORE_FAISS_EF_SEARCH", "100")
+
+    cfg = StoreConfig().vectorstore_cfg
+    vector_store = Store.build_vector_store(cfg.model_dump())
+
+    assert isinstance(cfg, FaissVectorStoreConfig)
+    assert isinstance(vector_store, FaissVectorStore)
+    assert vector_store.ef_search == 100
@@ -0,0 +1,237 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import SimpleChatModel
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from simple_rag.cache.embeddings import QueryMemoEmbeddings
+from simple_rag.cache.semantic import SemanticCache
+from simple_rag.knowledge_base.manager import KnowledgeBaseManager
+from simple_rag.knowledge_base.store.default_store import Store
+from simple_rag.knowledge_base.store.numpy_index import NumpyVectorStore
+from simple_rag.models.classic_static_file_rag.kb_model import ClassicRagKnowledgeBase
+from simple_rag.models.classic_static_file_rag.kb_model_v2 import ClassicV2RagKBModel
+from simple_rag.web import create_app
+from simple_rag.web.config import AppSettings
+
+
+class EchoChatModel(SimpleChatModel):
+    """Answers with the prompt, fails on prompts containing "boom"."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        prompt = messages[-1].content
+        if "boom" in prompt:
+            raise ValueError("generation failed")
+        return prompt
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: int = 0
+    queries: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls += 1
+        self.queries += 1
+        # an asymmetric model: queries and documents get different vectors
+        return super().embed_query("query: " + text)
+
+
+@pytest.fixture
+def vector_store():
+    store = InMemoryVectorStore(DeterministicFakeEmbedding(size=16))
+    store.add_documents(
+        [Document(page_content=text) for text in ["vm", "network", "storage"]]
+    )
+    return store
+
+
+def test_numpy_batch_search_matches_single_searches():
+    rng = np.random.default_rng(0)
+    store = NumpyVectorStore(None)
+    store.add_vectors(
+        rng.standard_normal((200, 16)),
+        [str(i) for i in range(200)],
+        [{"_version": i % 2} for i in range(200)],
+    )
+    queries = rng.standard_normal((5, 16))
+
+    found = store.similarity_search_with_score_by_vectors(queries, k=3, filter={"_version": 1})
+
+    for query, docs in zip(queries, found):
+        single = store.similarity_search_with_score_by_vector(query, k=3, filter={"_version": 1})
+        assert [d.page_content for d, _ in docs] == [d.page_content for d, _ in single]
+        assert [s for _, s in docs] == pytest.approx([s for _, s in single], abs=1e-5)
+
+
+async def test_store_batch_embeds_queries_once_and_matches_single_queries():
+    embeddings = CountingEmbeddings(size=16)
+    store = Store(vectorstore_cfg={"type": "numpy"}, embeddings=QueryMemoEmbeddings(embeddings))
+    df = pd.read_csv("assets/support_kbase.csv")
+    store.store_dataframe(df)
+    problems = df["Question"].tolist()[:3] + [df["Question"].iloc[0]]
+
+    embeddings.calls = embeddings.queries = 0
+    found = await store.aget_entries_for_problems(problems, {"k": 2})
+
+    # every distinct problem is embedded as a query, once
+    assert embeddings.calls == embeddings.queries == 3
+    assert found[3] == found[0]
+    store.results_cache.clear()
+    for problem, records in zip(problems, found):
+        assert records == await store.aget_entries_similar_to_problem(problem, {"k": 2})
+    assert embeddings.calls == 3
+
+
+async def test_classic_rag_batch_keeps_order_and_item_errors(vector_store):
+    model = ClassicRagKnowledgeBase(EchoChatModel(), vector_store)
+
+    answers = await model.aquery_batch(["first?", "boom?", "third?"], max_concurrency=2)
+
+    assert "first?" in answers[0][0]
+    assert isinstance(answers[1], ValueError)
+    assert "third?" in answers[2][0]
+
+
+class CountingLimit:
+    """Async context manager recording how many holders it had at once."""
+
+    def __init__(self, capacity: int):
+        self.semaphore = asyncio.Semaphore(capacity)
+        self.running = 0
+        self.max_running = 0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+
+    async def __aexit__(self, *exc):
+        self.running -= 1
+        self.semaphore.release()
+
+
+async def test_classic_rag_batch_holds_the_limit(vector_store):
+    model = ClassicRagKnowledgeBase(EchoChatModel(), vector_store)
+    limit = CountingLimit(2)
+
+    answers = await model.aquery_batch([f"q{i}?" for i in range(6)], limit=limit)
+
+    assert all(f"q{i}?" in answer[0] for i, answer in enumerate(answers))
+    assert limit.max_running == 2
+
+
+async def test_batch_caches_answers_but_not_errors(vector_store):
+    cache = SemanticCache(DeterministicFakeEmbedding(size=16))
+    model = ClassicRagKnowledgeBase(EchoChatModel(), vector_store, semantic_cache=cache)
+
+    await model.aquery_batch(["first?", "boom?"])
+
+    assert cache.stats()["entries"] == 1
+    assert await model.aquery("first?") == (await model.aquery_batch(["first?"]))[0]
+    assert cache.hits == 2
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, vector_store):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    settings = AppSettings(
+        GROQ_MODEL_NAME="llama3-8b-8192",
+        QNA_FILE_PATH="assets/sample_qna.csv",
+        EMBEDDINGS_WARMUP=False,
+        KBASE_BATCH_MAX_SIZE=3,
+        METRICS_DB_URL=f"sqlite:///{tmp_path}/metrics.db",
+        vectorstore_cfg={"type": "numpy"},
+    )
+    app = create_app(settings)
+    monkeypatch.setitem(
+        KnowledgeBaseManager.models,
+        "batch_test",
+        ClassicRagKnowledgeBase(EchoChatModel(), vector_store),
+    )
+
+    with TestClient(app) as client:
+        yield client
+
+
+def test_batch_endpoint(client):
+    response = client.post(
+        "/kbase/batch", json={"model": "batch_test", "questions": ["vm?", "boom?", "net?"]}
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert "vm?" in results[0]["response"][0] and results[0]["error"] is None
+    assert results[1] == {"response": None, "error": "generation failed"}
+    assert "net?" in results[2]["response"][0]
+
+    metrics = client.get("/kbase/metrics/").json()["metrics"]
+    assert metrics["/kbase/batch"] == {"batch_test": 3}
+
+
+def test_batch_endpoint_rejects_unknown_model_and_large_batches(client):
+    missing = client.post("/kbase/batch", json={"model": "nope", "questions": ["q"]})
+    too_many = client.post(
+        "/kbase/batch", json={"model": "batch_test", "questions": ["q"] * 4}
+    )
+
+    assert missing.status_code == 404
+    assert too_many.status_code == 422
+
+
+async def test_classic_v2_batch_matches_aquery():
+    store = Store(vectorstore_cfg={"type": "numpy"}, embeddings=DeterministicFakeEmbedding(size=16))
+    store.store_dataframe(pd.read_csv("assets/support_kbase.csv"))
+    model = ClassicV2RagKBModel(store=store)
+    questions = ["how to connect to VM?", "reset my password"]
+
+    answers = await model.aquery_batch(questions)
+
+    assert answers == [await model.aquery(q) for q in questions]
+
+
+async def test_store_batch_keeps_the_search_config():
+    store = Store(vectorstore_cfg={"type": "numpy"}, embeddings=DeterministicFakeEmbedding(size=16))
+    store.store_dataframe(pd.read_csv("assets/support_kbase.csv"))
+    problems = ["how to connect to VM?", "reset my password", "how to connect to VM?"]
+    config = {"k": 3, "score_threshold": 2.0}
+
+    found = await store.aget_entries_for_problems(problems, config)
+
+    assert found == [[], [], []]
+    store.results_cache.clear()
+    config["score_threshold"] = -1.0
+    found = await store.aget_entries_for_problems(problems, config)
+    assert [len(records) for records in found] == [3, 3, 3]
+    assert found[0] == await store.aget_entries_similar_to_problem(problems[0], config)
+
+
+async def test_store_batch_on_in_memory_store():
+    # the default backend searches vector by vector, with a predicate as the filter
+    store = Store(embeddings=DeterministicFakeEmbedding(size=16))
+    df = pd.read_csv("assets/support_kbase.csv")
+    store.store_dataframe(df)
+    store.store_dataframe(df.iloc[:5])
+    problems = df["Question"].tolist()[:3]
+
+    found = await store.aget_entries_for_problems(problems, {"k": 2})
+
+    assert [len(records) for records in found] == [2, 2, 2]
+    version = store.engine.version
+    vectors = store.vectorizer.embed_queries(problems)
+    for docs in store.vectorizer.similarity_search_by_vectors(vectors, 10, {"_version": version}):
+        assert len(docs) == 5
+        assert {doc.metadata["_version"] for doc in docs} == {version}
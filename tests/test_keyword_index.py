@@ -0,0 +1,218 @@
+import tempfile
+import threading
+import time
+
+import pandas as pd
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from sqlalchemy import create_engine, text
+
+from simple_rag.knowledge_base.store.db_engine import DBEngine
+from simple_rag.knowledge_base.store.default_store import Store, reciprocal_rank_fusion
+from simple_rag.knowledge_base.store.entity.default import SampleKBase
+from simple_rag.knowledge_base.store.keyword_index import keyword_query
+
+
+@pytest.fixture
+def tickets():
+    return pd.DataFrame(
+        {
+            "Question": [
+                "VPN drops every hour",
+                "Outlook error 0x80070005",
+                "Не запускается принтер",
+                "Password reset",
+            ],
+            "Description": [
+                "Connection to the VPN gateway is lost",
+                "Access denied when opening the mailbox",
+                "Принтер в офисе не печатает документы",
+                None,
+            ],
+            "Solution": [
+                "Update the VPN client",
+                "Recreate the Outlook profile",
+                "Перезапустите службу печати",
+                "Use the self-service portal",
+            ],
+        }
+    )
+
+
+def make_engine(**kwargs) -> DBEngine:
+    _, db_fname = tempfile.mkstemp()
+    return DBEngine(
+        {"db_link": f"sqlite:///{db_fname}", "model_name": "sample_kbase", **kwargs}
+    )
+
+
+def questions(engine, ids):
+    df = engine.load_dataframe().set_index("_id")
+    return [df.loc[i, "Question"] for i in ids]
+
+
+def test_keyword_query_quotes_tokens():
+    assert keyword_query('Outlook "error" 0x80070005, ERR-42!') == (
+        '"outlook" OR "error" OR "0x80070005" OR "err-42"'
+    )
+    assert keyword_query("?!") == ""
+
+
+def test_keyword_search_finds_codes_and_cyrillic(tickets):
+    engine = make_engine()
+    version, ids = engine.store_dataframe(tickets)
+
+    found = engine.keyword_search("0x80070005", version, limit=5)
+    assert [row_id for row_id, _ in found] == [ids[1]]
+
+    found = engine.keyword_search("ПРИНТЕР не печатает", version, limit=5)
+    assert questions(engine, [row_id for row_id, _ in found])[0] == "Не запускается принтер"
+
+    assert engine.keyword_search("?!", version, limit=5) == []
+
+
+def test_keyword_index_follows_versions(tickets):
+    engine = make_engine()
+    first, _ = engine.store_dataframe(tickets)
+    second, ids = engine.store_dataframe(tickets.iloc[:2])
+
+    assert len(engine.keyword_search("VPN", first, limit=5)) == 1
+    assert engine.keyword_search("принтер", second, limit=5) == []
+
+    engine.rollback_version(second)
+    assert engine.keyword_search("VPN", second, limit=5) == []
+
+    third, ids = engine.store_dataframe(tickets.iloc[:2])
+    engine.clear_old_versions()
+    assert engine.keyword_search("VPN", first, limit=5) == []
+    assert [row_id for row_id, _ in engine.keyword_search("VPN", third, limit=5)] == [ids[0]]
+
+
+def test_carried_rows_move_between_versions(tickets):
+    engine = make_engine()
+    first, ids = engine.store_dataframe(tickets)
+
+    second, new_ids = engine.store_dataframe(tickets.iloc[3:], carried_ids=ids[:2])
+
+    assert [row_id for row_id, _ in engine.keyword_search("VPN", second, limit=5)] == [ids[0]]
+    assert engine.keyword_search("VPN", first, limit=5) == []
+    assert sorted(engine.load_dataframe()["_id"]) == sorted(ids[:2] + new_ids)
+
+    engine.rollback_version(second, carried_ids=ids[:2], previous_version=first)
+    assert engine.version == first
+    assert [row_id for row_id, _ in engine.keyword_search("VPN", first, limit=5)] == [ids[0]]
+    assert sorted(engine.load_dataframe()["_id"]) == sorted(ids)
+
+    third, _ = engine.store_dataframe(tickets.iloc[3:], carried_ids=ids[:2])
+    engine.clear_old_versions()
+    assert [row_id for row_id, _ in engine.keyword_search("VPN", third, limit=5)] == [ids[0]]
+    assert engine.keyword_search("принтер", third, limit=5) == []
+
+
+def test_existing_table_is_indexed_on_load(tickets):
+    engine = make_engine(keyword_index=False)
+    version, ids = engine.store_dataframe(tickets)
+    with create_engine(engine.db_link).connect() as connection:
+        tables = connection.execute(text("SELECT name FROM sqlite_master")).scalars().all()
+    assert "sample_kbase_fts" not in tables
+
+    reopened = DBEngine({"db_link": engine.db_link, "model_name": "sample_kbase"})
+    reopened.load_dataframe()
+
+    assert [row_id for row_id, _ in reopened.keyword_search("Outlook", version, 5)] == [ids[1]]
+
+
+def test_reciprocal_rank_fusion():
+    assert reciprocal_rank_fusion([[1, 2, 3], [3, 1]]) == [1, 3, 2]
+    assert reciprocal_rank_fusion([[], [5, 4]]) == [5, 4]
+
+
+@pytest.mark.parametrize("mode", ["keyword", "hybrid"])
+def test_store_search_modes(tickets, mode):
+    _, db_fname = tempfile.mkstemp()
+    store = Store(
+        db_cfg={"db_link": f"sqlite:///{db_fname}", "model_name": "sample_kbase"},
+        vectorstore_cfg={"type": "numpy"},
+        entity=SampleKBase,
+        embeddings=DeterministicFakeEmbedding(size=16),
+        retrieval_mode=mode,
+    )
+    store.store_dataframe(tickets)
+
+    found = store.get_entries_similar_to_problem("0x80070005", {"k": 2})
+
+    assert found[0]["Question"] == "Outlook error 0x80070005"
+    assert len(found) == (1 if mode == "keyword" else 2)
+
+
+async def test_store_hybrid_search_on_in_memory_store(tickets):
+    # the default backend takes predicates, not metadata dicts, as filters
+    _, db_fname = tempfile.mkstemp()
+    store = Store(
+        db_cfg={"db_link": f"sqlite:///{db_fname}", "model_name": "sample_kbase"},
+        entity=SampleKBase,
+        embeddings=DeterministicFakeEmbedding(size=16),
+        retrieval_mode="hybrid",
+    )
+    store.store_dataframe(tickets)
+    store.store_dataframe(tickets.iloc[:3])
+
+    found = store.get_entries_similar_to_problem("Outlook error 0x80070005", {"k": 2})
+    afound = await store.aget_entries_similar_to_problem("Не запускается принтер", {"k": 3})
+
+    assert len(found) == 2
+    assert len(afound) == 3
+    # only rows of the live version are found
+    assert "Password reset" not in {r["Question"] for r in found + afound}
+
+
+async def test_store_async_hybrid_search(tickets):
+    _, db_fname = tempfile.mkstemp()
+    store = Store(
+        db_cfg={"db_link": f"sqlite:///{db_fname}", "model_name": "sample_kbase"},
+        vectorstore_cfg={"type": "numpy"},
+        entity=SampleKBase,
+        embeddings=DeterministicFakeEmbedding(size=16),
+    )
+    store.store_dataframe(tickets)
+
+    found = await store.ahybrid_search("принтер", k=3)
+
+    assert found[0]["Question"] == "Не запускается принтер"
+    assert len(found) == 3
+
+
+async def test_async_keyword_searches_are_bounded(tickets):
+    _, db_fname = tempfile.mkstemp()
+    store = Store(
+        db_cfg={"db_link": f"sqlite:///{db_fname}", "model_name": "sample_kbase"},
+        vectorstore_cfg={"type": "numpy"},
+        entity=SampleKBase,
+        embeddings=DeterministicFakeEmbedding(size=16),
+        retrieval_mode="keyword",
+        keyword_search_workers=2,
+    )
+    store.store_dataframe(tickets)
+    search = store.engine.keyword_search
+    lock = threading.Lock()
+    running, peak, threads = 0, 0, set()
+
+    def counting_search(*args):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+            threads.add(threading.current_thread().name)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return search(*args)
+
+    store.engine.keyword_search = counting_search
+    problems = [f"0x80070005 {i}" for i in range(10)]
+
+    found = await store.aget_entries_for_problems(problems, {"k": 1})
+
+    assert all(f[0]["Question"] == "Outlook error 0x80070005" for f in found)
+    assert peak == 2
+    assert all(name.startswith("store-keyword") for name in threads)
@@ -0,0 +1,140 @@
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from simple_rag.knowledge_base.base import KnowledgeBaseModel
+from simple_rag.knowledge_base.manager import KnowledgeBaseManager
+from simple_rag.knowledge_base.store.default_store import Store
+from simple_rag.metrics.latency import (
+    HTTP_SECONDS,
+    STAGE_SECONDS,
+    Histogram,
+    set_model_label,
+    timed,
+)
+from simple_rag.web import create_app
+from simple_rag.web.config import AppSettings
+from simple_rag.web.executors import Executors
+
+
+@pytest.fixture(autouse=True)
+def clear_histograms():
+    STAGE_SECONDS.clear()
+    HTTP_SECONDS.clear()
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test.", ("model",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 2.0):
+        histogram.observe(value, 'a"b')
+
+    assert histogram.render() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{model="a\\"b",le="0.1"} 1',
+        'test_seconds_bucket{model="a\\"b",le="1.0"} 3',
+        'test_seconds_bucket{model="a\\"b",le="+Inf"} 4',
+        'test_seconds_sum{model="a\\"b"} 3.05',
+        'test_seconds_count{model="a\\"b"} 4',
+    ]
+
+
+def test_quantiles_are_interpolated_within_buckets():
+    histogram = Histogram("test_seconds", "Test.", buckets=(0.1, 0.2, 0.4))
+    for _ in range(50):
+        histogram.observe(0.05)
+    for _ in range(50):
+        histogram.observe(0.3)
+
+    assert histogram.quantile(0.5) == pytest.approx(0.1)
+    assert histogram.quantile(0.95) == pytest.approx(0.38)
+    assert histogram.quantile(0.99, "unknown") is None
+
+
+def test_quantiles_of_empty_buckets():
+    histogram = Histogram("test_seconds", "Test.", buckets=(0.1, 0.2, 0.4))
+    for _ in range(10):
+        histogram.observe(0.3)
+
+    # the leading buckets are empty
+    assert histogram.quantile(0.0) == pytest.approx(0.2)
+    assert histogram.quantile(0.5) == pytest.approx(0.3)
+    assert histogram.quantile(1.0) == pytest.approx(0.4)
+
+    empty = Histogram("empty_seconds", "Test.", buckets=(0.1, 0.2))
+    assert empty.quantile(0.0) is None
+    assert empty.quantile(0.5) is None
+
+
+async def test_timed_labels_sync_and_async_calls_with_model():
+    @timed("sync_stage")
+    def sync_stage():
+        return 1
+
+    @timed("async_stage")
+    async def async_stage():
+        raise ValueError("failed calls are timed too")
+
+    set_model_label("m")
+    sync_stage()
+    with pytest.raises(ValueError):
+        await async_stage()
+
+    assert STAGE_SECONDS.snapshot()[("sync_stage", "m")][0][-1] == 1
+    assert STAGE_SECONDS.snapshot()[("async_stage", "m")][0][-1] == 1
+
+
+async def test_executors_keep_model_label():
+    executors = Executors(llm_workers=1, retrieval_workers=1, db_workers=1)
+    set_model_label("in_thread")
+
+    await executors.run("db", timed("db_stage")(lambda: None))
+
+    assert ("db_stage", "in_thread") in STAGE_SECONDS.snapshot()
+    executors.shutdown()
+
+
+class StoreModel(KnowledgeBaseModel):
+    def __init__(self):
+        self.store = Store(
+            vectorstore_cfg={"type": "numpy"}, embeddings=DeterministicFakeEmbedding(size=16)
+        )
+        self.store.store_dataframe(pd.read_csv("assets/support_kbase.csv"))
+
+    def query(self, query: str) -> list[str]:
+        return [r["Solution"] for r in self.store.get_entries_similar_to_problem(query)]
+
+
+def test_metrics_endpoint_reports_routes_and_stages(tmp_path, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    settings = AppSettings(
+        GROQ_MODEL_NAME="llama3-8b-8192",
+        QNA_FILE_PATH="assets/sample_qna.csv",
+        EMBEDDINGS_WARMUP=False,
+        METRICS_DB_URL=f"sqlite:///{tmp_path}/metrics.db",
+        vectorstore_cfg={"type": "numpy"},
+    )
+    monkeypatch.setitem(KnowledgeBaseManager.models, "latency_test", StoreModel())
+    app = create_app(settings)
+
+    with TestClient(app) as client:
+        assert client.post("/kbase/", json={"model": "latency_test", "question": "vpn"}).status_code == 200
+        assert client.post("/kbase/", json={"model": "missing", "question": "vpn"}).status_code == 404
+        missing_batch = {"model": "missing", "questions": ["vpn"]}
+        assert client.post("/kbase/batch", json=missing_batch).status_code == 404
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert (
+        'simple_rag_http_request_duration_seconds_count{method="POST",route="/kbase/",'
+        'status="200",model="latency_test"} 1'
+    ) in text
+    # unknown model names don't become label values
+    assert 'route="/kbase/",status="404",model=""' in text
+    assert 'route="/kbase/batch",status="404",model=""' in text
+    assert "missing" not in text
+    assert 'simple_rag_stage_duration_seconds_count{stage="store_get_entries",model="latency_test"} 1' in text
+    assert 'stage="vectorizer_search",model="latency_test"' in text
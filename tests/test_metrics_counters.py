@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from simple_rag.metrics import add_metrics, get_metrics
+from simple_rag.metrics.counters import MetricCounters
+from simple_rag.metrics import kbase_metric
+from simple_rag.metrics.kbase_metric import KBaseMetric, init_db
+
+
+@pytest.fixture
+def session(tmp_path):
+    init_db(f"sqlite:///{tmp_path}/metrics.db")
+    return kbase_metric.SessionLocal
+
+
+def test_upserts_from_threads_are_not_lost(session):
+    def work():
+        with session() as db:
+            for _ in range(20):
+                add_metrics(db, {("/kbase/", "m"): 1})
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with session() as db:
+        assert db.query(KBaseMetric).count() == 1
+        assert get_metrics(db) == ({"/kbase/": {"m": 160}}, 160)
+
+
+def test_pending_counts_are_reported_before_flush(session):
+    counters = MetricCounters(session_factory=session)
+    counters.increment("/kbase/", "m")
+    with session() as db:
+        add_metrics(db, {("/kbase/", "m"): 2})
+
+    counters.increment("/kbase/batch", "m", count=3)
+
+    with session() as db:
+        before = get_metrics(db, counters)
+        assert counters.flush() == 2
+        assert get_metrics(db, counters) == before == (
+            {"/kbase/": {"m": 3}, "/kbase/batch": {"m": 3}},
+            6,
+        )
+    assert counters.pending() == {}
+
+
+def test_failed_flush_keeps_counts(session):
+    def broken():
+        raise RuntimeError("db is down")
+
+    counters = MetricCounters(session_factory=broken)
+    counters.increment("/kbase/", "m", count=2)
+
+    with pytest.raises(RuntimeError):
+        counters.flush()
+    counters.increment("/kbase/", "m")
+
+    assert counters.pending() == {("/kbase/", "m"): 3}
+
+
+def test_close_flushes_pending_counts(session):
+    counters = MetricCounters(flush_interval_s=3600, session_factory=session)
+    counters.start()
+    counters.increment("/kbase/", "m")
+
+    counters.close()
+
+    with session() as db:
+        assert get_metrics(db) == ({"/kbase/": {"m": 1}}, 1)
+
+
+def test_duplicate_rows_are_merged_on_init(tmp_path):
+    url = f"sqlite:///{tmp_path}/metrics.db"
+    with create_engine(url).begin() as connection:
+        connection.execute(
+            text(
+                'CREATE TABLE metrics (id INTEGER PRIMARY KEY, endpoint VARCHAR NOT NULL, '
+                'model_name VARCHAR NOT NULL, "count" INTEGER)'
+            )
+        )
+        connection.execute(
+            text(
+                "INSERT INTO metrics (endpoint, model_name, count) VALUES "
+                "('/kbase/', 'm', 2), ('/kbase/', 'm', 3), ('/kbase/', 'other', 1)"
+            )
+        )
+
+    init_db(url)
+
+    with sessionmaker(bind=create_engine(url))() as db:
+        add_metrics(db, {("/kbase/", "m"): 1})
+        assert db.query(KBaseMetric).count() == 2
+        assert get_metrics(db) == ({"/kbase/": {"m": 6, "other": 1}}, 7)
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from simple_rag.knowledge_base.store.default_store import Store
+from simple_rag.knowledge_base.store.entity.default import SampleKBase
+from simple_rag.knowledge_base.store.numpy_index import NumpyVectorStore
+from simple_rag.knowledge_base.store.vectorizer import Vectorizer
+from simple_rag.web.config import NumpyVectorStoreConfig, StoreConfig
+
+QUESTION = "what is the proper way to connect to VM?"
+
+
+@pytest.fixture
+def store():
+    return NumpyVectorStore(DeterministicFakeEmbedding(size=16), initial_capacity=2)
+
+
+def add(store, texts, version):
+    return store.add_documents(
+        [
+            Document(page_content=text, metadata={"_version": version, "_db_id": i})
+            for i, text in enumerate(texts)
+        ]
+    )
+
+
+def test_search_returns_exact_match_first(store):
+    add(store, ["reset password", "connect to vm", "delete account"], version=1)
+
+    [(doc, score)] = store.similarity_search_with_score("connect to vm", k=1)
+
+    assert doc.page_content == "connect to vm"
+    assert score == pytest.approx(1.0, abs=1e-5)
+    assert len(store) == 3
+
+
+def test_relevance_scores_are_in_unit_interval(store):
+    texts = [f"text {i}" for i in range(20)]
+    add(store, texts, version=1)
+
+    raw = store.similarity_search_with_score("query", k=20)
+    relevance = store.similarity_search_with_relevance_scores("query", k=20)
+
+    assert min(score for _, score in raw) < 0
+    assert [d.page_content for d, _ in relevance] == [d.page_content for d, _ in raw]
+    for (_, cosine), (_, score) in zip(raw, relevance):
+        assert 0.0 <= score <= 1.0
+        assert score == pytest.approx((1 + cosine) / 2)
+
+    kept = store.similarity_search_with_relevance_scores("query", k=20, score_threshold=0.5)
+    assert len(kept) == sum(cosine >= 0 for _, cosine in raw)
+
+
+def test_search_matches_brute_force(store):
+    texts = [f"text {i}" for i in range(50)]
+    add(store, texts, version=1)
+
+    vectors = np.array(store.embedding.embed_documents(texts))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query = np.array(store.embedding.embed_query("query"))
+    expected = [texts[i] for i in np.argsort(-(vectors @ query))[:5]]
+
+    assert [d.page_content for d in store.similarity_search("query", k=5)] == expected
+
+
+def test_version_filter(store):
+    add(store, ["a", "b"], version=1)
+    add(store, ["c"], version=2)
+
+    docs = store.similarity_search("a", k=10, filter={"_version": 2})
+
+    assert [d.page_content for d in docs] == ["c"]
+    assert store.similarity_search("a", k=10, filter=lambda d: d.page_content == "b")[
+        0
+    ].page_content == "b"
+
+
+def test_delete_old_versions_compacts(store):
+    add(store, ["a", "b"], version=1)
+    add(store, ["c", "d"], version=2)
+
+    Vectorizer(store).delete_old_vectors(2)
+
+    assert len(store) == 2
+    assert {d.page_content for d in store.similarity_search("a", k=10)} == {"c", "d"}
+
+
+def test_delete_by_ids(store):
+    ids = add(store, ["a", "b", "c"], version=1)
+
+    store.delete(ids=ids[:2])
+
+    assert [d.id for d in store.get_by_ids(ids)] == ids[2:]
+
+
+def test_retag_vectors_moves_rows_in_place(store):
+    add(store, ["a", "b", "c"], version=1)
+
+    moved = Vectorizer(store).retag_vectors([0, 2, 7], old_version=1, new_version=2)
+
+    docs = store.similarity_search("a", k=10, filter={"_version": 2})
+    assert moved == {0, 2}
+    assert len(store) == 3
+    assert {(d.page_content, d.metadata["_db_id"]) for d in docs} == {("a", 0), ("c", 2)}
+    assert all(d.metadata["_version"] == 2 for d in docs)
+    assert [d.page_content for d in store.similarity_search("a", k=10, filter={"_version": 1})] == ["b"]
+
+
+def test_config_selects_numpy_backend(monkeypatch):
+    monkeypatch.setenv("VECTORSTORE_TYPE", "numpy")
+
+    cfg = StoreConfig().vectorstore_cfg
+
+    assert isinstance(cfg, NumpyVectorStoreConfig)
+    assert isinstance(Store.build_vector_store(cfg.model_dump()), NumpyVectorStore)
+
+
+def test_store_with_numpy_backend():
+    store = Store(
+        vectorstore_cfg={"type": "numpy"}, embeddings=DeterministicFakeEmbedding(size=16)
+    )
+    df = pd.read_csv("assets/support_kbase.csv")
+    store.store_dataframe(df)
+    store.store_dataframe(df.iloc[:5])
+
+    records = store.get_entries_similar_to_problem(QUESTION)
+
+    assert records
+    assert {r["Question"] for r in records} <= set(df.iloc[:5]["Question"])
+    store.clear_old_versions()
+    assert len(store.vectorizer.vector_store) == 5
+
+
+def test_store_restart_vectorizes_rows_again(tmp_path):
+    db_cfg = {"db_link": f"sqlite:///{tmp_path / 'kb.db'}", "model_name": "sample_kbase"}
+
+    def open_store():
+        return Store(
+            db_cfg=db_cfg,
+            vectorstore_cfg={"type": "numpy"},
+            entity=SampleKBase,
+            embeddings=DeterministicFakeEmbedding(size=16),
+        )
+
+    df = pd.read_csv("assets/support_kbase.csv")
+    open_store().store_dataframe(df)
+
+    # the index is memory-only, the DB still flags the rows as vectorized
+    store = open_store()
+
+    assert len(store.vectorizer.vector_store) == len(df)
+    assert store.get_entries_similar_to_problem(QUESTION)
@@ -0,0 +1,124 @@
+import asyncio
+import pstats
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from simple_rag.profiling import Profiler, ProfilerBusyError, ProfilingMiddleware
+from simple_rag.web import create_app
+from simple_rag.web.config import AppSettings
+
+AUTH = {"Authorization": "Bearer secret"}
+
+
+def make_app(tmp_path, **profiler_settings):
+    return create_app(
+        AppSettings(
+            GROQ_MODEL_NAME="llama3-8b-8192",
+            QNA_FILE_PATH="assets/sample_qna.csv",
+            EMBEDDINGS_WARMUP=False,
+            METRICS_DB_URL=f"sqlite:///{tmp_path}/metrics.db",
+            vectorstore_cfg={"type": "numpy"},
+            **profiler_settings,
+        )
+    )
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    app = make_app(tmp_path, PROFILER_ENABLED=True, PROFILER_TOKEN="secret")
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("settings", [{}, {"PROFILER_ENABLED": True}])
+def test_nothing_is_installed_when_disabled(tmp_path, settings):
+    app = make_app(tmp_path, **settings)
+
+    assert app.state.ctx.profiler is None
+    assert all(m.cls is not ProfilingMiddleware for m in app.user_middleware)
+    assert not any(route.path.startswith("/admin") for route in app.routes)
+
+
+def test_profiling_requires_admin_token(client):
+    assert client.post("/admin/profile/sample", json={"seconds": 0.01}).status_code == 401
+    response = client.post(
+        "/admin/profile/sample",
+        json={"seconds": 0.01},
+        headers={"Authorization": "Bearer wrong"},
+    )
+    assert response.status_code == 401
+
+
+def test_sample_returns_collapsed_stacks(client):
+    response = client.post(
+        "/admin/profile/sample", json={"seconds": 0.2, "interval_ms": 2}, headers=AUTH
+    )
+
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    # the sampling request itself waits in a worker thread
+    assert any("sample_stacks (profiling.py:" in line for line in lines)
+
+
+def profile_next_requests(client, path: str, count: int, **body):
+    with ThreadPoolExecutor(1) as pool:
+        profiling = pool.submit(
+            client.post,
+            "/admin/profile/requests",
+            json={"path": path, "count": count, **body},
+            headers=AUTH,
+        )
+        while client.app.state.ctx.profiler.session is None:
+            time.sleep(0.01)
+        for _ in range(count):
+            assert client.get(path).status_code == 200
+        return profiling.result()
+
+
+def test_profile_requests_as_pstats(client, tmp_path):
+    # an async route, cProfile runs on the event loop thread
+    response = profile_next_requests(client, "/kbase/metrics/", 2, format="pstats")
+
+    assert response.status_code == 200
+    assert response.headers["X-Profiled-Requests"] == "2"
+    path = tmp_path / "requests.pstats"
+    path.write_bytes(response.content)
+    functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert "metrics" in functions
+
+
+def test_profile_requests_as_collapsed_stacks(client):
+    response = profile_next_requests(client, "/models/", 3, format="collapsed", interval_ms=1)
+
+    assert response.status_code == 200
+    assert response.headers["X-Profiled-Requests"] == "3"
+
+
+def test_profile_requests_returns_on_timeout(client):
+    response = client.post(
+        "/admin/profile/requests",
+        json={"path": "/models/", "count": 5, "timeout_s": 0.1},
+        headers=AUTH,
+    )
+
+    assert response.status_code == 200
+    assert response.headers["X-Profiled-Requests"] == "0"
+    assert client.app.state.ctx.profiler.session is None
+
+
+async def test_one_session_at_a_time():
+    profiler = Profiler()
+    sampling = asyncio.create_task(profiler.sample(0.2))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(ProfilerBusyError):
+        await profiler.profile_requests("/kbase/", 1, timeout_s=0.1)
+    await sampling
+    assert await profiler.sample(0.01) is not None
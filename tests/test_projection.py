@@ -0,0 +1,190 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from simple_rag.knowledge_base.store.db_engine import DBEngine
+from simple_rag.knowledge_base.store.default_store import Store
+from simple_rag.knowledge_base.store.numpy_index import normalize_rows
+from simple_rag.knowledge_base.store.projection import (
+    PCAProjection,
+    TruncateProjection,
+    load_projection,
+    save_projection,
+)
+
+NUMPY = {"type": "numpy"}
+
+
+class LowRankEmbeddings(Embeddings):
+    """32-dimensional vectors with 8 dimensions of signal, like real embeddings have few."""
+
+    model_name = "low-rank"
+
+    def __init__(self):
+        self.mixing = np.random.default_rng(0).standard_normal((8, 32))
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        rng = np.random.default_rng(seed)
+        vector = rng.standard_normal(8) @ self.mixing + 0.01 * rng.standard_normal(32)
+        return vector.tolist()
+
+
+def low_rank_vectors(rows=500):
+    model = LowRankEmbeddings()
+    return normalize_rows(np.array(model.embed_documents([str(i) for i in range(rows)])))
+
+
+def test_pca_keeps_neighbors_of_low_rank_vectors():
+    vectors = low_rank_vectors()
+    projection = PCAProjection(8).fit(vectors)
+
+    projected = projection.transform(vectors)
+
+    assert projected.shape == (500, 8)
+    assert np.linalg.norm(projected, axis=1) == pytest.approx(1.0, abs=1e-5)
+    for query in range(10):
+        exact = np.argsort(-(vectors @ vectors[query]))[:5]
+        approx = np.argsort(-(projected @ projected[query]))[:5]
+        assert set(exact) == set(approx)
+
+
+def test_pca_fit_leaves_projection_unfitted():
+    projection = PCAProjection(8)
+
+    fitted = projection.fit(low_rank_vectors())
+
+    assert fitted.fitted and not projection.fitted
+    with pytest.raises(ValueError):
+        projection.transform(low_rank_vectors(1))
+
+
+def test_truncate_projection():
+    vectors = low_rank_vectors(10)
+
+    projected = TruncateProjection(4).transform(vectors)
+
+    assert projected == pytest.approx(normalize_rows(vectors[:, :4]))
+    with pytest.raises(ValueError):
+        TruncateProjection(64).transform(vectors)
+
+
+def test_projection_save_and_load(tmp_path):
+    projection = PCAProjection(8).fit(low_rank_vectors())
+
+    save_projection(projection, tmp_path / "projection.npz", kb_version=3)
+    loaded, version = load_projection(tmp_path / "projection.npz")
+
+    assert version == 3
+    assert isinstance(loaded, PCAProjection)
+    assert loaded.components == pytest.approx(projection.components)
+
+
+def make_store(projection_cfg, **kwargs):
+    return Store(
+        vectorstore_cfg=NUMPY,
+        embeddings=LowRankEmbeddings(),
+        projection_cfg=projection_cfg,
+        **kwargs,
+    )
+
+
+def first_row_query(df):
+    return "\n".join(f"{col}: {val}" for col, val in df.iloc[0].items())
+
+
+def test_store_indexes_projected_vectors(tmp_path):
+    df = pd.read_csv("assets/support_kbase.csv")
+    path = str(tmp_path / "projection.npz")
+    store = make_store({"type": "pca", "dim": 8, "path": path})
+
+    store.store_dataframe(df)
+
+    assert store.vectorizer.vector_store._dim == 8
+    found = store.get_entries_similar_to_problem(first_row_query(df))
+    assert found[0]["Question"] == df.iloc[0]["Question"]
+
+    # a restarted store projects queries with the saved projection
+    saved, version = load_projection(path)
+    assert version == store.version
+    restarted = make_store({"type": "pca", "dim": 8, "path": path})
+    assert restarted.vectorizer.projection.components == pytest.approx(
+        store.vectorizer.projection.components
+    )
+
+
+class CountingLowRankEmbeddings(LowRankEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def test_catch_up_fits_projection_on_all_rows(tmp_path):
+    df = pd.read_csv("assets/support_kbase.csv")
+    db_cfg = {"db_link": f"sqlite:///{tmp_path / 'kb.db'}", "model_name": "sample_kbase"}
+    DBEngine(db_cfg).store_dataframe(df)
+    embeddings = CountingLowRankEmbeddings()
+
+    store = Store(
+        db_cfg=db_cfg,
+        vectorstore_cfg=NUMPY,
+        embeddings=embeddings,
+        projection_cfg={"type": "pca", "dim": 8},
+        vectorize_batch_size=5,
+    )
+
+    # fitted on every row, not on the first batch, and no row is embedded twice
+    texts = store.vectorizer.vector_store._texts
+    expected = PCAProjection(8).fit(np.array(LowRankEmbeddings().embed_documents(texts)))
+    assert np.abs(store.vectorizer.projection.components) == pytest.approx(
+        np.abs(expected.components), abs=1e-4
+    )
+    assert embeddings.embedded == len(df)
+    assert len(store.vectorizer.vector_store) == len(df)
+
+
+def test_projection_is_refitted_only_when_no_vectors_are_copied():
+    df = pd.read_csv("assets/support_kbase.csv")
+    store = make_store({"type": "pca", "dim": 8})
+    store.store_dataframe(df)
+    fitted = store.vectorizer.projection
+
+    changed = df.copy()
+    changed.loc[0, "Solution"] = "reboot"
+    store.store_dataframe(changed)
+    assert store.vectorizer.projection is fitted
+
+    store.store_dataframe(changed, incremental=False)
+    assert store.vectorizer.projection is not fitted
+
+
+def test_snapshot_keeps_projection(tmp_path):
+    df = pd.read_csv("assets/support_kbase.csv")
+    store = make_store({"type": "pca", "dim": 8})
+    store.store_dataframe(df)
+    store.export_snapshot(str(tmp_path / "snapshot"))
+
+    loaded = make_store({"type": "pca", "dim": 8}, snapshot_path=str(tmp_path / "snapshot"))
+
+    assert not loaded.is_empty
+    assert loaded.vectorizer.projection.components == pytest.approx(
+        store.vectorizer.projection.components
+    )
+    query = first_row_query(df)
+    assert loaded.get_entries_similar_to_problem(query) == store.get_entries_similar_to_problem(
+        query
+    )
+
+    # vectors of another projection can't be used
+    mismatched = make_store({"type": "pca", "dim": 4}, snapshot_path=str(tmp_path / "snapshot"))
+    assert mismatched.is_empty
@@ -0,0 +1,73 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+
+from simple_rag.models.classic_static_file_rag.csv_parser import iter_csv_batches, parse_csv
+from simple_rag.models.qna_rag.parser.csv_parser import QnAFileParser
+
+
+def reference_qna(df: pd.DataFrame) -> dict[str, list[str]]:
+    """What the row by row parser built."""
+    db = {}
+    for _, row in df.iterrows():
+        db.setdefault(row["Вопрос"], []).append(row["Ответ"])
+    return db
+
+
+@pytest.fixture
+def qna_df():
+    rows = []
+    for i in range(40):
+        rows += [(f"question {i}", f"answer {i}.{j}") for j in range(i % 4 + 1)]
+    # a question repeated far from its first rows
+    rows.append(("question 3", "late answer"))
+    return pd.DataFrame(rows, columns=["Вопрос", "Ответ"])
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet", ".arrow"])
+def test_parse_qna_matches_row_by_row_parsing(tmp_path, qna_df, suffix):
+    path = tmp_path / f"qna{suffix}"
+    if suffix == ".csv":
+        qna_df.to_csv(path, sep=";", index=False)
+    elif suffix == ".parquet":
+        qna_df.to_parquet(path, row_group_size=7)
+    else:
+        feather.write_feather(pa.Table.from_pandas(qna_df), path, chunksize=7)
+
+    qna = QnAFileParser(str(path), chunk_rows=5).parse_qna()
+
+    assert qna.db == reference_qna(qna_df)
+    assert list(qna.get_questions()) == list(reference_qna(qna_df))
+
+
+def test_consecutive_answers_are_never_split(tmp_path, qna_df):
+    path = tmp_path / "qna.csv"
+    qna_df.to_csv(path, sep=";", index=False)
+
+    batches = list(QnAFileParser(str(path), chunk_rows=3).iter_qna_batches())
+
+    questions = [question for batch in batches for question, _ in batch]
+    assert questions == [f"question {i}" for i in range(40)] + ["question 3"]
+    assert all(batch for batch in batches)
+    assert dict(batches[-2])["question 39"] == [f"answer 39.{j}" for j in range(4)]
+    assert batches[-1] == [("question 3", ["late answer"])]
+
+
+def test_rows_without_question_are_skipped(tmp_path):
+    path = tmp_path / "qna.csv"
+    path.write_text("Вопрос;Ответ\nq;a\n;orphan\nq;b\n")
+
+    parser = QnAFileParser(str(path))
+
+    assert parser.parse_qna().db == {"q": ["a", "b"]}
+    assert parser.skipped_rows == 1
+
+
+def test_classic_csv_batches_match_parse_csv():
+    docs = parse_csv("assets/sample_qna.csv")
+
+    batches = list(iter_csv_batches("assets/sample_qna.csv", batch_size=10))
+
+    assert [len(b) for b in batches] == [10, 10, len(docs) - 20]
+    assert [doc for batch in batches for doc in batch] == docs
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from simple_rag.knowledge_base.store.default_store import Store
+from simple_rag.knowledge_base.store.numpy_index import NumpyVectorStore, normalize_rows
+from simple_rag.knowledge_base.store.quantization import (
+    Int8Codec,
+    binary_codes,
+    hamming_distances,
+)
+
+QUESTION = "what is the proper way to connect to VM?"
+
+
+def clustered_vectors(rows=3000, dim=64, clusters=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    vectors = centers[rng.integers(clusters, size=rows)] + 0.5 * rng.standard_normal(
+        (rows, dim)
+    )
+    return normalize_rows(vectors)
+
+
+def recall(store, vectors, queries, k=10):
+    found = 0
+    for query in queries:
+        exact = set(np.argsort(-(vectors @ query))[:k].astype(str))
+        approx = {
+            d.page_content for d, _ in store.similarity_search_with_score_by_vector(query, k)
+        }
+        found += len(exact & approx)
+    return found / (k * len(queries))
+
+
+def make_store(vectors, **kwargs):
+    store = NumpyVectorStore(DeterministicFakeEmbedding(size=vectors.shape[1]), **kwargs)
+    store.add_vectors(
+        vectors, [str(i) for i in range(len(vectors))], [{"_version": 1}] * len(vectors)
+    )
+    return store
+
+
+def test_int8_codec_round_trip():
+    vectors = clustered_vectors()
+    codec = Int8Codec()
+    codec.fit(vectors, np.empty((0, vectors.shape[1]), dtype=np.int8))
+
+    decoded = codec.decode(codec.encode(vectors))
+
+    assert np.abs(decoded - vectors).max() <= codec.scales.max() / 2 + 1e-6
+
+
+def test_int8_scales_widen_and_requantize_stored_codes():
+    codec = Int8Codec()
+    first = np.array([[0.5, -0.5]], dtype=np.float32)
+    codec.fit(first, np.empty((0, 2), dtype=np.int8))
+    codes = codec.encode(first)
+
+    codec.fit(np.array([[1.0, 0.1]], dtype=np.float32), codes)
+
+    assert codec.decode(codes) == pytest.approx(first, abs=0.01)
+
+
+def test_hamming_distances_match_bit_count():
+    rng = np.random.default_rng(0)
+    codes = binary_codes(rng.standard_normal((100, 40)))
+    query = binary_codes(rng.standard_normal(40))
+
+    expected = np.unpackbits(codes ^ query, axis=1).sum(axis=1)
+
+    assert (hamming_distances(codes, query) == expected).all()
+    # odd number of bytes
+    odd = np.unpackbits(codes[:, :3] ^ query[:3], axis=1).sum(axis=1)
+    assert (hamming_distances(codes[:, :3], query[:3]) == odd).all()
+
+
+@pytest.mark.parametrize(
+    "kwargs, bytes_per_row, min_recall",
+    [
+        ({"quantization": "float32"}, 256, 1.0),
+        ({"quantization": "float16"}, 128, 0.98),
+        ({"quantization": "int8"}, 64, 0.95),
+        ({"quantization": "int8", "binary_prefilter": True, "rescore_factor": 50}, 72, 0.8),
+    ],
+)
+def test_quantized_search(kwargs, bytes_per_row, min_recall):
+    vectors = clustered_vectors()
+    queries = clustered_vectors(rows=20, seed=1)
+
+    store = make_store(vectors, **kwargs)
+
+    assert store.memory_bytes() == bytes_per_row * len(vectors)
+    assert recall(store, vectors, queries) >= min_recall
+
+
+def test_prefilter_respects_version_filter():
+    vectors = clustered_vectors(rows=200)
+    store = NumpyVectorStore(
+        DeterministicFakeEmbedding(size=64), binary_prefilter=True, rescore_factor=2
+    )
+    store.add_vectors(
+        vectors,
+        [str(i) for i in range(200)],
+        [{"_version": 1 + i % 2} for i in range(200)],
+    )
+
+    docs = store.similarity_search_with_score_by_vector(vectors[0], k=5, filter={"_version": 2})
+
+    assert len(docs) == 5
+    assert {d.metadata["_version"] for d, _ in docs} == {2}
+
+
+def test_int8_store_snapshot_keeps_codes(tmp_path):
+    df = pd.read_csv("assets/support_kbase.csv")
+    cfg = {"type": "numpy", "quantization": "int8"}
+    store = Store(vectorstore_cfg=cfg, embeddings=DeterministicFakeEmbedding(size=16))
+    store.store_dataframe(df)
+    store.export_snapshot(str(tmp_path / "snapshot"))
+
+    loaded = Store(
+        vectorstore_cfg=cfg,
+        embeddings=DeterministicFakeEmbedding(size=16),
+        snapshot_path=str(tmp_path / "snapshot"),
+    )
+
+    vector_store = loaded.vectorizer.vector_store
+    assert vector_store._vectors.dtype == np.int8
+    assert not vector_store._vectors.flags.writeable
+    assert (vector_store._vectors == store.vectorizer.vector_store._vectors[: len(df)]).all()
+    assert loaded.get_entries_similar_to_problem(QUESTION) == store.get_entries_similar_to_problem(
+        QUESTION
+    )
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from simple_rag.knowledge_base.store.default_store import Store
+from simple_rag.knowledge_base.store.record_index import RecordIndex
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        {
+            "_id": [10, 11, 12, 13],
+            "Question": ["vpn", "printer", "vpn", None],
+            "Solution": ["reboot", np.nan, "update", "call"],
+        }
+    )
+
+
+def test_records_for_ids_keeps_order_and_skips_unknown(df):
+    index = RecordIndex(df)
+
+    records = index.records_for_ids([12, 99, 10])
+
+    assert [r["_id"] for r in records] == [12, 10]
+    assert records[0] == {"_id": 12, "Question": "vpn", "Solution": "update"}
+    assert index.get(99) is None
+
+
+def test_returned_records_are_copies(df):
+    index = RecordIndex(df, ["Question"])
+
+    index.records_for_ids([10])[0]["Solution"] = "changed"
+    index.lookup("Question", "vpn")[0]["Solution"] = "changed"
+
+    assert index.get(10)["Solution"] == "reboot"
+
+
+@pytest.mark.parametrize("indexed", [["Question", "Solution"], []])
+@pytest.mark.parametrize(
+    "column, value", [("Question", "vpn"), ("Question", None), ("Solution", np.nan), ("Solution", "x")]
+)
+def test_lookup_matches_dataframe_filter(df, indexed, column, value):
+    index = RecordIndex(df, indexed)
+
+    expected = df[df[column] == value].drop(columns=["_id"]).to_dict(orient="records")
+
+    assert index.lookup(column, value) == expected
+
+
+def make_store():
+    return Store(vectorstore_cfg={"type": "numpy"}, embeddings=DeterministicFakeEmbedding(size=16))
+
+
+def test_store_swaps_index_with_new_version():
+    store = make_store()
+    df = pd.read_csv("assets/support_kbase.csv")
+    store.store_dataframe(df)
+    first = store.records
+    question = df.loc[0, "Question"]
+
+    changed = df.copy()
+    changed.loc[0, "Question"] = "renamed"
+    store.store_dataframe(changed)
+
+    assert store.records is not first
+    assert store.get("Question", question) == []
+    assert store.get("Question", "renamed")[0]["Solution"] == df.loc[0, "Solution"]
+    # the replaced index still answers for its own version
+    assert first.lookup("Question", question)[0]["Question"] == question
+
+
+def test_vector_results_come_in_rank_order():
+    store = make_store()
+    df = pd.read_csv("assets/support_kbase.csv")
+    store.store_dataframe(df)
+    query = "\n".join(f"{col}: {val}" for col, val in df.iloc[5].items())
+
+    found = store.get_entries_similar_to_problem(query, {"k": 3})
+
+    assert found[0]["Question"] == df.loc[5, "Question"]
+    assert len(found) == 3
@@ -0,0 +1,164 @@
+import time
+
+import pandas as pd
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from simple_rag.cache.semantic import SemanticCache
+from simple_rag.knowledge_base.store.default_store import Store
+from simple_rag.models.classic_static_file_rag.chat_model import ClassicRagModel
+from simple_rag.models.classic_static_file_rag.kb_model import ClassicRagKnowledgeBase
+from simple_rag.models.classic_static_file_rag.kb_model_v2 import ClassicV2RagKBModel
+
+
+class TableEmbeddings(Embeddings):
+    """Fixed vectors, so that similarity between questions is known in advance."""
+
+    vectors = {
+        "how to reset password": [1.0, 0.0, 0.0],
+        "how do I reset my password": [0.99, 0.1, 0.0],
+        "how to delete account": [0.0, 1.0, 0.0],
+    }
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.vectors.get(text, [0.0, 0.0, 1.0])
+
+
+class CountingLLM(FakeListChatModel):
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+        return super()._call(*args, **kwargs)
+
+
+@pytest.fixture
+def cache():
+    return SemanticCache(TableEmbeddings(), threshold=0.95, ttl_s=60, max_entries=10)
+
+
+def test_similar_question_is_a_hit(cache):
+    scope = ("model", 1)
+    answer, vector = cache.lookup(scope, "how to reset password")
+    assert answer is None
+    cache.put(scope, "how to reset password", vector, "use the reset link")
+
+    answer, _ = cache.lookup(scope, "how do I reset my password")
+
+    assert answer == "use the reset link"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_different_question_is_a_miss(cache):
+    scope = ("model", 1)
+    cache.cached(scope, "how to reset password", lambda: "use the reset link")
+
+    answer, _ = cache.lookup(scope, "how to delete account")
+
+    assert answer is None
+
+
+def test_entries_are_scoped_per_model(cache):
+    cache.cached(("model_a", 1), "how to reset password", lambda: "a")
+
+    assert cache.cached(("model_b", 1), "how to reset password", lambda: "b") == "b"
+    assert cache.cached(("model_a", 1), "how to reset password", lambda: "x") == "a"
+
+
+def test_new_version_invalidates_entries(cache):
+    cache.cached(("model", 1), "how to reset password", lambda: "old")
+
+    assert cache.cached(("model", 2), "how to reset password", lambda: "new") == "new"
+    assert cache.stats()["entries"] == 1
+
+
+def test_entries_expire(cache):
+    cache.ttl_s = 0.01
+    cache.cached(("model", 1), "how to reset password", lambda: "old")
+    time.sleep(0.02)
+
+    assert cache.cached(("model", 1), "how to reset password", lambda: "new") == "new"
+
+
+def test_least_recently_used_is_evicted():
+    cache = SemanticCache(TableEmbeddings(), max_entries=2)
+    cache.cached(("model", 1), "how to reset password", lambda: "reset")
+    cache.cached(("model", 1), "how to delete account", lambda: "delete")
+    # refresh "reset"
+    cache.cached(("model", 1), "how to reset password", lambda: "x")
+    cache.cached(("model", 1), "something else", lambda: "other")
+
+    assert cache.cached(("model", 1), "how to reset password", lambda: "x") == "reset"
+    assert cache.cached(("model", 1), "how to delete account", lambda: "y") == "y"
+
+
+@pytest.fixture
+def vector_store():
+    store = InMemoryVectorStore(DeterministicFakeEmbedding(size=16))
+    store.add_documents([Document(page_content="reset"), Document(page_content="vm")])
+    return store
+
+
+def test_kb_model_generates_once_for_similar_questions(cache, vector_store):
+    llm = CountingLLM(responses=["use the reset link"])
+    model = ClassicRagKnowledgeBase(llm, vector_store, semantic_cache=cache)
+
+    assert model.query("how to reset password") == ["use the reset link"]
+    assert model.query("how do I reset my password") == ["use the reset link"]
+    assert llm.calls == 1
+
+
+async def test_chat_model_uses_cache_for_stream(cache, vector_store):
+    llm = CountingLLM(responses=["use the reset link"])
+    model = ClassicRagModel(llm, vector_store, semantic_cache=cache)
+
+    assert await model.asend("chat-1", "how to reset password") == "use the reset link"
+    tokens = [t async for t in model.astream("chat-2", "how do I reset my password")]
+
+    assert tokens == ["use the reset link"]
+    assert llm.calls == 1
+
+
+def test_chat_model_prompt_change_bypasses_cached_answers(cache, vector_store):
+    llm = CountingLLM(responses=["first", "second"])
+    model = ClassicRagModel(llm, vector_store, semantic_cache=cache)
+
+    model.send("chat", "how to reset password")
+    model.change_prompt("Answer shortly: {question} {context}")
+
+    assert model.send("chat", "how to reset password") == "second"
+
+
+def test_v2_kb_model_cache_is_invalidated_by_new_version(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    store = Store(
+        vectorstore_cfg={
+            "type": "chroma",
+            "collection_name": "test_semantic_cache",
+            "persist_directory": str(tmp_path),
+        },
+        embeddings=embeddings,
+    )
+    df = pd.read_csv("assets/support_kbase.csv")
+    store.store_dataframe(df)
+    cache = SemanticCache(embeddings)
+    model = ClassicV2RagKBModel(store=store, semantic_cache=cache)
+
+    question = "what is the proper way to connect to VM?"
+    model.query(question)
+    model.query(question)
+    assert cache.stats()["hits"] == 1
+
+    store.store_dataframe(df.iloc[:10])
+    answer = model.query(question)
+
+    assert cache.stats()["hits"] == 1
+    assert len(answer) <= 10
@@ -0,0 +1,114 @@
+import os
+import threading
+from unittest.mock import AsyncMock
+
+import pandas as pd
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models import FakeListChatModel
+
+from simple_rag.models.qna_rag.engine import RagEngineDynamicPrompt
+from simple_rag.models.qna_rag.parser.csv_parser import QnAFileParser
+from simple_rag.models.qna_rag.qna import SimpleQna, SqliteQnA
+
+PAIRS = [
+    ("What is Python?", "A programming language"),
+    ("What is 2 + 2?", "4"),
+    ("What is Python?", "A snake"),
+    ("What is the capital of France?", "Paris"),
+]
+
+
+@pytest.fixture
+def qna(tmp_path):
+    qna = SqliteQnA(tmp_path / "qna.db", hot_set_size=2)
+    qna.add(PAIRS)
+    return qna
+
+
+def test_sqlite_qna_matches_simple_qna(qna):
+    simple = SimpleQna({})
+    for question, answer in PAIRS:
+        simple.db.setdefault(question, []).append(answer)
+
+    assert list(qna.get_questions()) == list(simple.get_questions())
+    assert list(qna.get_questions_with_answers()) == list(simple.get_questions_with_answers())
+    for question in [*simple.db, "what is python?"]:
+        assert qna.lookup_answer(question) == simple.lookup_answer(question)
+
+
+def test_batch_lookup_uses_hot_set(qna):
+    found = qna.lookup_answers(["What is Python?", "unknown", "What is 2 + 2?"])
+
+    assert found == {"What is Python?": ["A programming language", "A snake"], "What is 2 + 2?": ["4"]}
+    assert qna.hot_set.stats()["entries"] == 2
+
+    qna.lookup_answers(["What is 2 + 2?"])
+    assert qna.hot_set.hits == 1
+
+
+def test_lookup_of_many_questions_is_chunked(tmp_path):
+    qna = SqliteQnA(tmp_path / "qna.db", hot_set_size=0)
+    qna.add((f"q{i}", f"a{i}") for i in range(1200))
+
+    found = qna.lookup_answers([f"q{i}" for i in range(1200)])
+
+    assert len(qna) == 1200
+    assert found["q1199"] == ["a1199"]
+    assert len(found) == 1200
+
+
+def test_parser_reuses_database_of_unchanged_file(tmp_path):
+    csv = tmp_path / "qna.csv"
+    pd.DataFrame(PAIRS, columns=["Вопрос", "Ответ"]).to_csv(csv, sep=";", index=False)
+    db_path = tmp_path / "qna.db"
+
+    qna = QnAFileParser(str(csv)).parse_qna_to_sqlite(str(db_path))
+    assert qna.lookup_answer("What is Python?") == ["A programming language", "A snake"]
+    qna.add([("added later", "kept")])
+
+    reused = QnAFileParser(str(csv)).parse_qna_to_sqlite(str(db_path))
+    assert reused.lookup_answer("added later") == ["kept"]
+
+    pd.DataFrame(PAIRS[:1], columns=["Вопрос", "Ответ"]).to_csv(csv, sep=";", index=False)
+    os.utime(csv, ns=(0, 0))
+    rebuilt = QnAFileParser(str(csv)).parse_qna_to_sqlite(str(db_path))
+    assert list(rebuilt.get_questions()) == ["What is Python?"]
+    assert rebuilt.lookup_answer("added later") is None
+
+
+class FakeQuestionStore:
+    def __init__(self, qna):
+        self.qna = qna
+        self.batches = []
+
+    def batch_lookup_answers(self, questions):
+        self.batches.append((questions, threading.current_thread().name))
+        return self.qna.lookup_answers(questions)
+
+
+def test_engine_fetches_answers_in_one_lookup(qna):
+    store = FakeQuestionStore(qna)
+    engine = RagEngineDynamicPrompt(llm=None, vector_store=store)
+    questions = [Document(page_content=q) for q in ["What is Python?", "missing", "What is 2 + 2?"]]
+
+    context = engine.get_answers({"questions": questions})["qna_context"]
+
+    assert context == ["A programming language", "A snake", "4"]
+    assert len(store.batches) == 1
+
+
+async def test_async_engine_looks_answers_up_off_the_event_loop(qna):
+    store = FakeQuestionStore(qna)
+    questions = [Document(page_content=q) for q in ["What is Python?", "What is 2 + 2?"]]
+    store.asimilarity_search = AsyncMock(return_value=questions)
+    engine = RagEngineDynamicPrompt(llm=FakeListChatModel(responses=["answer"]), vector_store=store)
+
+    result = await engine.build_rag().ainvoke(
+        {"raw_input": "python?"}, config={"configurable": {"thread_id": "1"}}
+    )
+
+    assert result["answer"] == "answer"
+    assert result["qna_context"] == ["A programming language", "A snake", "4"]
+    [(_, thread)] = store.batches
+    assert thread.startswith("qna-lookup")
@@ -0,0 +1,101 @@
+import time
+
+import pandas as pd
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from simple_rag.cache.lru import LRUCache
+from simple_rag.knowledge_base.store.default_store import Store
+
+QUESTION = "what is the proper way to connect to VM?"
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    queries: int = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+@pytest.fixture
+def df():
+    return pd.read_csv("assets/support_kbase.csv")
+
+
+@pytest.fixture
+def store(tmp_path, df):
+    store = Store(
+        vectorstore_cfg={
+            "type": "chroma",
+            "collection_name": "test_results_cache",
+            "persist_directory": str(tmp_path),
+        },
+        embeddings=CountingEmbeddings(size=16),
+    )
+    store.store_dataframe(df)
+    return store
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_cache_entries_expire():
+    cache = LRUCache(max_entries=2, ttl_s=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+
+
+def test_repeated_query_is_served_from_cache(store):
+    embeddings = store.vectorizer.vector_store.embeddings
+
+    first = store.get_entries_similar_to_problem(QUESTION)
+    queries = embeddings.queries
+    # same query up to whitespace
+    second = store.get_entries_similar_to_problem(f"  {QUESTION} ")
+
+    assert first == second
+    assert embeddings.queries == queries
+    assert store.results_cache.stats()["hits"] == 1
+
+
+def test_cached_records_are_not_shared_with_callers(store):
+    store.get_entries_similar_to_problem(QUESTION)[0]["Question"] = "changed"
+
+    assert store.get_entries_similar_to_problem(QUESTION)[0]["Question"] != "changed"
+
+
+def test_search_config_is_part_of_the_key(store):
+    store.get_entries_similar_to_problem(QUESTION, {"k": 2})
+    store.get_entries_similar_to_problem(QUESTION, {"k": 3})
+
+    assert store.results_cache.stats()["hits"] == 0
+
+
+def test_new_version_invalidates_cache(store, df):
+    store.get_entries_similar_to_problem(QUESTION)
+    store.store_dataframe(df.iloc[:5])
+
+    records = store.get_entries_similar_to_problem(QUESTION)
+
+    assert store.results_cache.stats()["hits"] == 0
+    assert {r["Question"] for r in records} <= set(df.iloc[:5]["Question"])
+
+
+async def test_async_search_shares_the_cache(store):
+    records = store.get_entries_similar_to_problem(QUESTION)
+
+    assert await store.aget_entries_similar_to_problem(QUESTION) == records
+    assert store.results_cache.stats()["hits"] == 1
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from simple_rag.knowledge_base.store.default_store import Store
+from simple_rag.knowledge_base.store.snapshot import SnapshotError, read_manifest
+
+QUESTION = "what is the proper way to connect to VM?"
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    documents: int = 0
+
+    def embed_documents(self, texts):
+        self.documents += len(texts)
+        return super().embed_documents(texts)
+
+
+class OtherEmbeddings(DeterministicFakeEmbedding):
+    pass
+
+
+@pytest.fixture
+def df():
+    return pd.read_csv("assets/support_kbase.csv")
+
+
+def make_store(vectorstore_type="numpy", embeddings=None, **kwargs):
+    return Store(
+        vectorstore_cfg={"type": vectorstore_type},
+        embeddings=embeddings or CountingEmbeddings(size=16),
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def snapshot(tmp_path, df):
+    store = make_store()
+    store.store_dataframe(df)
+    path = tmp_path / "snapshot"
+    store.export_snapshot(str(path))
+    return path, store.get_entries_similar_to_problem(QUESTION)
+
+
+def test_export_writes_manifest(snapshot, df):
+    path, _ = snapshot
+
+    manifest = read_manifest(path)
+
+    assert manifest.rows == len(df)
+    assert manifest.dim == 16
+    assert manifest.kb_version == 1
+    assert manifest.embeddings_model == "CountingEmbeddings"
+
+
+def test_warm_start_does_not_embed_rows(snapshot):
+    path, expected = snapshot
+
+    store = make_store(snapshot_path=str(path))
+
+    assert store.vectorizer.vector_store.embeddings.documents == 0
+    assert store.get_entries_similar_to_problem(QUESTION) == expected
+    # vectors are served from the memory-mapped file
+    assert not store.vectorizer.vector_store._vectors.flags.writeable
+
+
+def test_memory_mapped_store_accepts_new_versions(snapshot, df):
+    path, _ = snapshot
+    store = make_store(snapshot_path=str(path))
+
+    store.store_dataframe(df.iloc[:5])
+    store.clear_old_versions()
+
+    records = store.get_entries_similar_to_problem(QUESTION)
+    assert {r["Question"] for r in records} <= set(df.iloc[:5]["Question"])
+    assert len(store.vectorizer.vector_store) == 5
+
+
+@pytest.mark.parametrize("vectorstore_type", ["chroma", "faiss"])
+def test_import_into_other_backends(tmp_path, snapshot, vectorstore_type):
+    path, expected = snapshot
+    store = Store(
+        vectorstore_cfg={
+            "type": vectorstore_type,
+            "collection_name": "test_snapshot_import",
+            "persist_directory": str(tmp_path / vectorstore_type),
+        },
+        embeddings=CountingEmbeddings(size=16),
+    )
+
+    store.import_snapshot(str(path))
+
+    assert store.vectorizer.vector_store.embeddings.documents == 0
+    assert store.get_entries_similar_to_problem(QUESTION) == expected
+
+
+def test_import_into_in_memory_store(snapshot, df):
+    path, _ = snapshot
+    store = make_store("in_memory")
+
+    store.import_snapshot(str(path))
+
+    docs = store.vectorizer.similarity_search(QUESTION, {"k": 3})
+    assert store.vectorizer.vector_store.embeddings.documents == 0
+    assert len(store.vectorizer.vector_store.store) == len(df)
+    assert len(docs) == 3
+
+
+def test_snapshot_of_another_model_is_rejected(snapshot):
+    path, _ = snapshot
+
+    with pytest.raises(SnapshotError):
+        make_store(embeddings=OtherEmbeddings(size=16)).import_snapshot(str(path))
+
+    # on start the snapshot is skipped, the store stays empty
+    assert make_store(embeddings=OtherEmbeddings(size=16), snapshot_path=str(path)).is_empty
+
+
+def test_export_from_chroma(tmp_path, df):
+    store = Store(
+        vectorstore_cfg={
+            "type": "chroma",
+            "collection_name": "test_snapshot",
+            "persist_directory": str(tmp_path / "chroma"),
+        },
+        embeddings=CountingEmbeddings(size=16),
+    )
+    store.store_dataframe(df)
+    store.export_snapshot(str(tmp_path / "snapshot"))
+
+    vectors = np.fromfile(tmp_path / "snapshot" / "embeddings.f32", dtype=np.float32)
+    norms = np.linalg.norm(vectors.reshape(len(df), 16), axis=1)
+    assert norms == pytest.approx(np.ones(len(df)), abs=1e-5)